@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de DatabaseManager.obtener_clientes_al_corriente
+
+Genera clientes con 24 meses de recibos (casi todos pagados, para que
+haya muchos clientes al corriente) y compara la consulta anterior
+(NOT IN sobre los recibos pendientes, y JOIN + DISTINCT para un mes) con
+el anti-join actual: el listado completo, la primera página y una página
+intermedia. Antes de medir comprueba que ambas devuelven los mismos
+clientes y que recorrer todas las páginas da el listado completo.
+
+Termina con código 1 si algún listado no coincide.
+
+Uso:
+    python benchmarks/bench_clientes_al_corriente.py [num_clientes]
+"""
+
+import sys
+
+from comun import crear_bd_sintetica, crear_recibos_sinteticos, cronometrar
+
+PAGINA = 200
+
+
+def al_corriente_not_in(db):
+    """Consulta anterior de obtener_clientes_al_corriente()"""
+    return db.fetch_all("""
+        SELECT c.*
+        FROM cliente c
+        WHERE c.activo = 1 AND c.id_cliente NOT IN (
+            SELECT DISTINCT id_cliente FROM recibo WHERE pagado = 0
+        )
+        ORDER BY c.apellidos, c.nombre
+    """)
+
+
+def al_corriente_mes_join(db, mes, anio):
+    """Consulta anterior de obtener_clientes_al_corriente(mes, anio)"""
+    return db.fetch_all("""
+        SELECT DISTINCT c.*
+        FROM cliente c
+        JOIN recibo r ON c.id_cliente = r.id_cliente
+        WHERE r.pagado = 1 AND r.mes = ? AND r.anio = ? AND c.activo = 1
+        ORDER BY c.apellidos, c.nombre
+    """, (mes, anio))
+
+
+def todas_las_paginas(db, **filtro):
+    """Recorre el listado página a página como la ventana de la GUI"""
+    filas, ultima = [], None
+    while True:
+        pagina = db.obtener_clientes_al_corriente(limite=PAGINA, despues_de=ultima, **filtro)
+        filas.extend(pagina)
+        if len(pagina) < PAGINA:
+            return filas
+        ultima = pagina[-1]
+
+
+def ids(filas):
+    return sorted(fila['id_cliente'] for fila in filas)
+
+
+def main():
+    num_clientes = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    db = crear_bd_sintetica(num_clientes, num_aparatos=10, ocupacion=0.0)
+    num_recibos = crear_recibos_sinteticos(db, num_meses=24, pagados=0.99)
+    db.execute_query("UPDATE cliente SET activo = 0 WHERE id_cliente % 50 = 0")
+    print(f"{num_clientes} clientes, {num_recibos} recibos")
+    
+    fallos = []
+    completo = db.obtener_clientes_al_corriente()
+    if ids(completo) != ids(al_corriente_not_in(db)):
+        fallos.append("al corriente: no coincide con NOT IN")
+    if ids(todas_las_paginas(db)) != ids(completo):
+        fallos.append("al corriente: las páginas no suman el listado completo")
+    if ids(db.obtener_clientes_al_corriente(3, 2024)) != ids(al_corriente_mes_join(db, 3, 2024)):
+        fallos.append("al corriente en 3/2024: no coincide con JOIN + DISTINCT")
+    if ids(todas_las_paginas(db, mes=3, anio=2024)) != ids(al_corriente_mes_join(db, 3, 2024)):
+        fallos.append("al corriente en 3/2024: las páginas no suman el listado completo")
+    
+    intermedia = completo[len(completo) // 2]
+    pruebas = (
+        ("NOT IN (anterior)", lambda: al_corriente_not_in(db)),
+        ("anti-join completo", db.obtener_clientes_al_corriente),
+        ("anti-join 1ª página", lambda: db.obtener_clientes_al_corriente(limite=PAGINA)),
+        ("anti-join pág. intermedia",
+         lambda: db.obtener_clientes_al_corriente(limite=PAGINA, despues_de=intermedia)),
+        ("mes: JOIN (anterior)", lambda: al_corriente_mes_join(db, 3, 2024)),
+        ("mes: EXISTS completo", lambda: db.obtener_clientes_al_corriente(3, 2024)),
+        ("mes: EXISTS 1ª página", lambda: db.obtener_clientes_al_corriente(3, 2024, limite=PAGINA)),
+    )
+    print(f"{len(completo)} clientes al corriente")
+    print("-" * 60)
+    for nombre, prueba in pruebas:
+        segundos = cronometrar(prueba, repeticiones=3)
+        print(f"{nombre:<28} {segundos * 1000:>9.1f} ms")
+    
+    db.disconnect()
+    print()
+    if fallos:
+        print("FALLO:\n  " + "\n  ".join(fallos))
+        sys.exit(1)
+    print("Los listados coinciden")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la conciliación de cobros del banco
+
+Genera un fichero CSV de cobros como el que envía el banco (separado por
+punto y coma, importes con coma decimal) con una línea por recibo
+pendiente (cobrado, devuelto o con otro importe) más líneas repetidas,
+de DNI desconocidos y mal formadas. Lo concilia con
+DatabaseManager.conciliar_pagos leyendo el fichero con
+utils.banco.leer_cobros_banco y lo compara con registrar_pago recibo a
+recibo sobre una muestra. Comprueba que se pagan justo los recibos
+esperados, que cada línea no aplicada aparece con su motivo y que
+saldo_cliente sigue cuadrando. Mide también el pico de memoria de Python
+durante la conciliación.
+
+Termina con código 1 si el resultado no es el esperado.
+
+Uso:
+    python benchmarks/bench_conciliacion.py [num_lineas]
+"""
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+from comun import crear_bd_sintetica, crear_recibos_sinteticos, ruta_temporal
+from utils.banco import leer_cobros_banco
+
+MUESTRA_UNA_A_UNA = 2000
+
+
+def escribir_fichero(ruta, recibos, rnd):
+    """
+    Escribe el CSV del banco y devuelve cuántas líneas de cada tipo tiene.
+    
+    Cada recibo aparece una vez: cobrado, devuelto o con otro importe (un
+    1% de cada uno de estos dos). Se añade un 1% de líneas repetidas, de
+    DNI desconocidos y mal formadas.
+    """
+    extra = max(1, len(recibos) // 100)
+    recibos = recibos[:]
+    rnd.shuffle(recibos)
+    devueltos, otro_importe, cobrados = recibos[:extra], recibos[extra:2 * extra], recibos[2 * extra:]
+    tipos = {'cobradas': len(cobrados), 'devueltas': extra, 'importe': extra,
+             'repetidas': extra, 'desconocidas': extra, 'mal_formadas': extra}
+    with open(ruta, 'w', encoding='utf-8') as fichero:
+        fichero.write("DNI;Mes;Año;Importe;Fecha;Estado\n")
+        for dni, mes, anio, importe in cobrados:
+            fichero.write(f"{dni};{mes};{anio};{importe:.2f}".replace('.', ',')
+                          + ";15/03/2024;COBRADO\n")
+        for dni, mes, anio, importe in devueltos:
+            fichero.write(f"{dni};{mes};{anio};{importe:.2f};2024-03-15;DEVUELTO\n")
+        for dni, mes, anio, importe in otro_importe:
+            fichero.write(f"{dni};{mes};{anio};{importe + 1:.2f};2024-03-15;cobrado\n")
+        for dni, mes, anio, importe in rnd.sample(cobrados, extra):
+            fichero.write(f"{dni};{mes};{anio};{importe:.2f};2024-03-15;cobrado\n")
+        for i in range(extra):
+            fichero.write(f"{90000000 + i}Z;3;2024;45,00;15/03/2024;COBRADO\n")
+        for i in range(extra):
+            fichero.write("00000001R;marzo;2024;45,00;15/03/2024;COBRADO\n")
+    return tipos
+
+
+def main():
+    num_lineas = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    num_clientes = max(100, num_lineas // 10)
+    rnd = random.Random(5)
+    
+    # 12 meses por cliente; unos 10 recibos pendientes por cliente
+    db = crear_bd_sintetica(num_clientes, num_aparatos=10, ocupacion=0.0)
+    crear_recibos_sinteticos(db, num_meses=12, pagados=0.2)
+    recibos = [tuple(fila) for fila in db.fetch_all("""
+        SELECT c.dni, r.mes, r.anio, r.importe FROM recibo r
+        JOIN cliente c ON r.id_cliente = c.id_cliente
+        WHERE r.pagado = 0
+    """)]
+    ruta = ruta_temporal("cobros_banco.csv")
+    tipos = escribir_fichero(ruta, recibos, rnd)
+    esperados_pagados = tipos['cobradas']
+    esperados_pendientes = tipos['devueltas'] + tipos['importe']
+    print(f"{num_clientes} clientes, {len(recibos)} recibos pendientes, "
+          f"{sum(tipos.values())} líneas ({os.path.getsize(ruta) / 1e6:.1f} MB)")
+    
+    # Recibo a recibo, como desde la pestaña Pagos (sobre una muestra)
+    ids = [fila[0] for fila in db.fetch_all(
+        f"SELECT id_recibo FROM recibo WHERE pagado = 0 LIMIT {MUESTRA_UNA_A_UNA}")]
+    inicio = time.perf_counter()
+    for id_recibo in ids:
+        db.registrar_pago(id_recibo)
+    segundos_uno = (time.perf_counter() - inicio) / len(ids)
+    
+    def deshacer_pagos():
+        db.execute_query("UPDATE recibo SET pagado = 0, fecha_pago = NULL "
+                         "WHERE fecha_pago IN (?, '2024-03-15')", (date.today().isoformat(),))
+    
+    deshacer_pagos()
+    inicio = time.perf_counter()
+    db.conciliar_pagos(leer_cobros_banco(ruta))
+    segundos = time.perf_counter() - inicio
+    
+    # Segunda pasada, solo para medir la memoria (tracemalloc la ralentiza)
+    deshacer_pagos()
+    tracemalloc.start()
+    resultado = db.conciliar_pagos(leer_cobros_banco(ruta))
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    fallos = []
+    if resultado is None:
+        fallos.append("conciliar_pagos devolvió None")
+    else:
+        motivos = {}
+        for cobro in resultado['no_conciliados']:
+            motivo = cobro['motivo'].split(' (')[0]
+            motivos[motivo] = motivos.get(motivo, 0) + 1
+        print(f"{resultado['lineas']} líneas, {resultado['pagados']} pagados, "
+              f"{len(resultado['no_conciliados'])} sin conciliar: {motivos}")
+        if resultado['lineas'] != sum(tipos.values()):
+            fallos.append(f"{resultado['lineas']} líneas leídas de {sum(tipos.values())}")
+        if resultado['pagados'] != esperados_pagados:
+            fallos.append(f"{resultado['pagados']} recibos pagados (se esperaban {esperados_pagados})")
+        esperados = {
+            "Sin recibo pendiente": tipos['repetidas'] + tipos['desconocidas'],
+            "Adeudo devuelto": tipos['devueltas'],
+            "Importe distinto del recibo": tipos['importe'],
+            "Mes, año o importe no válido": tipos['mal_formadas'],
+        }
+        if motivos != esperados:
+            fallos.append(f"motivos {motivos} (se esperaban {esperados})")
+    pendientes = db.fetch_one("SELECT COUNT(*) FROM recibo WHERE pagado = 0")[0]
+    if pendientes != esperados_pendientes:
+        fallos.append(f"quedan {pendientes} recibos pendientes (se esperaban {esperados_pendientes})")
+    if db.fetch_one("SELECT COUNT(*) FROM recibo WHERE pagado = 1 AND fecha_pago IS NULL")[0]:
+        fallos.append("hay recibos pagados sin fecha de pago")
+    if db.verificar_saldos():
+        fallos.append("saldo_cliente no cuadra tras la conciliación")
+    
+    print("-" * 60)
+    print(f"{'registrar_pago uno a uno':<26} {segundos_uno * 1e6:>9.1f} µs/recibo"
+          f"   (~{segundos_uno * esperados_pagados:.1f} s en total)")
+    print(f"{'conciliar_pagos':<26} {segundos / sum(tipos.values()) * 1e6:>9.1f} µs/línea"
+          f"   ({segundos:.2f} s en total, pico {pico / 1e6:.1f} MB)")
+    
+    db.disconnect()
+    print()
+    if fallos:
+        print("FALLO:\n  " + "\n  ".join(fallos))
+        sys.exit(1)
+    print("La conciliación coincide con lo esperado")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de lectores y escritor concurrentes por perfil de SQLite
+
+Un hilo escritor inserta reservas en transacciones cortas mientras
+varios hilos lectores consultan las reservas del día, cada uno con su
+propia conexión (como la ventana de login y la aplicación principal).
+Se compara el modo de diario clásico (rollback journal) con los
+perfiles de PERFILES_PRAGMA.
+
+Uso:
+    python benchmarks/bench_concurrencia.py [segundos] [num_lectores]
+"""
+
+import sys
+import threading
+import time
+
+from comun import crear_bd_sintetica, ruta_temporal, HORAS
+from database.db_manager import DatabaseManager, PERFILES_PRAGMA
+
+# Perfil equivalente a la configuración anterior, solo para comparar
+PERFILES_PRAGMA.setdefault("anterior", {"journal_mode": "DELETE", "synchronous": "FULL"})
+
+
+def ejecutar(perfil: str, segundos: float, num_lectores: int) -> dict:
+    """Lanza el escritor y los lectores durante `segundos` y devuelve métricas"""
+    ruta = ruta_temporal()
+    crear_bd_sintetica(num_clientes=200, num_aparatos=40, ruta=ruta).disconnect()
+    
+    fin = time.perf_counter() + segundos
+    resultados = {'escrituras': 0, 'lecturas': 0, 'espera_maxima': 0.0}
+    cerrojo = threading.Lock()
+    
+    def escritor():
+        db = DatabaseManager(ruta, perfil=perfil)
+        db.connect()
+        i = 0
+        while time.perf_counter() < fin:
+            # Aparatos nuevos para no chocar con las reservas existentes
+            id_aparato = db.insertar_aparato(f"Extra {i}", "Cardio")
+            db.insertar_reservas_bulk([(1, id_aparato, 1, hora) for hora in HORAS[:8]])
+            i += 1
+        with cerrojo:
+            resultados['escrituras'] = i
+        db.disconnect()
+    
+    def lector():
+        db = DatabaseManager(ruta, perfil=perfil)
+        db.connect()
+        lecturas = 0
+        espera_maxima = 0.0
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            db.obtener_reservas_por_dia(1)
+            espera_maxima = max(espera_maxima, time.perf_counter() - inicio)
+            lecturas += 1
+        with cerrojo:
+            resultados['lecturas'] += lecturas
+            resultados['espera_maxima'] = max(resultados['espera_maxima'], espera_maxima)
+        db.disconnect()
+    
+    hilos = [threading.Thread(target=escritor)]
+    hilos += [threading.Thread(target=lector) for _ in range(num_lectores)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
+
+
+def main():
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    num_lectores = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    
+    print(f"1 escritor y {num_lectores} lectores durante {segundos:.0f} s")
+    print("-" * 70)
+    for perfil in ("anterior", "safe", "fast", "bulk-load"):
+        r = ejecutar(perfil, segundos, num_lectores)
+        print(f"{perfil:<10} {r['escrituras'] / segundos:>9,.0f} lotes/s "
+              f"{r['lecturas'] / segundos:>9,.0f} lecturas/s "
+              f"{r['espera_maxima'] * 1000:>9.1f} ms lectura más lenta")
+
+
+if __name__ == "__main__":
+    main()
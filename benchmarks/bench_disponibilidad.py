@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del índice de disponibilidad en memoria
+
+Compara las consultas SQL por franja (COUNT(*) como el antiguo
+verificar_disponibilidad) con el mapa de bits de IndiceDisponibilidad
+para tres preguntas: si una franja está libre, qué franjas de un
+aparato están libres en un día y cuál es el primer aparato de un tipo
+libre a una hora. Antes de medir comprueba que ambas respuestas coinciden.
+
+Uso:
+    python benchmarks/bench_disponibilidad.py [num_aparatos]
+"""
+
+import random
+import sys
+
+from comun import crear_bd_sintetica, cronometrar, HORAS, TIPOS_APARATO
+
+
+def libre_sql(db, id_aparato, dia, hora):
+    """Réplica del antiguo verificar_disponibilidad: un COUNT(*) por franja"""
+    fila = db.fetch_one("""
+        SELECT COUNT(*) FROM reserva
+        WHERE id_aparato = ? AND dia_semana = ? AND hora_inicio = ?
+    """, (id_aparato, dia, hora))
+    return fila[0] == 0
+
+
+def franjas_libres_sql(db, id_aparato, dia):
+    """Franjas libres comprobando las 48 una a una, como hacía la GUI"""
+    return [hora for hora in HORAS if libre_sql(db, id_aparato, dia, hora)]
+
+
+def primer_libre_sql(db, tipo, dia, hora):
+    """Primer aparato del tipo (por nombre) sin reserva en la franja"""
+    fila = db.fetch_one("""
+        SELECT a.id_aparato FROM aparato a
+        WHERE a.activo = 1 AND a.tipo = ? AND NOT EXISTS (
+            SELECT 1 FROM reserva r
+            WHERE r.id_aparato = a.id_aparato AND r.dia_semana = ? AND r.hora_inicio = ?
+        )
+        ORDER BY a.nombre, a.id_aparato
+        LIMIT 1
+    """, (tipo, dia, hora))
+    return fila[0] if fila else None
+
+
+def main():
+    num_aparatos = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    db = crear_bd_sintetica(num_clientes=500, num_aparatos=num_aparatos, ocupacion=0.9)
+    indice = db.disponibilidad
+    rnd = random.Random(1)
+    
+    franjas = [(rnd.randint(1, num_aparatos), rnd.randint(1, 5), rnd.choice(HORAS))
+               for _ in range(2000)]
+    for id_aparato, dia, hora in franjas:
+        assert indice.esta_libre(id_aparato, dia, hora) == libre_sql(db, id_aparato, dia, hora)
+        assert indice.primer_aparato_libre('Cardio', dia, hora) == primer_libre_sql(db, 'Cardio', dia, hora)
+    for id_aparato in range(1, num_aparatos + 1, 17):
+        assert indice.franjas_libres(id_aparato, 3) == franjas_libres_sql(db, id_aparato, 3)
+    
+    print(f"Disponibilidad con {num_aparatos} aparatos (90% de franjas ocupadas)")
+    print("-" * 60)
+    pruebas = (
+        ("franja libre",
+         lambda: [libre_sql(db, a, d, h) for a, d, h in franjas],
+         lambda: [indice.esta_libre(a, d, h) for a, d, h in franjas]),
+        ("franjas libres del día",
+         lambda: [franjas_libres_sql(db, a, d) for a, d, _ in franjas[:50]],
+         lambda: [indice.franjas_libres(a, d) for a, d, _ in franjas[:50]]),
+        ("primer aparato libre",
+         lambda: [primer_libre_sql(db, TIPOS_APARATO[a % 3], d, h) for a, d, h in franjas],
+         lambda: [indice.primer_aparato_libre(TIPOS_APARATO[a % 3], d, h) for a, d, h in franjas]),
+    )
+    for nombre, con_sql, con_indice in pruebas:
+        llamadas = len(con_indice())
+        t_sql = cronometrar(con_sql) / llamadas
+        t_indice = cronometrar(con_indice, repeticiones=5) / llamadas
+        print(f"{nombre:<24} SQL {t_sql * 1e6:>9.1f} µs   índice {t_indice * 1e6:>7.2f} µs"
+              f"   x{t_sql / t_indice:,.0f}")
+    
+    carga = cronometrar(lambda: db._invalidar_disponibilidad() or db.disponibilidad)
+    print(f"\nCarga completa del índice: {carga * 1000:.1f} ms")
+    
+    db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
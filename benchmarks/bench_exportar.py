@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la exportación de recibos, morosos y ocupación
+
+Genera clientes con 24 meses de recibos y exporta un año de recibos a
+CSV (y a Excel si openpyxl está instalado) leyendo las filas del cursor
+según se escriben, frente a reunirlas antes con obtener_recibos. Mide
+el tiempo y el pico de memoria de Python de cada exportación (de la de
+Excel, solo el tiempo) y comprueba que los ficheros tienen tantas filas
+como recibos, morosos y aparatos hay, y que la rejilla de ocupación
+tiene tantas franjas ocupadas como reservas.
+
+Termina con código 1 si algún fichero no cuadra.
+
+Uso:
+    python benchmarks/bench_exportar.py [num_clientes]
+"""
+
+import csv
+import sys
+import time
+import tracemalloc
+
+from comun import crear_bd_sintetica, crear_recibos_sinteticos, ruta_temporal
+from utils.exportar import (
+    XLSX_DISPONIBLE, exportar_csv, exportar_recibos, exportar_morosos, exportar_ocupacion
+)
+
+
+def exportar_reuniendo(db, ruta, anio):
+    """Exportación reuniendo antes todos los recibos en una lista"""
+    recibos = db.obtener_recibos(anio=anio)
+    return exportar_csv(ruta, recibos[0].keys(), [tuple(r) for r in recibos])
+
+
+def medir(funcion, memoria=True):
+    """
+    Devuelve (resultado, segundos, pico de memoria en bytes o None).
+    
+    El tiempo se mide sin tracemalloc, que ralentiza mucho; para el pico
+    de memoria se repite la llamada con tracemalloc activo.
+    """
+    inicio = time.perf_counter()
+    resultado = funcion()
+    segundos = time.perf_counter() - inicio
+    if not memoria:
+        return resultado, segundos, None
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, segundos, pico
+
+
+def mostrar(nombre, segundos, pico):
+    """Imprime una línea de resultados"""
+    memoria = f"{pico / 1e6:>7.1f} MB" if pico is not None else "      - MB"
+    print(f"{nombre:<30} {segundos:>6.2f} s   pico {memoria}")
+
+
+def filas_csv(ruta):
+    """Filas de datos de un CSV exportado (sin la cabecera)"""
+    with open(ruta, newline='', encoding='utf-8-sig') as fichero:
+        return sum(1 for _ in csv.reader(fichero, delimiter=';')) - 1
+
+
+def main():
+    num_clientes = int(sys.argv[1]) if len(sys.argv) > 1 else 25000
+    db = crear_bd_sintetica(num_clientes, num_aparatos=100, ocupacion=0.5)
+    crear_recibos_sinteticos(db, num_meses=24)
+    recibos_anio = db.fetch_one("SELECT COUNT(*) FROM recibo WHERE anio = 2024")[0]
+    print(f"{num_clientes} clientes, {recibos_anio} recibos en 2024")
+    
+    fallos = []
+    pruebas = [
+        ("recibos reuniendo (csv)", "reunidos.csv", lambda ruta: exportar_reuniendo(db, ruta, 2024)),
+        ("recibos en streaming (csv)", "recibos.csv", lambda ruta: exportar_recibos(db, ruta, anio=2024)),
+    ]
+    if XLSX_DISPONIBLE:
+        # Con tracemalloc, openpyxl tarda varios minutos: solo se mide el tiempo
+        pruebas.append(("recibos en streaming (xlsx)", "recibos.xlsx",
+                        lambda ruta: exportar_recibos(db, ruta, anio=2024)))
+    else:
+        print("openpyxl no está instalado: no se mide la exportación a Excel")
+    print("-" * 60)
+    for nombre, fichero, prueba in pruebas:
+        ruta = ruta_temporal(fichero)
+        total, segundos, pico = medir(lambda: prueba(ruta), memoria=fichero.endswith('.csv'))
+        mostrar(nombre, segundos, pico)
+        if total != recibos_anio:
+            fallos.append(f"{nombre}: {total} filas (se esperaban {recibos_anio})")
+        if fichero.endswith('.csv') and filas_csv(ruta) != recibos_anio:
+            fallos.append(f"{nombre}: el fichero tiene {filas_csv(ruta)} filas")
+    
+    ruta = ruta_temporal("morosos.csv")
+    total, segundos, pico = medir(lambda: exportar_morosos(db, ruta))
+    mostrar("morosos (csv)", segundos, pico)
+    if total != len(db.obtener_clientes_morosos()) or filas_csv(ruta) != total:
+        fallos.append(f"morosos: {total} filas exportadas")
+    
+    ruta = ruta_temporal("ocupacion.csv")
+    total, segundos, pico = medir(lambda: exportar_ocupacion(db, ruta))
+    mostrar("ocupación semanal (csv)", segundos, pico)
+    aparatos = db.fetch_one("SELECT COUNT(*) FROM aparato WHERE activo = 1")[0]
+    if total != 5 * aparatos or filas_csv(ruta) != total:
+        fallos.append(f"ocupación: {total} filas (se esperaban {5 * aparatos})")
+    for dia in range(1, 6):
+        ocupadas = sum(franja['ocupado'] for aparato in db.iterar_ocupacion(dia)
+                       for franja in aparato['franjas'])
+        reservas = db.fetch_one("SELECT COUNT(*) FROM reserva r JOIN aparato a "
+                                "ON r.id_aparato = a.id_aparato "
+                                "WHERE r.dia_semana = ? AND a.activo = 1", (dia,))[0]
+        if ocupadas != reservas:
+            fallos.append(f"ocupación del día {dia}: {ocupadas} franjas ocupadas y {reservas} reservas")
+    
+    db.disconnect()
+    print()
+    if fallos:
+        print("FALLO:\n  " + "\n  ".join(fallos))
+        sys.exit(1)
+    print("Las exportaciones tienen todas sus filas")
+
+
+if __name__ == "__main__":
+    main()
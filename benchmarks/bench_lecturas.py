@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la ruta de lectura de DatabaseManager
+
+Compara las lecturas a través de execute_query (que confirma la
+transacción tras cada sentencia) con fetch_one/fetch_all, que no
+confirman nada. Con la conexión en reposo el commit de una lectura no
+cuesta nada; el coste aparece cuando la lectura cae dentro de un lote
+de escrituras, porque execute_query lo confirma (y sincroniza a disco)
+en cada lectura.
+
+Uso:
+    python benchmarks/bench_lecturas.py [num_lecturas]
+"""
+
+import sys
+import time
+
+from comun import crear_bd_sintetica
+
+
+def lecturas_por_segundo(funcion, num_lecturas: int) -> float:
+    """Ejecuta funcion(i) num_lecturas veces y devuelve lecturas/segundo"""
+    inicio = time.perf_counter()
+    for i in range(num_lecturas):
+        funcion(i)
+    return num_lecturas / (time.perf_counter() - inicio)
+
+
+def main():
+    num_lecturas = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    db = crear_bd_sintetica(num_clientes=2000, num_aparatos=30)
+    query = "SELECT * FROM cliente WHERE id_cliente = ?"
+    
+    def anterior(i):
+        return db.execute_query(query, (i % 2000 + 1,)).fetchone()
+    
+    def lectura(i):
+        return db.fetch_one(query, (i % 2000 + 1,))
+    
+    def disponibilidad(i):
+        return db.verificar_disponibilidad(i % 30 + 1, i % 5 + 1, "10:00")
+    
+    print(f"{num_lecturas} lecturas por clave primaria")
+    print("-" * 60)
+    for nombre, funcion in (
+        ("execute_query + commit", anterior),
+        ("fetch_one", lectura),
+        ("verificar_disponibilidad", disponibilidad),
+    ):
+        print(f"{nombre:<26} {lecturas_por_segundo(funcion, num_lecturas):>12,.0f} lecturas/s")
+    
+    # Lecturas intercaladas en un lote de escrituras sin confirmar
+    num_lote = min(num_lecturas, 2000)
+    insercion = "INSERT INTO usuario (nombre, email, password) VALUES ('u', ?, 'x')"
+    
+    def lote_anterior():
+        # La lectura con commit confirmaba (y sincronizaba) el lote cada vez
+        with db.conexion() as conexion:
+            def paso(i):
+                conexion.execute(insercion, (f"a{i}@gym.com",))
+                conexion.execute(query, (i % 2000 + 1,)).fetchone()
+                conexion.commit()
+            return lecturas_por_segundo(paso, num_lote)
+    
+    def lote_actual():
+        with db.transaction():
+            def paso(i):
+                db.execute_query(insercion, (f"b{i}@gym.com",))
+                db.fetch_one(query, (i % 2000 + 1,))
+            return lecturas_por_segundo(paso, num_lote)
+    
+    print(f"\n{num_lote} escrituras en lote, cada una seguida de una lectura")
+    print("-" * 60)
+    for nombre, medir in (
+        ("execute_query + commit", lote_anterior),
+        ("fetch_one", lote_actual),
+    ):
+        print(f"{nombre:<26} {medir():>12,.0f} lecturas/s")
+    
+    db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de DatabaseManager.obtener_ocupacion_aparatos_por_dia
+
+Compara la implementación anterior (una consulta por aparato y franja)
+con el motor de ocupación de una sola consulta.
+
+Uso:
+    python benchmarks/bench_ocupacion.py [num_aparatos]
+"""
+
+import sys
+
+from comun import crear_bd_sintetica, contar_consultas, cronometrar, HORAS
+
+
+def ocupacion_anterior(db, dia_semana):
+    """Réplica de la implementación anterior: 48 consultas por aparato"""
+    ocupacion = []
+    for aparato in db.obtener_aparatos():
+        franjas = []
+        for hora_str in HORAS:
+            cursor = db.execute_query("""
+                SELECT r.*, c.nombre, c.apellidos
+                FROM reserva r
+                JOIN cliente c ON r.id_cliente = c.id_cliente
+                WHERE r.id_aparato = ? AND r.dia_semana = ? AND r.hora_inicio = ?
+            """, (aparato['id_aparato'], dia_semana, hora_str))
+            reserva = cursor.fetchone()
+            franjas.append({
+                'hora': hora_str,
+                'ocupado': reserva is not None,
+                'cliente': f"{reserva['nombre']} {reserva['apellidos']}" if reserva else None
+            })
+        ocupacion.append({
+            'aparato_id': aparato['id_aparato'],
+            'aparato_nombre': aparato['nombre'],
+            'aparato_tipo': aparato['tipo'],
+            'franjas': franjas
+        })
+    return ocupacion
+
+
+def main():
+    num_aparatos = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    db = crear_bd_sintetica(num_clientes=500, num_aparatos=num_aparatos)
+    
+    assert ocupacion_anterior(db, 1) == db.obtener_ocupacion_aparatos_por_dia(1)
+    
+    print(f"Ocupación de un día con {num_aparatos} aparatos")
+    print("-" * 60)
+    for nombre, funcion in (
+        ("anterior", lambda: ocupacion_anterior(db, 1)),
+        ("una consulta", lambda: db.obtener_ocupacion_aparatos_por_dia(1)),
+        ("una consulta (tipo)", lambda: db.obtener_ocupacion_aparatos_por_dia(1, 'Cardio')),
+    ):
+        with contar_consultas(db) as contador:
+            funcion()
+        segundos = cronometrar(funcion, repeticiones=3)
+        print(f"{nombre:<22} {contador['consultas']:>7} consultas {segundos * 1000:>10.1f} ms")
+    
+    db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
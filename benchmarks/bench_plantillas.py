@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de DatabaseManager.aplicar_plantillas
+
+Compara volver a reservar las franjas semanales de cada socio una a una
+(comprobar e insertar cada franja, como desde la GUI) con aplicar todas
+las plantillas con un único INSERT ... SELECT. Algunas plantillas piden
+las mismas franjas, de modo que hay conflictos que informar.
+
+Uso:
+    python benchmarks/bench_plantillas.py [num_socios]
+"""
+
+import random
+import sys
+import time
+
+from comun import crear_bd_sintetica, contar_consultas, HORAS
+
+
+def main():
+    num_socios = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    num_aparatos = max(10, num_socios // 5)
+    db = crear_bd_sintetica(num_clientes=num_socios, num_aparatos=num_aparatos, ocupacion=0.0)
+    rnd = random.Random(7)
+    
+    # Cada socio: 3 días x 2 franjas seguidas en un aparato
+    plantillas = []
+    for id_cliente in range(1, num_socios + 1):
+        id_aparato = rnd.randint(1, num_aparatos)
+        inicio = rnd.randrange(0, len(HORAS) - 1)
+        franjas = [(dia, HORAS[i]) for dia in rnd.sample(range(1, 6), 3)
+                   for i in (inicio, inicio + 1)]
+        plantillas.append((id_cliente, id_aparato, franjas))
+        db.guardar_plantilla(id_cliente, id_aparato, franjas)
+    total_franjas = sum(len(f) for _, _, f in plantillas)
+    
+    # Una a una, como la GUI
+    with contar_consultas(db) as contador:
+        inicio = time.perf_counter()
+        creadas = 0
+        for id_cliente, id_aparato, franjas in plantillas:
+            for dia, hora in franjas:
+                if (db.verificar_disponibilidad(id_aparato, dia, hora)
+                        and db.insertar_reserva(id_cliente, id_aparato, dia, hora)):
+                    creadas += 1
+        segundos_gui = time.perf_counter() - inicio
+    consultas_gui = contador['consultas']
+    
+    db.execute_query("DELETE FROM reserva")
+    db._invalidar_disponibilidad()
+    
+    with contar_consultas(db) as contador:
+        inicio = time.perf_counter()
+        resultado = db.aplicar_plantillas()
+        segundos_lote = time.perf_counter() - inicio
+    
+    assert resultado['insertadas'] == creadas
+    assert resultado['insertadas'] + len(resultado['conflictos']) == total_franjas
+    
+    print(f"{num_socios} socios, {total_franjas} franjas de plantilla")
+    print("-" * 60)
+    print(f"{'una a una':<18} {consultas_gui:>7} consultas {segundos_gui * 1000:>10.1f} ms")
+    print(f"{'aplicar_plantillas':<18} {contador['consultas']:>7} consultas {segundos_lote * 1000:>10.1f} ms")
+    print(f"\n{resultado['insertadas']} reservas creadas, {len(resultado['conflictos'])} conflictos")
+    
+    db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
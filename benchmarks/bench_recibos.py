@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la facturación mensual (generar_recibos_mes)
+
+Compara la implementación anterior (un SELECT COUNT(*) y un INSERT con
+commit por cliente) con la facturación basada en conjuntos.
+
+La implementación anterior se mide sobre una muestra de clientes y se
+extrapola al total, porque sobre 50.000 clientes tarda varios minutos.
+
+Uso:
+    python benchmarks/bench_recibos.py [num_clientes] [muestra_anterior]
+"""
+
+import sys
+import time
+from datetime import date
+
+from comun import crear_bd_sintetica
+
+
+def facturar_anterior(db, clientes, mes, anio, importe):
+    """Réplica de la implementación anterior: dos sentencias y un commit por cliente"""
+    generados = 0
+    for cliente in clientes:
+        cursor = db.execute_query("""
+            SELECT COUNT(*) FROM recibo
+            WHERE id_cliente = ? AND mes = ? AND anio = ?
+        """, (cliente['id_cliente'], mes, anio))
+        if cursor.fetchone()[0] == 0:
+            if db.execute_query("""
+                INSERT INTO recibo (id_cliente, mes, anio, importe, pagado, fecha_emision)
+                VALUES (?, ?, ?, ?, 0, ?)
+            """, (cliente['id_cliente'], mes, anio, importe, date.today().isoformat())):
+                generados += 1
+    return generados
+
+
+def main():
+    num_clientes = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    muestra = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    db = crear_bd_sintetica(num_clientes=num_clientes, num_aparatos=0)
+    
+    print(f"Facturación de {num_clientes} clientes activos")
+    print("-" * 60)
+    
+    clientes = db.obtener_clientes()[:muestra]
+    inicio = time.perf_counter()
+    generados = facturar_anterior(db, clientes, 1, 2024, 50.0)
+    segundos = time.perf_counter() - inicio
+    estimado = segundos / max(generados, 1) * num_clientes
+    print(f"{'anterior (muestra)':<24} {generados:>7} recibos {segundos:>9.2f} s"
+          f"  (~{estimado:.1f} s para {num_clientes})")
+    
+    for nombre, funcion in (
+        ("un mes", lambda: db.generar_recibos_mes(2, 2024, 50.0)),
+        ("un mes (repetido)", lambda: db.generar_recibos_mes(2, 2024, 50.0)),
+        ("año completo", lambda: db.generar_recibos_periodo(2025, 50.0)),
+    ):
+        inicio = time.perf_counter()
+        generados = funcion()
+        segundos = time.perf_counter() - inicio
+        print(f"{nombre:<24} {generados:>7} recibos {segundos:>9.2f} s")
+    
+    db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
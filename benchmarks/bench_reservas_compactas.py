@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del esquema compacto de reservas
+
+Genera dos bases de datos iguales y pasa una al esquema compacto
+(DatabaseManager.compactar_reservas). Compara el espacio que ocupan las
+reservas con sus índices, los recorridos por rango (reservas de un
+aparato y día, de un cliente, de un día), la carga del índice de
+disponibilidad y la comprobación de unicidad al intentar reservar
+franjas ya ocupadas. Antes de medir comprueba que
+los listados coinciden en ambas (salvo id_reserva y fecha_creacion).
+
+Uso:
+    python benchmarks/bench_reservas_compactas.py [num_aparatos]
+"""
+
+import random
+import sys
+
+from comun import crear_bd_sintetica, cronometrar, HORAS
+
+
+def espacio(db, tabla):
+    """Bytes que ocupan una tabla y sus índices (según dbstat)"""
+    fila = db.fetch_one("""
+        SELECT SUM(pgsize) FROM dbstat
+        WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name = ?)
+    """, (tabla,))
+    return fila[0] or 0
+
+
+def comparables(filas):
+    """Filas de un listado sin id_reserva ni fecha_creacion (distintas en cada base)"""
+    return [{k: fila[k] for k in fila.keys() if k not in ('id_reserva', 'fecha_creacion')}
+            for fila in filas]
+
+
+def main():
+    num_aparatos = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    texto = crear_bd_sintetica(num_clientes=2000, num_aparatos=num_aparatos, ocupacion=0.9)
+    compacta = crear_bd_sintetica(num_clientes=2000, num_aparatos=num_aparatos, ocupacion=0.9)
+    compacta.compactar_reservas()
+    for db in (texto, compacta):
+        db.execute_query("VACUUM")
+    
+    for dia in range(1, 6):
+        assert comparables(texto.obtener_reservas(dia=dia)) == comparables(compacta.obtener_reservas(dia=dia))
+    for id_cliente in range(1, 2001, 97):
+        assert (comparables(texto.obtener_reservas_cliente(id_cliente))
+                == comparables(compacta.obtener_reservas_cliente(id_cliente)))
+    
+    rnd = random.Random(3)
+    claves = [(rnd.randint(1, num_aparatos), rnd.randint(1, 5)) for _ in range(2000)]
+    ocupadas = [(a, d, h) for a, d in claves[:300] for h in HORAS[:8]
+                if not texto.verificar_disponibilidad(a, d, h)]
+    
+    def rango(db):
+        consulta = "SELECT hora_inicio, id_cliente FROM reserva WHERE id_aparato = ? AND dia_semana = ?"
+        return [db.fetch_all(consulta, clave) for clave in claves]
+    
+    def colisiones(db):
+        return [db.reservar_bloque(1, a, d, [h]) for a, d, h in ocupadas]
+    
+    num_reservas = texto.fetch_one("SELECT COUNT(*) FROM reserva")[0]
+    bytes_texto = espacio(texto, "reserva")
+    bytes_compacta = espacio(compacta, "reserva_franja")
+    print(f"{num_reservas} reservas en {num_aparatos} aparatos")
+    print("-" * 60)
+    print(f"{'espacio (tabla + índices)':<28} texto {bytes_texto / 1024:>9.0f} KB"
+          f"   compacto {bytes_compacta / 1024:>9.0f} KB   {bytes_compacta / bytes_texto:.0%}")
+    pruebas = (
+        ("aparato y día (rango)", rango, len(claves)),
+        ("reservas de un día", lambda db: db.obtener_reservas(dia=3), 1),
+        ("reservas de un cliente",
+         lambda db: [db.obtener_reservas_cliente(c) for c in range(1, 2001, 7)], len(range(1, 2001, 7))),
+        ("franja ocupada (UNIQUE)", colisiones, len(ocupadas)),
+        ("carga del índice", lambda db: db._invalidar_disponibilidad() or db.disponibilidad, 1),
+    )
+    for nombre, prueba, llamadas in pruebas:
+        t_texto = cronometrar(lambda: prueba(texto), repeticiones=3) / llamadas
+        t_compacta = cronometrar(lambda: prueba(compacta), repeticiones=3) / llamadas
+        print(f"{nombre:<28} texto {t_texto * 1e6:>9.1f} µs   compacto {t_compacta * 1e6:>9.1f} µs"
+              f"   x{t_texto / t_compacta:.2f}")
+    
+    texto.disconnect()
+    compacta.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Comprobación de la conversión al esquema compacto con reservas antiguas
+
+Inserta directamente en SQL reservas que versiones anteriores dejaban
+guardar: horas que no son inicio de franja ("09:15", "9:00") en la misma
+franja que otra reserva ("09:00") y horas fuera del día. Comprueba que
+compactar_reservas() termina la conversión, que aparta exactamente esas
+reservas en reserva_descartada con sus horas originales y que el resto
+conserva aparato, día, hora y cliente.
+
+Termina con código 1 si algún caso no da lo esperado.
+
+Uso:
+    python benchmarks/check_compactar.py
+"""
+
+import sys
+
+from comun import crear_bd_sintetica
+
+# (id_aparato, dia_semana, hora_inicio, hora_fin) que no caben en una franja
+NO_CONVERTIBLES = [
+    (1, 1, "09:15", "09:45"),
+    (1, 1, "9:00", "9:30"),
+    (2, 3, "23:59", "00:29"),
+    (2, 3, "25:00", "25:30"),
+]
+CONVERTIBLES = [
+    (1, 1, "09:00", "09:30"),
+    (2, 3, "23:30", "00:00"),
+]
+
+
+def reservas(db, tabla="reserva"):
+    """Conjunto de (id_cliente, id_aparato, dia_semana, hora_inicio, hora_fin)"""
+    return set(tuple(fila) for fila in db.fetch_all(
+        f"SELECT id_cliente, id_aparato, dia_semana, hora_inicio, hora_fin FROM {tabla}"
+    ))
+
+
+def main():
+    fallos = []
+    db = crear_bd_sintetica(50, num_aparatos=5, ocupacion=0.0)
+    with db.conexion() as conexion:
+        for id_aparato, dia, inicio, fin in CONVERTIBLES + NO_CONVERTIBLES:
+            conexion.execute(
+                "INSERT INTO reserva (id_cliente, id_aparato, dia_semana, hora_inicio, hora_fin) "
+                "VALUES (1, ?, ?, ?, ?)", (id_aparato, dia, inicio, fin)
+            )
+        conexion.commit()
+    antes = reservas(db)
+    esperadas = set((1,) + r for r in CONVERTIBLES)
+    apartadas = set((1,) + r for r in NO_CONVERTIBLES)
+    
+    if not db.compactar_reservas():
+        fallos.append("compactar_reservas no terminó la conversión")
+    elif not db.fetch_one("SELECT 1 FROM sqlite_master WHERE name = 'reserva' AND type = 'view'"):
+        fallos.append("reserva no es una vista tras compactar")
+    else:
+        if reservas(db) != esperadas:
+            fallos.append(f"reservas convertidas {sorted(reservas(db))}, se esperaban {sorted(esperadas)}")
+        if reservas(db, "reserva_descartada") != apartadas:
+            fallos.append(f"reservas apartadas {sorted(reservas(db, 'reserva_descartada'))}, "
+                          f"se esperaban {sorted(apartadas)}")
+        if reservas(db) | reservas(db, "reserva_descartada") != antes:
+            fallos.append("se han perdido reservas al compactar")
+        if db.fetch_one("SELECT COUNT(*) FROM reserva_descartada WHERE motivo = ''")[0]:
+            fallos.append("hay reservas apartadas sin motivo")
+        # El disparador de la vista tampoco acepta horas fuera de franja
+        try:
+            with db.conexion() as conexion:
+                conexion.execute(
+                    "INSERT INTO reserva (id_cliente, id_aparato, dia_semana, hora_inicio, hora_fin) "
+                    "VALUES (1, 3, 2, '10:15', '10:45')"
+                )
+            fallos.append("la vista reserva acepta la hora 10:15")
+        except Exception:
+            pass
+        if db.compactar_reservas() is not True:
+            fallos.append("compactar_reservas falla si ya está compactado")
+    db.disconnect()
+    
+    if fallos:
+        print("FALLO:\n  " + "\n  ".join(fallos))
+        sys.exit(1)
+    print("Las reservas que no caben en una franja se apartan sin abortar la conversión")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Comprobación del índice de disponibilidad con dos instancias
+
+Abre dos DatabaseManager sobre el mismo fichero, como dos puestos de la
+GUI, y comprueba que cada uno ve las escrituras del otro: reservas,
+cancelaciones y aparatos nuevos. También comprueba que las reservas
+propias no obligan a recargar el índice (se cuentan las cargas) y que
+un aparato dado de baja se consulta en SQL en lugar de darse por libre.
+Se repite con el esquema compacto de reservas.
+
+Termina con código 1 si alguna respuesta no coincide con la base de datos.
+
+Uso:
+    python benchmarks/check_disponibilidad.py
+"""
+
+import sys
+
+from comun import crear_bd_sintetica, ruta_temporal
+from database.db_manager import DatabaseManager
+from database.disponibilidad import IndiceDisponibilidad
+
+
+def contar_cargas():
+    """Sustituye IndiceDisponibilidad.cargar por una versión que se cuenta"""
+    cargas = [0]
+    original = IndiceDisponibilidad.cargar
+    
+    def cargar(self, *args, **kwargs):
+        cargas[0] += 1
+        return original(self, *args, **kwargs)
+    
+    IndiceDisponibilidad.cargar = cargar
+    return cargas
+
+
+def comprobar(compacto, cargas):
+    """Devuelve la lista de fallos con o sin el esquema compacto"""
+    ruta = ruta_temporal("disponibilidad_compartida.db")
+    a = crear_bd_sintetica(200, num_aparatos=10, ocupacion=0.3, ruta=ruta)
+    if compacto:
+        a.compactar_reservas()
+    b = DatabaseManager(ruta)
+    b.connect()
+    b.migrar()
+    
+    fallos = []
+    nombre = "compacto" if compacto else "texto"
+    id_cliente = 1
+    libre = a.obtener_franjas_libres(1, 5)[0]
+    b.verificar_disponibilidad(1, 5, libre)  # Carga el índice de B
+    
+    # Reserva de A vista por B
+    id_reserva = a.insertar_reserva(id_cliente, 1, 5, libre)
+    if b.verificar_disponibilidad(1, 5, libre):
+        fallos.append(f"{nombre}: B da libre la franja que acaba de reservar A")
+    if libre in b.obtener_franjas_libres(1, 5):
+        fallos.append(f"{nombre}: B lista como libre la franja reservada por A")
+    
+    # Cancelación de A vista por B
+    a.cancelar_reserva(id_reserva)
+    if not b.verificar_disponibilidad(1, 5, libre):
+        fallos.append(f"{nombre}: B no ve la cancelación de A")
+    
+    # Aparato nuevo de A conocido por B
+    nuevo = a.insertar_aparato("Aparato de otro puesto", "Cardio")
+    if a.insertar_reserva(id_cliente, nuevo, 2, "10:00") is None:
+        fallos.append(f"{nombre}: A no puede reservar su aparato nuevo")
+    if b.verificar_disponibilidad(nuevo, 2, "10:00"):
+        fallos.append(f"{nombre}: B da libre una franja del aparato nuevo de A")
+    if nuevo not in [ap['aparato_id'] for ap in b.buscar_aparatos_libres("Cardio", 2, ["11:00"])]:
+        fallos.append(f"{nombre}: B no encuentra el aparato nuevo de A")
+    
+    # Aparato dado de baja: el índice no lo conoce y se consulta en SQL
+    a.eliminar_aparato(nuevo)
+    if b.verificar_disponibilidad(nuevo, 2, "10:00"):
+        fallos.append(f"{nombre}: se da libre una franja reservada de un aparato de baja")
+    
+    # Las reservas propias actualizan el índice sin recargarlo
+    b.verificar_disponibilidad(2, 1, "07:00")
+    antes = cargas[0]
+    for hora in b.obtener_franjas_libres(2, 3)[:5]:
+        if b.reservar_bloque(id_cliente, 2, 3, [hora]) != []:
+            fallos.append(f"{nombre}: B no puede reservar la franja libre {hora}")
+        if b.verificar_disponibilidad(2, 3, hora):
+            fallos.append(f"{nombre}: B da libre la franja {hora} que acaba de reservar")
+    if cargas[0] != antes:
+        fallos.append(f"{nombre}: las reservas propias recargaron el índice {cargas[0] - antes} veces")
+    
+    print(f"{nombre:<8} {len(fallos)} fallos")
+    a.disconnect()
+    b.disconnect()
+    return fallos
+
+
+def main():
+    cargas = contar_cargas()
+    fallos = comprobar(False, cargas) + comprobar(True, cargas)
+    print()
+    if fallos:
+        print("FALLO:\n  " + "\n  ".join(fallos))
+        sys.exit(1)
+    print("Cada instancia ve las escrituras de la otra")
+
+
+if __name__ == "__main__":
+    main()
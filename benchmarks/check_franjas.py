@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Comprobación de las tablas de franjas horarias
+
+Compara hora_fin con el cálculo anterior (hora de inicio + 30 minutos con
+datetime) en las 48 franjas, incluida la de las 23:30, que termina a las
+00:00. Comprueba que las horas que no son inicio de franja ("09:15") o que
+están fuera del día ("24:00", "25:10", "-1:00", "abc") se rechazan con
+ValueError, tanto en utils.franjas como al reservar con DatabaseManager,
+sin llegar a insertar nada.
+
+Termina con código 1 si algún caso no da lo esperado.
+
+Uso:
+    python benchmarks/check_franjas.py
+"""
+
+import sys
+from datetime import datetime, timedelta
+
+from comun import crear_bd_sintetica
+from utils.franjas import HORAS, hora_fin, indice_franja, indice_franja_exacta, etiqueta_franja
+
+FUERA_DE_REJILLA = ["09:15", "10:45", "23:59", "9:00", "09:00:00"]
+FUERA_DEL_DIA = ["24:00", "25:10", "-1:00", "12:60", "abc", ""]
+
+
+def hora_fin_anterior(hora_inicio):
+    """Cálculo de _calcular_hora_fin antes de las tablas de franjas"""
+    h, m = map(int, hora_inicio.split(':'))
+    return (datetime(2024, 1, 1, h, m) + timedelta(minutes=30)).strftime("%H:%M")
+
+
+def rechaza(funcion, *args):
+    """Indica si la llamada lanza ValueError (y no otra excepción)"""
+    try:
+        funcion(*args)
+    except ValueError:
+        return True
+    except Exception as e:
+        print(f"  {funcion.__name__}{args}: {type(e).__name__}: {e}")
+        return False
+    return False
+
+
+def main():
+    fallos = []
+    
+    for hora in HORAS:
+        if hora_fin(hora) != hora_fin_anterior(hora):
+            fallos.append(f"hora_fin({hora!r}) = {hora_fin(hora)!r}, antes {hora_fin_anterior(hora)!r}")
+    if hora_fin("23:30") != "00:00" or etiqueta_franja("23:30") != "23:30 - 00:00":
+        fallos.append("la franja de las 23:30 no termina a las 00:00")
+    
+    for hora in FUERA_DE_REJILLA + FUERA_DEL_DIA:
+        for funcion in (hora_fin, etiqueta_franja, indice_franja_exacta):
+            if not rechaza(funcion, hora):
+                fallos.append(f"{funcion.__name__}({hora!r}) no lanza ValueError")
+    for hora in FUERA_DEL_DIA:
+        if not rechaza(indice_franja, hora):
+            fallos.append(f"indice_franja({hora!r}) no lanza ValueError")
+    # Al leer reservas guardadas, una hora intermedia cae en su franja
+    if indice_franja("09:15") != 18 or indice_franja("09:00:00") != 18:
+        fallos.append("indice_franja no sitúa las horas intermedias en su franja")
+    
+    db = crear_bd_sintetica(10, num_aparatos=2, ocupacion=0.0)
+    for hora in FUERA_DE_REJILLA + FUERA_DEL_DIA:
+        for nombre, reservar in (
+            ("insertar_reserva", lambda: db.insertar_reserva(1, 1, 1, hora)),
+            ("insertar_reservas_bulk", lambda: db.insertar_reservas_bulk([(1, 2, 1, "08:00"),
+                                                                         (1, 1, 1, hora)])),
+            ("reservar_bloque", lambda: db.reservar_bloque(1, 1, 1, ["08:00", hora])),
+        ):
+            if not rechaza(reservar):
+                fallos.append(f"{nombre} con {hora!r} no lanza ValueError")
+    reservas = db.fetch_one("SELECT COUNT(*) FROM reserva")[0]
+    if reservas:
+        fallos.append(f"quedaron {reservas} reservas de llamadas rechazadas")
+    if db.insertar_reserva(1, 1, 1, "23:30") is None:
+        fallos.append("no se puede reservar la franja de las 23:30")
+    elif db.fetch_one("SELECT hora_fin FROM reserva WHERE hora_inicio = '23:30'")[0] != "00:00":
+        fallos.append("la reserva de las 23:30 no termina a las 00:00")
+    db.disconnect()
+    
+    if fallos:
+        print("FALLO:\n  " + "\n  ".join(fallos))
+        sys.exit(1)
+    print("Las franjas coinciden con el cálculo anterior y se rechazan las horas no válidas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Comprobación de índices de las consultas frecuentes de DatabaseManager
+
+Genera una base de datos con unas 100.000 reservas y 120.000 recibos,
+ejecuta las operaciones frecuentes de la aplicación capturando el SQL
+que lanzan y revisa el EXPLAIN QUERY PLAN de cada sentencia: ninguna
+puede recorrer entera las tablas reserva, recibo o cliente. Las tablas
+de catálogo pequeñas (aparato, usuario) pueden recorrerse.
+
+Con --compacto las reservas se pasan antes al esquema compacto
+(DatabaseManager.compactar_reservas) y se comprueba reserva_franja.
+
+Termina con código 1 si alguna consulta hace un recorrido completo.
+
+Uso:
+    python benchmarks/check_indices.py [num_aparatos] [num_clientes] [--compacto]
+"""
+
+import sys
+
+from comun import crear_bd_sintetica, crear_recibos_sinteticos
+from database.db_manager import CuotaExcedida
+
+# Tablas grandes que no deben recorrerse enteras (con sus alias en db_manager)
+TABLAS_GRANDES = {"reserva", "r", "reserva_franja", "recibo", "cliente", "c"}
+
+
+def comprobar_cuotas(db, id_cliente, id_aparato, dia):
+    """Consulta de cuotas que hace cada reserva (sin llegar a reservar)"""
+    with db.conexion() as conn:
+        try:
+            db._comprobar_cuotas(conn, id_cliente, id_aparato, [dia])
+        except CuotaExcedida:
+            pass
+
+
+def operaciones_frecuentes(db):
+    """Devuelve las operaciones a comprobar como pares (nombre, función)"""
+    ultima = db.obtener_reservas(dia=2, limite=200)[-1]
+    return [
+        ("verificar_disponibilidad", lambda: db.verificar_disponibilidad(3, 2, "10:00")),
+        ("cuotas de reserva", lambda: comprobar_cuotas(db, 42, 7, 2)),
+        ("obtener_reservas_por_dia", lambda: db.obtener_reservas_por_dia(2)),
+        ("obtener_reservas(dia, despues_de)",
+         lambda: db.obtener_reservas(dia=2, limite=200, despues_de=ultima)),
+        ("obtener_reservas(aparato)", lambda: db.obtener_reservas(aparato=7)),
+        ("obtener_reservas(cliente)", lambda: db.obtener_reservas(cliente=42)),
+        ("obtener_reservas_cliente", lambda: db.obtener_reservas_cliente(42)),
+        ("obtener_ocupacion_aparatos_por_dia",
+         lambda: db.obtener_ocupacion_aparatos_por_dia(3, 'Cardio')),
+        ("obtener_cliente_por_dni", lambda: db.obtener_cliente_por_dni("00000042X")),
+        ("obtener_cliente_por_email", lambda: db.obtener_cliente_por_email("c42@gym.com")),
+        ("obtener_recibos_pendientes(cliente)", lambda: db.obtener_recibos_pendientes(42)),
+        ("obtener_recibos_por_cliente", lambda: db.obtener_recibos_por_cliente(42)),
+        ("obtener_clientes_morosos", db.obtener_clientes_morosos),
+        ("obtener_clientes_al_corriente(mes, anio)",
+         lambda: db.obtener_clientes_al_corriente(3, 2024)),
+        ("obtener_clientes_al_corriente(limite)",
+         lambda: db.obtener_clientes_al_corriente(limite=200)),
+        ("obtener_todos_recibos(mes, anio)", lambda: db.obtener_todos_recibos(3, 2024)),
+        ("obtener_recibos(mes, anio, limite)", lambda: db.obtener_recibos(3, 2024, limite=200)),
+        ("resumen_recibos", db.resumen_recibos),
+        ("resumen_recibos(mes, anio)", lambda: db.resumen_recibos(3, 2024)),
+    ]
+
+
+def recorridos_completos(conn, sentencia):
+    """Devuelve las líneas del plan que recorren entera una tabla grande"""
+    recorridos = []
+    for fila in conn.execute("EXPLAIN QUERY PLAN " + sentencia):
+        detalle = fila[3]
+        partes = detalle.split()
+        if (len(partes) >= 2 and partes[0] == "SCAN" and "USING" not in partes
+                and partes[1] in TABLAS_GRANDES):
+            recorridos.append(detalle)
+    return recorridos
+
+
+def main():
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    num_aparatos = int(argumentos[0]) if len(argumentos) > 0 else 440
+    num_clientes = int(argumentos[1]) if len(argumentos) > 1 else 5000
+    
+    print(f"Generando {num_aparatos} aparatos y {num_clientes} clientes...")
+    db = crear_bd_sintetica(num_clientes, num_aparatos, ocupacion=0.95)
+    db.configurar_cuotas(por_dia=4, por_semana=12)  # Para que la consulta de cuotas se ejecute
+    if "--compacto" in sys.argv:
+        db.compactar_reservas()
+    num_recibos = crear_recibos_sinteticos(db, num_meses=24)
+    num_reservas = db.fetch_one("SELECT COUNT(*) FROM reserva")[0]
+    print(f"{num_reservas} reservas, {num_recibos} recibos\n")
+    
+    fallos = 0
+    for nombre, operacion in operaciones_frecuentes(db):
+        sentencias = []
+        
+        def traza(sentencia):
+            if sentencia.lstrip().upper().startswith("SELECT") and sentencia.strip() != "SELECT 1":
+                sentencias.append(sentencia)
+        
+        db.set_trace_callback(traza)
+        try:
+            operacion()
+        finally:
+            db.set_trace_callback(None)
+        
+        with db.conexion() as conn:
+            recorridos = [r for s in sentencias for r in recorridos_completos(conn, s)]
+        
+        if recorridos:
+            fallos += 1
+            print(f"  FALLO {nombre}: {'; '.join(recorridos)}")
+        else:
+            print(f"  ok    {nombre} ({len(sentencias)} consulta/s)")
+    
+    db.disconnect()
+    print()
+    if fallos:
+        print(f"{fallos} consulta/s recorren tablas completas")
+        sys.exit(1)
+    print("Ninguna consulta frecuente recorre tablas completas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Comprobación del resumen de deuda saldo_cliente
+
+Genera clientes con 24 meses de recibos y aplica una mezcla aleatoria de
+escrituras sobre recibo (pagos, recibos nuevos, cambios de importe,
+devoluciones, borrados de recibos y de clientes) por DatabaseManager y
+con SQL directo. Después de cada tanda comprueba con verificar_saldos
+que saldo_cliente coincide con los recibos pendientes, y al final
+estropea algunos saldos a propósito para comprobar que se detectan y se
+reparan. También compara el tiempo del listado de morosos con la
+consulta anterior (JOIN + GROUP BY sobre recibo).
+
+Termina con código 1 si algún saldo no cuadra.
+
+Uso:
+    python benchmarks/check_saldos.py [num_clientes]
+"""
+
+import random
+import sys
+
+from comun import crear_bd_sintetica, crear_recibos_sinteticos, cronometrar
+
+
+def morosos_agrupando(db):
+    """Consulta anterior de obtener_clientes_morosos"""
+    return db.fetch_all("""
+        SELECT c.id_cliente, c.nombre, c.apellidos, c.dni, c.telefono, c.email,
+               COUNT(r.id_recibo) as num_recibos_pendientes,
+               SUM(r.importe) as total_adeudado
+        FROM cliente c
+        JOIN recibo r ON c.id_cliente = r.id_cliente
+        WHERE r.pagado = 0 AND c.activo = 1
+        GROUP BY c.id_cliente
+        ORDER BY total_adeudado DESC
+    """)
+
+
+def escrituras(db, rnd, num_clientes):
+    """Una tanda de escrituras variadas sobre recibo"""
+    pendientes = [fila[0] for fila in db.fetch_all(
+        "SELECT id_recibo FROM recibo WHERE pagado = 0 LIMIT 2000")]
+    for id_recibo in rnd.sample(pendientes, min(200, len(pendientes))):
+        db.registrar_pago(id_recibo)
+    db.execute_query("UPDATE recibo SET importe = 33.33 WHERE id_cliente % 17 = ? AND pagado = 0",
+                     (rnd.randrange(17),))
+    db.execute_query("UPDATE recibo SET pagado = 0, fecha_pago = NULL "
+                     "WHERE id_cliente % 29 = ? AND mes = ?", (rnd.randrange(29), rnd.randint(1, 12)))
+    db.execute_query("UPDATE recibo SET mes = 12, anio = 2030 WHERE id_recibo = ?",
+                     (rnd.choice(pendientes),))
+    db.execute_query("DELETE FROM recibo WHERE id_cliente % 31 = ? AND mes = ?",
+                     (rnd.randrange(31), rnd.randint(1, 12)))
+    db.eliminar_cliente_fisico(rnd.randint(1, num_clientes))
+    db.generar_recibos_periodo(2025 + rnd.randrange(3), 49.99, meses=[rnd.randint(1, 12)])
+
+
+def main():
+    num_clientes = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rnd = random.Random(11)
+    
+    db = crear_bd_sintetica(num_clientes, num_aparatos=10, ocupacion=0.0)
+    num_recibos = crear_recibos_sinteticos(db, num_meses=24)
+    print(f"{num_clientes} clientes, {num_recibos} recibos")
+    
+    fallos = []
+    for tanda in range(5):
+        escrituras(db, rnd, num_clientes)
+        descuadrados = db.verificar_saldos()
+        if descuadrados:
+            fallos.append(f"tanda {tanda}: {len(descuadrados)} saldos no cuadran "
+                          f"(clientes {descuadrados[:10]})")
+    
+    antes = [(m['id_cliente'], m['num_recibos_pendientes'], round(m['total_adeudado'], 2))
+             for m in morosos_agrupando(db)]
+    ahora = [(m['id_cliente'], m['num_recibos_pendientes'], m['total_adeudado'])
+             for m in db.obtener_clientes_morosos()]
+    if sorted(antes) != sorted(ahora):
+        fallos.append("obtener_clientes_morosos no coincide con la consulta agrupando recibos")
+    
+    # Saldos estropeados a propósito: uno cambiado, uno borrado, uno que sobra
+    db.execute_query("UPDATE saldo_cliente SET total_adeudado = total_adeudado + 1 "
+                     "WHERE id_cliente = (SELECT MIN(id_cliente) FROM saldo_cliente)")
+    db.execute_query("DELETE FROM saldo_cliente WHERE id_cliente = (SELECT MAX(id_cliente) FROM saldo_cliente)")
+    db.execute_query("INSERT OR IGNORE INTO saldo_cliente VALUES (?, 1, 10, 202401)", (num_clientes,))
+    estropeados = db.verificar_saldos(reparar=True)
+    if not estropeados or len(estropeados) < 2:
+        fallos.append(f"no se detectaron los saldos estropeados ({estropeados})")
+    if db.verificar_saldos():
+        fallos.append("verificar_saldos(reparar=True) no dejó los saldos cuadrados")
+    
+    t_antes = cronometrar(lambda: morosos_agrupando(db), repeticiones=5)
+    t_ahora = cronometrar(db.obtener_clientes_morosos, repeticiones=5)
+    t_verificar = cronometrar(db.verificar_saldos)
+    print("-" * 60)
+    print(f"{'agrupando recibos':<22} {t_antes * 1000:>8.1f} ms")
+    print(f"{'saldo_cliente':<22} {t_ahora * 1000:>8.1f} ms   x{t_antes / t_ahora:.1f}")
+    print(f"{'verificar_saldos':<22} {t_verificar * 1000:>8.1f} ms")
+    
+    db.disconnect()
+    print()
+    if fallos:
+        print("FALLO:\n  " + "\n  ".join(fallos))
+        sys.exit(1)
+    print("Los saldos coinciden con los recibos pendientes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+GymForTheMoment - Utilidades comunes para los benchmarks
+Generación de bases de datos sintéticas y medición de consultas
+"""
+
+import os
+import sys
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+
+# Añadir src/ al path para importar los módulos de la aplicación
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from database.db_manager import DatabaseManager
+from utils.franjas import HORAS, HORAS_FIN
+
+TIPOS_APARATO = ['Cardio', 'Musculación', 'Funcional']
+
+
+def ruta_temporal(nombre: str = "bench.db") -> str:
+    """Devuelve una ruta a un fichero de base de datos en un directorio temporal"""
+    return os.path.join(tempfile.mkdtemp(prefix="gym_bench_"), nombre)
+
+
+def crear_bd_sintetica(num_clientes: int = 100, num_aparatos: int = 20,
+                       ocupacion: float = 0.3, ruta: str = None,
+                       semilla: int = 42) -> DatabaseManager:
+    """
+    Crea una base de datos con clientes, aparatos y reservas aleatorias.
+    
+    Args:
+        num_clientes: Número de clientes a generar
+        num_aparatos: Número de aparatos a generar
+        ocupacion: Fracción de franjas semanales reservadas por aparato
+        ruta: Ruta del fichero (por defecto, uno temporal)
+        semilla: Semilla del generador aleatorio
+        
+    Returns:
+        DatabaseManager conectado a la base de datos generada
+    """
+    rnd = random.Random(semilla)
+    db = DatabaseManager(ruta or ruta_temporal())
+    db.connect()
+    db.migrar()
+    
+    with db.conexion() as conn:
+        _poblar(conn, rnd, num_clientes, num_aparatos, ocupacion)
+    return db
+
+
+def _poblar(conn, rnd, num_clientes, num_aparatos, ocupacion):
+    """Inserta los datos sintéticos con una conexión del pool"""
+    conn.executemany(
+        "INSERT INTO cliente (nombre, apellidos, dni, telefono, email, fecha_alta, activo) "
+        "VALUES (?, ?, ?, ?, ?, '2024-01-01', 1)",
+        ((f"Cliente{i}", f"Apellido{i}", f"{i:08d}X", None, f"c{i}@gym.com")
+         for i in range(1, num_clientes + 1))
+    )
+    conn.executemany(
+        "INSERT INTO aparato (nombre, tipo, descripcion, activo) VALUES (?, ?, NULL, 1)",
+        ((f"Aparato {i}", TIPOS_APARATO[i % len(TIPOS_APARATO)])
+         for i in range(1, num_aparatos + 1))
+    )
+    reservas = []
+    for id_aparato in range(1, num_aparatos + 1):
+        for dia in range(1, 6):
+            for hora, fin in zip(HORAS, HORAS_FIN):
+                if rnd.random() < ocupacion:
+                    reservas.append((rnd.randint(1, num_clientes), id_aparato, dia, hora, fin))
+    conn.executemany(
+        "INSERT INTO reserva (id_cliente, id_aparato, dia_semana, hora_inicio, hora_fin) "
+        "VALUES (?, ?, ?, ?, ?)",
+        reservas
+    )
+    conn.commit()
+
+
+def crear_recibos_sinteticos(db: DatabaseManager, anio_inicio: int = 2023,
+                             num_meses: int = 24, pagados: float = 0.8,
+                             importe: float = 45.0, semilla: int = 42) -> int:
+    """
+    Genera un recibo por cliente y mes, pagado con la probabilidad indicada.
+    
+    Args:
+        db: Base de datos con los clientes ya creados
+        anio_inicio: Año del primer recibo (desde enero)
+        num_meses: Número de meses consecutivos a generar
+        pagados: Fracción de recibos marcados como pagados
+        importe: Importe de cada recibo
+        semilla: Semilla del generador aleatorio
+        
+    Returns:
+        Número de recibos insertados
+    """
+    rnd = random.Random(semilla)
+    periodos = [(anio_inicio + i // 12, i % 12 + 1) for i in range(num_meses)]
+    with db.conexion() as conn:
+        ids = [fila[0] for fila in conn.execute("SELECT id_cliente FROM cliente")]
+        filas = (
+            (id_cliente, mes, anio, importe, pagado, '2024-01-01' if pagado else None)
+            for id_cliente in ids
+            for anio, mes in periodos
+            for pagado in (1 if rnd.random() < pagados else 0,)
+        )
+        conn.executemany(
+            "INSERT INTO recibo (id_cliente, mes, anio, importe, pagado, fecha_pago) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            filas
+        )
+        conn.commit()
+    return len(ids) * len(periodos)
+
+
+@contextmanager
+def contar_consultas(db: DatabaseManager):
+    """
+    Cuenta las sentencias SQL ejecutadas sobre la conexión dentro del bloque.
+    
+    Uso:
+        with contar_consultas(db) as contador:
+            ...
+        print(contador['consultas'])
+    """
+    contador = {'consultas': 0}
+    
+    def traza(sentencia):
+        sentencia = sentencia.strip().upper()
+        # Ignorar control de transacciones y la comprobación del pool
+        if not sentencia.startswith(("PRAGMA", "BEGIN", "COMMIT")) and sentencia != "SELECT 1":
+            contador['consultas'] += 1
+    
+    db.set_trace_callback(traza)
+    try:
+        yield contador
+    finally:
+        db.set_trace_callback(None)
+
+
+def cronometrar(funcion, repeticiones: int = 1) -> float:
+    """Devuelve el tiempo medio en segundos de ejecutar funcion()"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones
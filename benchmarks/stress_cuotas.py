@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de estrés de las cuotas de reserva por cliente
+
+Muchos hilos reservan a la vez para los mismos clientes, cada uno en
+franjas y aparatos distintos (sin colisiones de franja), mezclando
+insertar_reserva y reservar_bloque. Al final se comprueba que ningún
+cliente supera sus cuotas por día, por semana ni por tipo de aparato, y
+que cada cliente llegó exactamente a su cuota semanal.
+
+Después aplica plantillas con cuotas, con ambos esquemas de reservas: la
+plantilla de un cliente que supera su cuota semanal se omite, sus franjas
+pasan a otra plantilla que las pide y las reservas que ya existían se
+conservan.
+
+Uso:
+    python benchmarks/stress_cuotas.py [num_hilos]
+"""
+
+import sys
+import threading
+import time
+
+from comun import ruta_temporal, HORAS, TIPOS_APARATO
+from database.db_manager import DatabaseManager, CuotaExcedida
+
+CUOTAS = {"por_dia": 3, "por_semana": 8, "por_tipo": {"Cardio": 5}}
+NUM_CLIENTES = 5
+
+
+def comprobar_plantillas(compacto):
+    """Devuelve la lista de fallos al aplicar plantillas con cuotas"""
+    nombre = "compacto" if compacto else "texto"
+    db = DatabaseManager(ruta_temporal(f"plantillas_cuotas_{nombre}.db"), cuotas=CUOTAS)
+    db.connect()
+    db.migrar()
+    if compacto:
+        db.compactar_reservas()
+    excedido, segundo, previo = [db.insertar_cliente(f"Plantilla{i}", "Cuota", f"{i:08d}P")
+                                 for i in range(3)]
+    id_aparato = db.insertar_aparato("Aparato de plantillas", "Musculación")
+    previas = {db.insertar_reserva(previo, id_aparato, 5, hora) for hora in HORAS[:2]}
+    
+    # Diez franjas superan la cuota semanal (tres por día como mucho)
+    franjas = [(dia, hora) for dia in range(1, 5) for hora in HORAS[2:5]][:10]
+    db.guardar_plantilla(excedido, id_aparato, franjas)
+    db.guardar_plantilla(segundo, id_aparato, franjas[:2])
+    resultado = db.aplicar_plantillas()
+    
+    fallos = []
+    if resultado is None:
+        return [f"{nombre}: aplicar_plantillas devolvió None"]
+    if [c['id_cliente'] for c in resultado['cuotas']] != [excedido]:
+        fallos.append(f"{nombre}: clientes omitidos {resultado['cuotas']}")
+    reservas = db.fetch_all("SELECT id_reserva, id_cliente, dia_semana, hora_inicio FROM reserva")
+    if {r['id_reserva'] for r in reservas if r['id_cliente'] == previo} != previas:
+        fallos.append(f"{nombre}: no se conservaron las reservas anteriores")
+    if any(r['id_cliente'] == excedido for r in reservas):
+        fallos.append(f"{nombre}: quedan reservas del cliente omitido")
+    if sorted((r['dia_semana'], r['hora_inicio']) for r in reservas
+              if r['id_cliente'] == segundo) != sorted(franjas[:2]):
+        fallos.append(f"{nombre}: el segundo cliente no recibió las franjas del omitido")
+    if resultado['insertadas'] != 2 or resultado['conflictos']:
+        fallos.append(f"{nombre}: {resultado['insertadas']} insertadas, "
+                      f"{len(resultado['conflictos'])} conflictos (se esperaban 2 y 0)")
+    db.disconnect()
+    return fallos
+
+
+def main():
+    num_hilos = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    
+    db = DatabaseManager(ruta_temporal(), cuotas=CUOTAS)
+    db.connect()
+    db.migrar()
+    clientes = [db.insertar_cliente(f"Cliente{i}", "Cuota", f"{i:08d}Q")
+                for i in range(NUM_CLIENTES)]
+    
+    errores = []
+    cerrojo = threading.Lock()
+    inicio_comun = threading.Barrier(num_hilos)
+    
+    def reservador(numero):
+        # Aparatos propios del hilo: las franjas nunca chocan entre hilos
+        propios = [db.insertar_aparato(f"Hilo {numero} {tipo}", tipo) for tipo in TIPOS_APARATO]
+        inicio_comun.wait()
+        for i, hora in enumerate(HORAS[::2]):
+            id_cliente = clientes[(numero + i) % NUM_CLIENTES]
+            id_aparato = propios[i % len(propios)]
+            dia = i % 5 + 1
+            try:
+                if i % 2:
+                    db.insertar_reserva(id_cliente, id_aparato, dia, hora)
+                else:
+                    db.reservar_bloque(id_cliente, id_aparato, dia, [hora])
+            except CuotaExcedida:
+                pass
+            except Exception as e:
+                with cerrojo:
+                    errores.append(repr(e))
+    
+    hilos = [threading.Thread(target=reservador, args=(i,)) for i in range(num_hilos)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+    
+    fallos = [f"excepción inesperada: {e}" for e in errores[:5]]
+    for id_cliente in clientes:
+        filas = db.fetch_all("""
+            SELECT r.dia_semana, a.tipo, COUNT(*) AS franjas FROM reserva r
+            JOIN aparato a ON r.id_aparato = a.id_aparato
+            WHERE r.id_cliente = ? GROUP BY r.dia_semana, a.tipo
+        """, (id_cliente,))
+        por_dia, por_tipo = {}, {}
+        for fila in filas:
+            por_dia[fila['dia_semana']] = por_dia.get(fila['dia_semana'], 0) + fila['franjas']
+            por_tipo[fila['tipo']] = por_tipo.get(fila['tipo'], 0) + fila['franjas']
+        total = sum(por_dia.values())
+        
+        if any(franjas > CUOTAS["por_dia"] for franjas in por_dia.values()):
+            fallos.append(f"cliente {id_cliente}: {por_dia} supera la cuota diaria")
+        if total != CUOTAS["por_semana"]:
+            fallos.append(f"cliente {id_cliente}: {total} franjas en la semana "
+                          f"(se esperaban {CUOTAS['por_semana']})")
+        for tipo, limite in CUOTAS["por_tipo"].items():
+            if por_tipo.get(tipo, 0) > limite:
+                fallos.append(f"cliente {id_cliente}: {por_tipo[tipo]} franjas de {tipo}")
+    
+    print(f"{num_hilos} hilos, {NUM_CLIENTES} clientes, cuotas {CUOTAS}: {segundos:.2f} s")
+    db.disconnect()
+    fallos += comprobar_plantillas(False) + comprobar_plantillas(True)
+    if fallos:
+        print("FALLO:\n  " + "\n  ".join(fallos))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
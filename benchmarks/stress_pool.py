@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de estrés del pool de conexiones de DatabaseManager
+
+Muchos hilos comparten una sola instancia de DatabaseManager: unos
+insertan reservas con insertar_reserva (compitiendo por las mismas
+franjas) y otros leen con obtener_reservas_por_dia. Al final se
+comprueba que cada franja se reservó exactamente una vez, que ninguna
+lectura vio filas corruptas y que el pool no superó su tamaño máximo.
+
+Uso:
+    python benchmarks/stress_pool.py [num_hilos] [max_conexiones]
+"""
+
+import sys
+import threading
+import time
+
+from comun import ruta_temporal, HORAS
+from database.db_manager import DatabaseManager
+
+
+def main():
+    num_hilos = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    max_conexiones = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    
+    db = DatabaseManager(ruta_temporal(), max_conexiones=max_conexiones)
+    db.connect()
+    db.migrar()
+    id_cliente = db.insertar_cliente("Stress", "Test", "00000000T")
+    aparatos = [db.insertar_aparato(f"Aparato {i}", "Cardio") for i in range(1, 5)]
+    
+    # Todas las franjas de lunes de los aparatos; cada escritor las intenta todas
+    franjas = [(id_aparato, hora) for id_aparato in aparatos for hora in HORAS]
+    creadas = []
+    errores = []
+    cerrojo = threading.Lock()
+    inicio_comun = threading.Barrier(num_hilos)
+    
+    def escritor(desplazamiento):
+        inicio_comun.wait()
+        propias = []
+        for i in range(len(franjas)):
+            id_aparato, hora = franjas[(i + desplazamiento) % len(franjas)]
+            id_reserva = db.insertar_reserva(id_cliente, id_aparato, 1, hora)
+            if id_reserva:
+                propias.append((id_aparato, hora))
+        with cerrojo:
+            creadas.extend(propias)
+    
+    def lector():
+        inicio_comun.wait()
+        for _ in range(200):
+            for reserva in db.obtener_reservas_por_dia(1):
+                if reserva['dia_semana'] != 1 or reserva['cliente_nombre'] != "Stress":
+                    with cerrojo:
+                        errores.append(dict(reserva))
+    
+    hilos = [threading.Thread(target=escritor, args=(i * 7,)) for i in range(num_hilos // 2)]
+    hilos += [threading.Thread(target=lector) for _ in range(num_hilos - len(hilos))]
+    
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+    
+    reservas = db.obtener_reservas_por_dia(1)
+    fallos = []
+    if sorted(creadas) != sorted(franjas):
+        fallos.append(f"{len(creadas)} reservas creadas para {len(franjas)} franjas")
+    if len(reservas) != len(franjas):
+        fallos.append(f"{len(reservas)} reservas en la base de datos para {len(franjas)} franjas")
+    if errores:
+        fallos.append(f"{len(errores)} filas inconsistentes leídas")
+    if db._pool.conexiones_abiertas > max_conexiones:
+        fallos.append(f"{db._pool.conexiones_abiertas} conexiones abiertas (máximo {max_conexiones})")
+    
+    print(f"{num_hilos} hilos, pool de {max_conexiones} conexiones: {segundos:.2f} s")
+    db.disconnect()
+    if fallos:
+        print("FALLO:\n  " + "\n  ".join(fallos))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
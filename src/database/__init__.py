@@ -3,4 +3,6 @@
 GymForTheMoment - Módulo de Base de Datos
 """
 
-from .db_manager import DatabaseManager, db
+from .db_manager import DatabaseManager, db, PERFILES_PRAGMA, CuotaExcedida
+from .pool import ConnectionPool
+from .migraciones import MIGRACIONES, aplicar_migraciones
@@ -5,144 +5,453 @@ Módulo para la gestión de la base de datos SQLite
 """
 
 import sqlite3
-from datetime import datetime, date, time, timedelta
-from typing import List, Optional, Tuple, Any
+import threading
+from contextlib import contextmanager
+from datetime import datetime, date, time
+from itertools import groupby
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 import os
 
+from .pool import ConnectionPool
+from .migraciones import (
+    aplicar_migraciones, compactar_reservas, reservas_compactas,
+    id_reserva_compacta, clave_reserva_compacta, SALDOS_DESDE_RECIBOS
+)
+from .disponibilidad import IndiceDisponibilidad
+from utils.franjas import HORAS, hora_fin, indice_franja, indice_franja_exacta
+
+
+# Clientes morosos desde el resumen saldo_cliente, de mayor a menor deuda
+CONSULTA_MOROSOS = """
+    SELECT c.id_cliente, c.nombre, c.apellidos, c.dni, c.telefono, c.email,
+           s.num_recibos_pendientes, s.total_adeudado, s.primer_pendiente
+    FROM saldo_cliente s
+    JOIN cliente c ON c.id_cliente = s.id_cliente
+    WHERE c.activo = 1
+    ORDER BY s.total_adeudado DESC
+"""
+
+# Perfiles de rendimiento de SQLite aplicados al conectar.
+# Las PRAGMA se aplican en el orden indicado (journal_mode primero).
+PERFILES_PRAGMA = {
+    # Máxima durabilidad: cada commit se sincroniza por completo a disco
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -8000,         # 8 MB
+        "temp_store": "DEFAULT",
+    },
+    # Uso normal en recepción: WAL permite lectores y un escritor a la vez
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32000,        # 32 MB
+        "mmap_size": 268435456,      # 256 MB
+        "temp_store": "MEMORY",
+    },
+    # Cargas masivas: sin sincronizar a disco, solo para importaciones
+    "bulk-load": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -128000,       # 128 MB
+        "mmap_size": 1073741824,     # 1 GB
+        "temp_store": "MEMORY",
+    },
+}
+
+PERFIL_POR_DEFECTO = "fast"
+
+# Conexiones simultáneas por defecto (GUI + hilos en segundo plano)
+MAX_CONEXIONES = 8
+
+
+# Límites de reservas por cliente (None = sin límite). "por_tipo" limita
+# las franjas semanales en aparatos de cada tipo, p. ej. {"Cardio": 6}.
+# Por defecto no hay límites; cada gimnasio los activa con el parámetro
+# cuotas del constructor o con configurar_cuotas, p. ej.
+# {"por_dia": 4, "por_semana": 12, "por_tipo": {}}.
+SIN_CUOTAS = {"por_dia": None, "por_semana": None, "por_tipo": {}}
+
+
+class CuotaExcedida(Exception):
+    """La reserva superaría alguno de los límites de reservas del cliente"""
+
+
+class _BloqueConColisiones(Exception):
+    """Uso interno: deshace reservar_bloque cuando alguna franja está ocupada"""
+
 
 class DatabaseManager:
-    """Clase para gestionar la conexión y operaciones con la base de datos SQLite"""
+    """
+    Clase para gestionar la conexión y operaciones con la base de datos SQLite.
+    
+    Las conexiones salen de un ConnectionPool: cada operación toma una
+    conexión libre y la devuelve al terminar, y un bloque transaction()
+    la retiene para el hilo que lo ejecuta. Así la misma instancia puede
+    usarse a la vez desde la GUI y desde hilos en segundo plano.
+    """
     
-    def __init__(self, db_path: str = "gym_database.db"):
+    def __init__(self, db_path: str = "gym_database.db", perfil: str = PERFIL_POR_DEFECTO,
+                 max_conexiones: int = MAX_CONEXIONES, cuotas: dict = None):
         """
         Inicializa el gestor de base de datos.
         
         Args:
             db_path: Ruta al archivo de base de datos SQLite
+            perfil: Perfil de rendimiento de PERFILES_PRAGMA ("safe", "fast", "bulk-load")
+            max_conexiones: Tamaño máximo del pool de conexiones
+            cuotas: Límites de reservas por cliente (por defecto, SIN_CUOTAS)
         """
+        if perfil not in PERFILES_PRAGMA:
+            raise ValueError(f"Perfil de base de datos desconocido: {perfil}")
         self.db_path = db_path
-        self.connection = None
-        self.cursor = None
+        self.perfil = perfil
+        # Una base de datos en memoria solo existe dentro de su conexión
+        self.max_conexiones = 1 if db_path == ":memory:" else max_conexiones
+        self._pool = None
+        self._local = threading.local()
+        # Índice de disponibilidad en memoria (se carga al usarse por primera vez)
+        # con el PRAGMA data_version de la base de datos en que se cargó
+        self._disponibilidad = None
+        self._version_disponibilidad = None
+        self._lock_disponibilidad = threading.Lock()
+        # Conexión que solo lee PRAGMA data_version (ver _version_datos)
+        self._vigia = None
+        self._lock_vigia = threading.Lock()
+        # Esquema compacto de reservas (se detecta al migrar)
+        self.reservas_compactas = False
+        self.configurar_cuotas(**(cuotas or SIN_CUOTAS))
         
     def connect(self):
         """Establece la conexión con la base de datos"""
         try:
-            self.connection = sqlite3.connect(self.db_path)
-            self.connection.row_factory = sqlite3.Row
-            self.cursor = self.connection.cursor()
-            # Habilitar claves foráneas
-            self.cursor.execute("PRAGMA foreign_keys = ON")
+            self._pool = ConnectionPool(self._crear_conexion, self.max_conexiones)
+            # Abrir la primera conexión para detectar errores al arrancar
+            with self._pool.conexion():
+                pass
             return True
         except sqlite3.Error as e:
             print(f"Error al conectar a la base de datos: {e}")
+            self._pool = None
             return False
     
+    def preparar(self) -> bool:
+        """
+        Deja la base de datos lista para la aplicación: conecta, migra el
+        esquema y crea el administrador inicial si no existe.
+        
+        Returns:
+            True si la base de datos está lista
+        """
+        if not self.connect() or not self.migrar():
+            return False
+        self.crear_admin_inicial()
+        return True
+    
+    def _crear_conexion(self) -> sqlite3.Connection:
+        """Abre y configura una conexión nueva para el pool"""
+        conexion = sqlite3.connect(self.db_path, check_same_thread=False)
+        conexion.row_factory = sqlite3.Row
+        # Habilitar claves foráneas
+        conexion.execute("PRAGMA foreign_keys = ON")
+        self._aplicar_pragmas(conexion, self.perfil)
+        return conexion
+    
+    @staticmethod
+    def _aplicar_pragmas(conexion: sqlite3.Connection, perfil: str):
+        """Aplica las PRAGMA de un perfil a una conexión"""
+        for pragma, valor in PERFILES_PRAGMA[perfil].items():
+            conexion.execute(f"PRAGMA {pragma} = {valor}")
+    
+    def aplicar_perfil(self, perfil: str):
+        """
+        Aplica un perfil de rendimiento a las conexiones del pool.
+        
+        Args:
+            perfil: Nombre del perfil en PERFILES_PRAGMA
+        """
+        if perfil not in PERFILES_PRAGMA:
+            raise ValueError(f"Perfil de base de datos desconocido: {perfil}")
+        self.perfil = perfil
+        if self._pool:
+            self._pool.reconfigurar(lambda conexion: self._aplicar_pragmas(conexion, perfil))
+    
     def disconnect(self):
-        """Cierra la conexión con la base de datos"""
-        if self.connection:
-            self.connection.close()
-            self.connection = None
-            self.cursor = None
+        """Cierra todas las conexiones con la base de datos"""
+        if self._pool:
+            self._pool.cerrar()
+            self._pool = None
+        with self._lock_vigia:
+            if self._vigia is not None:
+                self._vigia.close()
+                self._vigia = None
+    
+    @contextmanager
+    def conexion(self):
+        """
+        Proporciona una conexión para el bloque.
+        
+        Dentro de transaction() devuelve la conexión de la transacción del
+        hilo actual; fuera, toma una del pool y la libera al salir.
+        """
+        propia = getattr(self._local, 'conexion', None)
+        if propia is not None:
+            yield propia
+            return
+        if self._pool is None:
+            raise sqlite3.ProgrammingError("La base de datos no está conectada")
+        with self._pool.conexion() as conexion:
+            yield conexion
+    
+    def set_trace_callback(self, funcion):
+        """Instala una función de traza SQL en todas las conexiones (depuración)"""
+        if self._pool:
+            self._pool.set_trace_callback(funcion)
+    
+    @property
+    def _nivel_transaccion(self) -> int:
+        """Nivel de anidamiento de transaction() en el hilo actual"""
+        return getattr(self._local, 'nivel', 0)
     
     def execute_query(self, query: str, params: tuple = ()) -> Optional[sqlite3.Cursor]:
         """
-        Ejecuta una consulta SQL.
+        Ejecuta una sentencia de escritura y confirma la transacción.
+        
+        Las consultas de solo lectura deben usar fetch_all/fetch_one,
+        que no abren ni confirman transacciones. Dentro de un bloque
+        transaction() no se confirma nada y los errores se propagan.
+        
+        Args:
+            query: Sentencia SQL a ejecutar
+            params: Parámetros de la sentencia
+            
+        Returns:
+            Cursor con lastrowid/rowcount de la sentencia o None si hay error
+        """
+        try:
+            with self.conexion() as conexion:
+                cursor = conexion.execute(query, params)
+                if not self._nivel_transaccion:
+                    conexion.commit()
+                return cursor
+        except sqlite3.Error as e:
+            if self._nivel_transaccion:
+                # Dentro de transaction() el error debe deshacer el bloque
+                raise
+            print(f"Error al ejecutar consulta: {e}")
+            return None
+    
+    def _execute_many(self, query: str, filas) -> sqlite3.Cursor:
+        """
+        Ejecuta una sentencia para muchas filas (usar dentro de transaction()).
+        
+        Returns:
+            Cursor con el rowcount acumulado
+        """
+        with self.conexion() as conexion:
+            return conexion.executemany(query, filas)
+    
+    def fetch_all(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
+        """
+        Ejecuta una consulta de lectura y devuelve todas las filas.
+        
+        Args:
+            query: Consulta SQL a ejecutar
+            params: Parámetros de la consulta
+            
+        Returns:
+            Lista de filas (vacía si hay error)
+        """
+        try:
+            with self.conexion() as conexion:
+                return conexion.execute(query, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error al ejecutar consulta: {e}")
+            return []
+    
+    def fetch_one(self, query: str, params: tuple = ()) -> Optional[sqlite3.Row]:
+        """
+        Ejecuta una consulta de lectura y devuelve la primera fila.
         
         Args:
             query: Consulta SQL a ejecutar
             params: Parámetros de la consulta
             
         Returns:
-            Cursor con los resultados o None si hay error
+            Primera fila o None si no hay resultados o hay error
         """
         try:
-            self.cursor.execute(query, params)
-            self.connection.commit()
-            return self.cursor
+            with self.conexion() as conexion:
+                return conexion.execute(query, params).fetchone()
         except sqlite3.Error as e:
             print(f"Error al ejecutar consulta: {e}")
             return None
     
-    def create_tables(self):
-        """Crea todas las tablas necesarias en la base de datos"""
-        
-        # Tabla USUARIO (para login)
-        self.execute_query("""
-            CREATE TABLE IF NOT EXISTS usuario (
-                id_usuario INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre VARCHAR(50) NOT NULL,
-                email VARCHAR(100) NOT NULL UNIQUE,
-                password VARCHAR(255) NOT NULL,
-                rol VARCHAR(20) DEFAULT 'empleado',
-                activo BOOLEAN DEFAULT 1,
-                fecha_creacion DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Tabla CLIENTE
-        self.execute_query("""
-            CREATE TABLE IF NOT EXISTS cliente (
-                id_cliente INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre VARCHAR(50) NOT NULL,
-                apellidos VARCHAR(100) NOT NULL,
-                dni VARCHAR(15) NOT NULL UNIQUE,
-                telefono VARCHAR(20),
-                email VARCHAR(100),
-                fecha_alta DATE NOT NULL,
-                activo BOOLEAN DEFAULT 1
-            )
-        """)
-        
-        # Tabla APARATO
-        self.execute_query("""
-            CREATE TABLE IF NOT EXISTS aparato (
-                id_aparato INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre VARCHAR(50) NOT NULL,
-                tipo VARCHAR(50) NOT NULL,
-                descripcion TEXT,
-                activo BOOLEAN DEFAULT 1
-            )
-        """)
-        
-        # Tabla RESERVA
-        self.execute_query("""
-            CREATE TABLE IF NOT EXISTS reserva (
-                id_reserva INTEGER PRIMARY KEY AUTOINCREMENT,
-                id_cliente INTEGER NOT NULL,
-                id_aparato INTEGER NOT NULL,
-                dia_semana INTEGER NOT NULL CHECK (dia_semana BETWEEN 1 AND 5),
-                hora_inicio TIME NOT NULL,
-                hora_fin TIME NOT NULL,
-                fecha_creacion DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (id_cliente) REFERENCES cliente(id_cliente) ON DELETE CASCADE,
-                FOREIGN KEY (id_aparato) REFERENCES aparato(id_aparato) ON DELETE CASCADE,
-                UNIQUE (id_aparato, dia_semana, hora_inicio)
-            )
-        """)
-        
-        # Tabla RECIBO
-        self.execute_query("""
-            CREATE TABLE IF NOT EXISTS recibo (
-                id_recibo INTEGER PRIMARY KEY AUTOINCREMENT,
-                id_cliente INTEGER NOT NULL,
-                mes INTEGER NOT NULL CHECK (mes BETWEEN 1 AND 12),
-                anio INTEGER NOT NULL,
-                importe DECIMAL(10,2) NOT NULL,
-                pagado BOOLEAN DEFAULT 0,
-                fecha_pago DATE,
-                fecha_emision DATE NOT NULL DEFAULT CURRENT_DATE,
-                FOREIGN KEY (id_cliente) REFERENCES cliente(id_cliente) ON DELETE CASCADE,
-                UNIQUE (id_cliente, mes, anio)
-            )
-        """)
+    def iterar_consulta(self, query: str, params: tuple = (),
+                        tamano: int = 1000) -> Iterator[sqlite3.Row]:
+        """
+        Ejecuta una consulta de lectura y devuelve sus filas poco a poco.
         
-        # Crear índices para optimización
-        self.execute_query("CREATE INDEX IF NOT EXISTS idx_reserva_dia ON reserva(dia_semana)")
-        self.execute_query("CREATE INDEX IF NOT EXISTS idx_reserva_aparato ON reserva(id_aparato)")
-        self.execute_query("CREATE INDEX IF NOT EXISTS idx_recibo_pagado ON recibo(pagado)")
-        self.execute_query("CREATE INDEX IF NOT EXISTS idx_recibo_cliente ON recibo(id_cliente)")
+        Las filas se leen del cursor en bloques de tamano, así que nunca
+        hay más de un bloque en memoria; la conexión queda ocupada hasta
+        que se agota o se cierra el generador. Pensado para exportaciones
+        grandes: a diferencia de fetch_all, los errores no se silencian.
         
-        print("Tablas creadas correctamente")
+        Args:
+            query: Consulta SQL a ejecutar
+            params: Parámetros de la consulta
+            tamano: Filas a leer del cursor en cada bloque
+            
+        Yields:
+            Filas de la consulta
+            
+        Raises:
+            sqlite3.Error: Si la consulta falla
+        """
+        with self.conexion() as conexion:
+            cursor = conexion.execute(query, params)
+            try:
+                while True:
+                    filas = cursor.fetchmany(tamano)
+                    if not filas:
+                        return
+                    yield from filas
+            finally:
+                cursor.close()
+    
+    @contextmanager
+    def transaction(self, inmediata: bool = False):
+        """
+        Agrupa varias escrituras en una sola transacción.
+        
+        La confirmación se aplaza hasta la salida del bloque y cualquier
+        excepción deshace todos los cambios. Los bloques anidados usan
+        SAVEPOINT, de modo que solo deshacen su propia parte. La conexión
+        queda reservada para el hilo que abre el bloque hasta que sale.
+        
+        Uso:
+            with db.transaction():
+                db.insertar_reserva(...)
+                db.insertar_reserva(...)
+        
+        Args:
+            inmediata: Si es True, adquiere el bloqueo de escritura al
+                       empezar (BEGIN IMMEDIATE) en lugar de en la
+                       primera escritura
+        """
+        nivel = self._nivel_transaccion
+        if nivel > 0:
+            conexion = self._local.conexion
+            pendientes = len(self._local.al_confirmar)
+            conexion.execute(f"SAVEPOINT sp_{nivel}")
+            self._local.nivel = nivel + 1
+            try:
+                yield self
+                conexion.execute(f"RELEASE sp_{nivel}")
+            except BaseException:
+                conexion.execute(f"ROLLBACK TO sp_{nivel}")
+                conexion.execute(f"RELEASE sp_{nivel}")
+                # Lo deshecho en el savepoint ya no debe aplicarse al confirmar
+                del self._local.al_confirmar[pendientes:]
+                raise
+            finally:
+                self._local.nivel = nivel
+            return
+        
+        if self._pool is None:
+            raise sqlite3.ProgrammingError("La base de datos no está conectada")
+        conexion = self._pool.obtener()
+        try:
+            conexion.execute("BEGIN IMMEDIATE" if inmediata else "BEGIN")
+            self._local.conexion = conexion
+            self._local.nivel = 1
+            self._local.al_confirmar = []
+            try:
+                yield self
+                # Con el bloqueo de escritura aún tomado, nadie más confirma
+                version_previa = self._version_previa(conexion)
+                conexion.commit()
+                al_confirmar = self._local.al_confirmar
+                if version_previa is not None:
+                    al_confirmar.append(self._seguir_version(conexion, *version_previa))
+            except BaseException:
+                conexion.rollback()
+                raise
+            finally:
+                self._local.conexion = None
+                self._local.nivel = 0
+                self._local.al_confirmar = []
+        finally:
+            self._pool.liberar(conexion)
+        
+        for funcion in al_confirmar:
+            funcion()
+    
+    def _al_confirmar(self, funcion):
+        """
+        Ejecuta funcion() cuando los cambios actuales queden confirmados:
+        al salir de transaction() si hay una abierta, o en el acto si no.
+        Si la transacción se deshace, funcion() no llega a ejecutarse.
+        """
+        if self._nivel_transaccion:
+            self._local.al_confirmar.append(funcion)
+        else:
+            funcion()
+    
+    def migrar(self) -> bool:
+        """
+        Lleva el esquema de la base de datos a la última versión.
+        
+        En un arranque con el esquema al día es una sola consulta a
+        schema_version; las migraciones pendientes se aplican juntas en
+        una transacción (ver database.migraciones).
+        
+        Returns:
+            True si el esquema queda al día
+        """
+        try:
+            for version in aplicar_migraciones(self):
+                print(f"Migración {version} aplicada")
+            with self.conexion() as conexion:
+                self.reservas_compactas = reservas_compactas(conexion)
+            return True
+        except sqlite3.Error as e:
+            print(f"Error al migrar la base de datos: {e}")
+            return False
+    
+    def compactar_reservas(self) -> bool:
+        """
+        Pasa las reservas al esquema compacto opcional: franjas enteras en
+        una tabla WITHOUT ROWID con clave (id_aparato, dia_semana, franja)
+        y una vista reserva con las columnas de siempre. Las reservas
+        cambian de ID (ver database.migraciones.RESERVAS_COMPACTAS).
+        
+        Las reservas que no caben en una franja (hora que no es inicio de
+        franja o franja repetida) no impiden la conversión: se apartan en
+        la tabla reserva_descartada y se listan por pantalla.
+        
+        Returns:
+            True si las reservas quedan en el esquema compacto
+        """
+        try:
+            descartadas = compactar_reservas(self)
+            if descartadas is not None:
+                print("Reservas convertidas al esquema compacto")
+            for r in descartadas or []:
+                print(f"  Reserva {r['id_reserva']} no convertida (aparato {r['id_aparato']}, "
+                      f"día {r['dia_semana']}, {r['hora_inicio']}): {r['motivo']}")
+            if descartadas:
+                print(f"{len(descartadas)} reserva(s) apartadas en reserva_descartada")
+        except sqlite3.Error as e:
+            print(f"Error al compactar las reservas: {e}")
+            return False
+        self.reservas_compactas = True
+        self._invalidar_disponibilidad()
+        return True
+    
+    def create_tables(self) -> bool:
+        """Crea las tablas necesarias (se mantiene por compatibilidad; usa migrar)"""
+        return self.migrar()
     
     # ==================== OPERACIONES CON USUARIOS ====================
     
@@ -157,7 +466,7 @@ class DatabaseManager:
         """
         result = self.execute_query(query, (nombre, email, password, rol))
         if result:
-            return self.cursor.lastrowid
+            return result.lastrowid
         return None
     
     def validar_usuario(self, email: str, password: str) -> Optional[sqlite3.Row]:
@@ -166,20 +475,17 @@ class DatabaseManager:
             SELECT * FROM usuario 
             WHERE email = ? AND password = ? AND activo = 1
         """
-        self.execute_query(query, (email, password))
-        return self.cursor.fetchone()
+        return self.fetch_one(query, (email, password))
     
     def existe_usuario(self, email: str) -> bool:
         """Verifica si existe un usuario con ese email"""
         query = "SELECT COUNT(*) FROM usuario WHERE email = ?"
-        self.execute_query(query, (email,))
-        return self.cursor.fetchone()[0] > 0
+        return self.fetch_one(query, (email,))[0] > 0
     
     def existe_admin(self) -> bool:
         """Verifica si ya existe un administrador"""
         query = "SELECT COUNT(*) FROM usuario WHERE rol = 'admin'"
-        self.execute_query(query)
-        return self.cursor.fetchone()[0] > 0
+        return self.fetch_one(query)[0] > 0
     
     def crear_admin_inicial(self):
         """Crea el usuario administrador por defecto si no existe"""
@@ -209,35 +515,58 @@ class DatabaseManager:
         fecha_alta = date.today().isoformat()
         result = self.execute_query(query, (nombre, apellidos, dni, telefono, email, fecha_alta))
         if result:
-            return self.cursor.lastrowid
+            return result.lastrowid
         return None
     
+    def insertar_clientes_bulk(self, clientes: List[Tuple[str, str, str, str, str]]) -> int:
+        """
+        Inserta varios clientes en una única transacción.
+        
+        Si algún cliente falla (por ejemplo, por DNI duplicado) no se
+        inserta ninguno.
+        
+        Args:
+            clientes: Lista de tuplas (nombre, apellidos, dni, telefono, email)
+            
+        Returns:
+            Número de clientes insertados (0 si hay error)
+        """
+        query = """
+            INSERT INTO cliente (nombre, apellidos, dni, telefono, email, fecha_alta, activo)
+            VALUES (?, ?, ?, ?, ?, ?, 1)
+        """
+        fecha_alta = date.today().isoformat()
+        filas = [tuple(cliente) + (fecha_alta,) for cliente in clientes]
+        try:
+            with self.transaction():
+                self._execute_many(query, filas)
+            return len(filas)
+        except sqlite3.Error as e:
+            print(f"Error al insertar clientes: {e}")
+            return 0
+    
     def obtener_clientes(self, solo_activos: bool = True) -> List[sqlite3.Row]:
         """Obtiene todos los clientes"""
         if solo_activos:
             query = "SELECT * FROM cliente WHERE activo = 1 ORDER BY apellidos, nombre"
         else:
             query = "SELECT * FROM cliente ORDER BY apellidos, nombre"
-        self.execute_query(query)
-        return self.cursor.fetchall()
+        return self.fetch_all(query)
     
     def obtener_cliente_por_id(self, id_cliente: int) -> Optional[sqlite3.Row]:
         """Obtiene un cliente por su ID"""
         query = "SELECT * FROM cliente WHERE id_cliente = ?"
-        self.execute_query(query, (id_cliente,))
-        return self.cursor.fetchone()
+        return self.fetch_one(query, (id_cliente,))
     
     def obtener_cliente_por_dni(self, dni: str) -> Optional[sqlite3.Row]:
         """Obtiene un cliente por su DNI"""
         query = "SELECT * FROM cliente WHERE dni = ? AND activo = 1"
-        self.execute_query(query, (dni.upper(),))
-        return self.cursor.fetchone()
+        return self.fetch_one(query, (dni.upper(),))
     
     def obtener_cliente_por_email(self, email: str) -> Optional[sqlite3.Row]:
         """Obtiene un cliente por su email"""
         query = "SELECT * FROM cliente WHERE email = ? AND activo = 1"
-        self.execute_query(query, (email,))
-        return self.cursor.fetchone()
+        return self.fetch_one(query, (email,))
     
     def crear_cliente(self, nombre: str, apellidos: str, dni: str, 
                      telefono: str = None, email: str = None) -> Optional[int]:
@@ -270,6 +599,9 @@ class DatabaseManager:
         """Elimina un cliente de forma permanente"""
         query = "DELETE FROM cliente WHERE id_cliente = ?"
         result = self.execute_query(query, (id_cliente,))
+        if result is not None:
+            # El borrado en cascada elimina sus reservas
+            self._al_confirmar(self._invalidar_disponibilidad)
         return result is not None
     
     # ==================== OPERACIONES CON APARATOS ====================
@@ -287,7 +619,8 @@ class DatabaseManager:
         """
         result = self.execute_query(query, (nombre, tipo, descripcion))
         if result:
-            return self.cursor.lastrowid
+            self._al_confirmar(self._invalidar_disponibilidad)
+            return result.lastrowid
         return None
     
     def obtener_aparatos(self, solo_activos: bool = True) -> List[sqlite3.Row]:
@@ -296,14 +629,12 @@ class DatabaseManager:
             query = "SELECT * FROM aparato WHERE activo = 1 ORDER BY tipo, nombre"
         else:
             query = "SELECT * FROM aparato ORDER BY tipo, nombre"
-        self.execute_query(query)
-        return self.cursor.fetchall()
+        return self.fetch_all(query)
     
     def obtener_aparato_por_id(self, id_aparato: int) -> Optional[sqlite3.Row]:
         """Obtiene un aparato por su ID"""
         query = "SELECT * FROM aparato WHERE id_aparato = ?"
-        self.execute_query(query, (id_aparato,))
-        return self.cursor.fetchone()
+        return self.fetch_one(query, (id_aparato,))
     
     def actualizar_aparato(self, id_aparato: int, nombre: str, tipo: str, 
                            descripcion: str = None) -> bool:
@@ -314,12 +645,16 @@ class DatabaseManager:
             WHERE id_aparato = ?
         """
         result = self.execute_query(query, (nombre, tipo, descripcion, id_aparato))
+        if result is not None:
+            self._al_confirmar(self._invalidar_disponibilidad)
         return result is not None
     
     def eliminar_aparato(self, id_aparato: int) -> bool:
         """Elimina un aparato (desactivación lógica)"""
         query = "UPDATE aparato SET activo = 0 WHERE id_aparato = ?"
         result = self.execute_query(query, (id_aparato,))
+        if result is not None:
+            self._al_confirmar(self._invalidar_disponibilidad)
         return result is not None
     
     # ==================== OPERACIONES CON RESERVAS ====================
@@ -329,6 +664,10 @@ class DatabaseManager:
         """
         Inserta una nueva reserva.
         
+        El límite de reservas del cliente se comprueba en la misma
+        transacción (BEGIN IMMEDIATE) que la inserción, así que dos
+        reservas simultáneas no pueden superarlo entre las dos.
+        
         Args:
             id_cliente: ID del cliente
             id_aparato: ID del aparato
@@ -337,34 +676,464 @@ class DatabaseManager:
             
         Returns:
             ID de la reserva o None si hay error
+        
+        Raises:
+            CuotaExcedida: Si la reserva supera algún límite de reservas
+                del cliente (no se inserta)
+            ValueError: Si hora_inicio no es el inicio de una franja
+                (HH:00 o HH:30)
         """
-        # Calcular hora de fin (30 minutos después)
-        h, m = map(int, hora_inicio.split(':'))
-        hora_inicio_dt = datetime.now().replace(hour=h, minute=m, second=0)
-        hora_fin_dt = hora_inicio_dt + timedelta(minutes=30)
-        hora_fin = hora_fin_dt.strftime("%H:%M")
+        hora_fin = self._calcular_hora_fin(hora_inicio)
         
         query = """
             INSERT INTO reserva (id_cliente, id_aparato, dia_semana, hora_inicio, hora_fin, fecha_creacion)
             VALUES (?, ?, ?, ?, ?, ?)
         """
         fecha_creacion = datetime.now().isoformat()
-        result = self.execute_query(query, (id_cliente, id_aparato, dia_semana, 
-                                            hora_inicio, hora_fin, fecha_creacion))
-        if result:
-            return self.cursor.lastrowid
+        try:
+            with self.transaction(inmediata=True):
+                with self.conexion() as conexion:
+                    self._comprobar_cuotas(conexion, id_cliente, id_aparato, [dia_semana])
+                    result = conexion.execute(query, (id_cliente, id_aparato, dia_semana, 
+                                                      hora_inicio, hora_fin, fecha_creacion))
+                self._al_confirmar(lambda: self._actualizar_disponibilidad(
+                    lambda indice: indice.marcar_ocupada(id_aparato, dia_semana, hora_inicio)
+                ))
+            if self.reservas_compactas:
+                # La inserción pasa por la vista: el ID se deriva de la clave
+                return id_reserva_compacta(id_aparato, dia_semana, indice_franja(hora_inicio))
+            return result.lastrowid
+        except sqlite3.Error as e:
+            print(f"Error al ejecutar consulta: {e}")
+            return None
+    
+    def insertar_reservas_bulk(self, reservas: List[Tuple[int, int, int, str]]) -> int:
+        """
+        Inserta varias reservas en una única transacción.
+        
+        Si alguna reserva falla (por ejemplo, porque la franja ya está
+        ocupada) o algún cliente superaría su límite de reservas, no se
+        inserta ninguna.
+        
+        Args:
+            reservas: Lista de tuplas (id_cliente, id_aparato, dia_semana, hora_inicio)
+            
+        Returns:
+            Número de reservas insertadas (0 si hay error)
+        
+        Raises:
+            CuotaExcedida: Si algún cliente supera un límite de reservas
+                (no se inserta ninguna)
+            ValueError: Si alguna hora no es el inicio de una franja (no
+                se inserta ninguna)
+        """
+        query = """
+            INSERT INTO reserva (id_cliente, id_aparato, dia_semana, hora_inicio, hora_fin, fecha_creacion)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """
+        fecha_creacion = datetime.now().isoformat()
+        filas = [
+            (id_cliente, id_aparato, dia_semana, hora_inicio,
+             self._calcular_hora_fin(hora_inicio), fecha_creacion)
+            for id_cliente, id_aparato, dia_semana, hora_inicio in reservas
+        ]
+        try:
+            with self.transaction(inmediata=True):
+                self._execute_many(query, filas)
+                self._comprobar_cuotas_clientes({id_cliente for id_cliente, *_ in reservas})
+                self._al_confirmar(lambda: self._actualizar_disponibilidad(
+                    lambda indice: indice.marcar_ocupadas(
+                        (id_aparato, dia, hora) for _, id_aparato, dia, hora in reservas
+                    )
+                ))
+            return len(filas)
+        except sqlite3.Error as e:
+            print(f"Error al insertar reservas: {e}")
+            return 0
+    
+    def reservar_bloque(self, id_cliente: int, id_aparato: int, dia_semana: int,
+                        horas: List[str]) -> Optional[List[str]]:
+        """
+        Reserva varias franjas de un aparato de forma atómica.
+        
+        Todas las franjas se insertan en una única transacción y la
+        restricción UNIQUE (id_aparato, dia_semana, hora_inicio) detecta
+        las que ya están ocupadas, sin comprobaciones previas que puedan
+        quedar obsoletas antes de insertar. Si alguna choca se deshace el
+        bloque entero: o se reservan todas o ninguna. El límite de
+        reservas del cliente se comprueba dentro de la misma transacción.
+        
+        Args:
+            id_cliente: ID del cliente
+            id_aparato: ID del aparato
+            dia_semana: Día de la semana (1=Lunes, 5=Viernes)
+            horas: Horas de inicio "HH:MM" a reservar
+            
+        Returns:
+            Lista vacía si se reservaron todas, las horas que chocaron con
+            reservas existentes (sin reservar ninguna) o None si hay error
+        
+        Raises:
+            CuotaExcedida: Si el bloque supera algún límite de reservas del
+                cliente (no se reserva ninguna franja)
+            ValueError: Si alguna hora no es el inicio de una franja (no se
+                reserva ninguna)
+        """
+        horas = list(dict.fromkeys(horas))  # Sin repetidas, en el orden dado
+        fines = {hora: self._calcular_hora_fin(hora) for hora in horas}
+        query = """
+            INSERT INTO reserva (id_cliente, id_aparato, dia_semana, hora_inicio, hora_fin, fecha_creacion)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """
+        fecha_creacion = datetime.now().isoformat()
+        colisiones = []
+        try:
+            with self.transaction(inmediata=True):
+                with self.conexion() as conexion:
+                    self._comprobar_cuotas(conexion, id_cliente, id_aparato,
+                                           [dia_semana] * len(horas))
+                    for hora in horas:
+                        try:
+                            conexion.execute(query, (id_cliente, id_aparato, dia_semana, hora,
+                                                     fines[hora], fecha_creacion))
+                        except sqlite3.IntegrityError as e:
+                            if "UNIQUE" not in str(e):
+                                raise
+                            colisiones.append(hora)
+                if colisiones:
+                    raise _BloqueConColisiones()
+                self._al_confirmar(lambda: self._actualizar_disponibilidad(
+                    lambda indice: indice.marcar_ocupadas(
+                        (id_aparato, dia_semana, hora) for hora in horas
+                    )
+                ))
+            return []
+        except _BloqueConColisiones:
+            return colisiones
+        except sqlite3.Error as e:
+            print(f"Error al reservar bloque: {e}")
+            return None
+    
+    @staticmethod
+    def _calcular_hora_fin(hora_inicio: str) -> str:
+        """
+        Calcula la hora de fin de una sesión (30 minutos después).
+        
+        Raises:
+            ValueError: Si hora_inicio no es el inicio de una franja: las
+                reservas ocupan franjas enteras, así que "09:15" se rechaza
+                en lugar de guardarse como otra franja
+        """
+        return hora_fin(hora_inicio)
+    
+    # ==================== CUOTAS DE RESERVA ====================
+    
+    def configurar_cuotas(self, por_dia: Optional[int] = None, por_semana: Optional[int] = None,
+                          por_tipo: Dict[str, int] = None):
+        """
+        Establece los límites de reservas por cliente.
+        
+        Args:
+            por_dia: Franjas máximas de un cliente en un mismo día (None = sin límite)
+            por_semana: Franjas máximas de un cliente en la semana (None = sin límite)
+            por_tipo: Franjas semanales máximas por tipo de aparato
+        """
+        self.cuotas = {"por_dia": por_dia, "por_semana": por_semana,
+                       "por_tipo": dict(por_tipo or {})}
+    
+    def _hay_cuotas(self) -> bool:
+        """Indica si hay algún límite de reservas configurado"""
+        return (self.cuotas["por_dia"] is not None or self.cuotas["por_semana"] is not None
+                or bool(self.cuotas["por_tipo"]))
+    
+    def _cuota_superada(self, conteos) -> Optional[str]:
+        """
+        Compara los totales de reservas de un cliente con las cuotas.
+        
+        Args:
+            conteos: Tuplas (dia_semana, tipo, franjas) con las reservas del cliente
+            
+        Returns:
+            Descripción del primer límite superado o None si no se supera ninguno
+        """
+        por_dia, por_tipo, total = {}, {}, 0
+        for dia, tipo, franjas in conteos:
+            por_dia[dia] = por_dia.get(dia, 0) + franjas
+            por_tipo[tipo] = por_tipo.get(tipo, 0) + franjas
+            total += franjas
+        
+        limite = self.cuotas["por_dia"]
+        if limite is not None:
+            for dia, franjas in sorted(por_dia.items()):
+                if franjas > limite:
+                    return f"{franjas} franjas el día {dia} (máximo {limite} por día)"
+        limite = self.cuotas["por_semana"]
+        if limite is not None and total > limite:
+            return f"{total} franjas en la semana (máximo {limite})"
+        for tipo, limite in self.cuotas["por_tipo"].items():
+            if por_tipo.get(tipo, 0) > limite:
+                return f"{por_tipo[tipo]} franjas de {tipo} en la semana (máximo {limite})"
         return None
     
+    def _comprobar_cuotas(self, conexion: sqlite3.Connection, id_cliente: int,
+                          id_aparato: int, dias: List[int]):
+        """
+        Comprueba que un cliente puede reservar nuevas franjas en un aparato.
+        
+        Es una sola consulta agregada sobre idx_reserva_cliente_dia_hora:
+        recorre como mucho las reservas semanales del cliente, que la
+        propia cuota acota, así que el coste no crece con la tabla. Debe
+        llamarse dentro de una transacción BEGIN IMMEDIATE para que ninguna
+        otra reserva se cuele entre la comprobación y la inserción.
+        
+        Args:
+            conexion: Conexión de la transacción en curso
+            id_cliente: ID del cliente
+            id_aparato: ID del aparato de las nuevas franjas
+            dias: Día de cada franja nueva
+            
+        Raises:
+            CuotaExcedida: Si las nuevas franjas superan algún límite
+        """
+        if not self._hay_cuotas():
+            return
+        # La fila con día 0 solo aporta el tipo del aparato a reservar
+        filas = conexion.execute("""
+            SELECT r.dia_semana, a.tipo, COUNT(*)
+            FROM reserva r
+            JOIN aparato a ON r.id_aparato = a.id_aparato
+            WHERE r.id_cliente = ?
+            GROUP BY r.dia_semana, a.tipo
+            UNION ALL
+            SELECT 0, tipo, 0 FROM aparato WHERE id_aparato = ?
+        """, (id_cliente, id_aparato)).fetchall()
+        conteos = [tuple(fila) for fila in filas if fila[0]]
+        tipo = next((fila[1] for fila in filas if not fila[0]), None)
+        conteos += [(dia, tipo, 1) for dia in dias]
+        
+        motivo = self._cuota_superada(conteos)
+        if motivo:
+            raise CuotaExcedida(f"El cliente {id_cliente} tendría {motivo}")
+    
+    def _clientes_sobre_cuota(self, ids_cliente) -> Dict[int, str]:
+        """
+        Busca, con una sola consulta agregada, los clientes que superan sus
+        cuotas con las reservas actuales (incluidas las de la transacción
+        en curso).
+        
+        Args:
+            ids_cliente: Clientes a comprobar
+            
+        Returns:
+            Diccionario {id_cliente: límite superado}
+        """
+        ids_cliente = list(ids_cliente)
+        if not ids_cliente or not self._hay_cuotas():
+            return {}
+        conteos = {}
+        with self.conexion() as conexion:
+            for i in range(0, len(ids_cliente), 500):
+                lote = ids_cliente[i:i + 500]
+                for id_cliente, dia, tipo, franjas in conexion.execute(f"""
+                    SELECT r.id_cliente, r.dia_semana, a.tipo, COUNT(*)
+                    FROM reserva r
+                    JOIN aparato a ON r.id_aparato = a.id_aparato
+                    WHERE r.id_cliente IN ({', '.join('?' * len(lote))})
+                    GROUP BY r.id_cliente, r.dia_semana, a.tipo
+                """, lote):
+                    conteos.setdefault(id_cliente, []).append((dia, tipo, franjas))
+        
+        superados = {}
+        for id_cliente, filas in conteos.items():
+            motivo = self._cuota_superada(filas)
+            if motivo:
+                superados[id_cliente] = motivo
+        return superados
+    
+    def _comprobar_cuotas_clientes(self, ids_cliente):
+        """Lanza CuotaExcedida si alguno de los clientes supera sus cuotas"""
+        superados = self._clientes_sobre_cuota(ids_cliente)
+        if superados:
+            id_cliente, motivo = min(superados.items())
+            raise CuotaExcedida(f"El cliente {id_cliente} tendría {motivo}")
+    
+    # ==================== ÍNDICE DE DISPONIBILIDAD ====================
+    
+    @property
+    def disponibilidad(self) -> IndiceDisponibilidad:
+        """
+        Índice en memoria de las franjas ocupadas (ver IndiceDisponibilidad).
+        
+        Se carga la primera vez que se usa y se mantiene al día con las
+        escrituras confirmadas de esta instancia. Antes de usarlo se
+        compara PRAGMA data_version con el de la carga: si otra instancia
+        (u otro proceso) ha escrito en la base de datos, se recarga. Dentro
+        de una transacción no incluye los cambios aún sin confirmar.
+        """
+        version = self._version_datos()
+        indice = self._disponibilidad
+        if indice is not None and self._version_disponibilidad == version:
+            return indice
+        if self._nivel_transaccion:
+            # No cachear un índice leído con cambios sin confirmar
+            indice = IndiceDisponibilidad()
+            with self.conexion() as conexion:
+                indice.cargar(conexion, self.reservas_compactas)
+            return indice
+        with self._lock_disponibilidad:
+            if self._disponibilidad is None or self._version_disponibilidad != version:
+                # La versión se lee antes de cargar: si alguien escribe
+                # entre medias, el siguiente uso vuelve a cargar
+                indice = IndiceDisponibilidad()
+                with self.conexion() as conexion:
+                    indice.cargar(conexion, self.reservas_compactas)
+                self._disponibilidad = indice
+                self._version_disponibilidad = version
+            return self._disponibilidad
+    
+    def _version_datos(self) -> int:
+        """
+        Devuelve el PRAGMA data_version de una conexión que nunca escribe.
+        
+        El valor cambia cada vez que otra conexión confirma cambios, sea
+        del pool de esta instancia o de otro proceso. Una base de datos en
+        memoria solo la ve su propia conexión, así que no cambia.
+        """
+        if self.db_path == ":memory:":
+            return 0
+        with self._lock_vigia:
+            if self._vigia is None:
+                self._vigia = sqlite3.connect(self.db_path, check_same_thread=False)
+            return self._vigia.execute("PRAGMA data_version").fetchone()[0]
+    
+    def _version_previa(self, conexion: sqlite3.Connection) -> Optional[Tuple[int, int]]:
+        """
+        Anota, justo antes de confirmar una transacción, la versión de la
+        base de datos y la que ve la propia conexión (None si el índice
+        no está cargado y no hay nada que seguir).
+        """
+        if self._disponibilidad is None or self.db_path == ":memory:":
+            return None
+        return self._version_datos(), conexion.execute("PRAGMA data_version").fetchone()[0]
+    
+    def _seguir_version(self, conexion: sqlite3.Connection, version_antes: int,
+                        propia_antes: int) -> Callable[[], None]:
+        """
+        Tras confirmar una transacción propia, decide si el índice puede
+        adoptar la nueva versión en lugar de recargarse.
+        
+        La conexión que confirma no ve cambiar su data_version por sus
+        propios cambios: si sigue igual después de leer la nueva versión,
+        entre medias no ha confirmado nadie más, y el índice (al que se
+        aplican las actualizaciones de la transacción) queda al día.
+        
+        Returns:
+            Función a ejecutar tras las actualizaciones del índice
+        """
+        version_despues = self._version_datos()
+        ajenos = conexion.execute("PRAGMA data_version").fetchone()[0] != propia_antes
+        
+        def adoptar():
+            with self._lock_disponibilidad:
+                if not ajenos and self._version_disponibilidad == version_antes:
+                    self._version_disponibilidad = version_despues
+        return adoptar
+    
+    def _actualizar_disponibilidad(self, funcion):
+        """Aplica funcion(indice) al índice si ya está cargado"""
+        with self._lock_disponibilidad:
+            if self._disponibilidad is not None:
+                funcion(self._disponibilidad)
+    
+    def _invalidar_disponibilidad(self):
+        """Descarta el índice para que se recargue en el próximo uso"""
+        with self._lock_disponibilidad:
+            self._disponibilidad = None
+    
     def verificar_disponibilidad(self, id_aparato: int, dia_semana: int, 
                                   hora_inicio: str) -> bool:
         """Verifica si un aparato está disponible en un horario específico"""
+        indice = self.disponibilidad
+        if indice.datos_aparato(id_aparato) is not None:
+            return indice.esta_libre(id_aparato, dia_semana, hora_inicio)
+        # Aparato que el índice no conoce (p. ej. dado de baja): se consulta
         query = """
             SELECT COUNT(*) FROM reserva 
             WHERE id_aparato = ? AND dia_semana = ? AND hora_inicio = ?
         """
-        self.execute_query(query, (id_aparato, dia_semana, hora_inicio))
-        count = self.cursor.fetchone()[0]
-        return count == 0
+        fila = self.fetch_one(query, (id_aparato, dia_semana, hora_inicio))
+        return fila is not None and fila[0] == 0
+    
+    def obtener_franjas_libres(self, id_aparato: int, dia_semana: int) -> List[str]:
+        """
+        Obtiene las horas de inicio libres de un aparato en un día.
+        
+        Args:
+            id_aparato: ID del aparato
+            dia_semana: Día de la semana (1=Lunes, 5=Viernes)
+            
+        Returns:
+            Lista de horas "HH:MM" sin reserva, en orden
+        """
+        indice = self.disponibilidad
+        if indice.datos_aparato(id_aparato) is not None:
+            return indice.franjas_libres(id_aparato, dia_semana)
+        ocupadas = {fila[0] for fila in self.fetch_all(
+            "SELECT hora_inicio FROM reserva WHERE id_aparato = ? AND dia_semana = ?",
+            (id_aparato, dia_semana)
+        )}
+        return [hora for hora in HORAS if hora not in ocupadas]
+    
+    def primer_aparato_libre(self, tipo: Optional[str], dia_semana: int,
+                             hora_inicio: str) -> Optional[int]:
+        """
+        Busca el primer aparato activo de un tipo libre en una franja.
+        
+        Args:
+            tipo: Tipo de aparato (None para cualquiera)
+            dia_semana: Día de la semana (1=Lunes, 5=Viernes)
+            hora_inicio: Hora de inicio en formato "HH:MM"
+            
+        Returns:
+            ID del aparato (el primero por nombre) o None si no hay ninguno libre
+        """
+        return self.disponibilidad.primer_aparato_libre(tipo, dia_semana, hora_inicio)
+    
+    def buscar_aparatos_libres(self, tipo: Optional[str], dia_semana: int,
+                               horas: List[str], limite: int = None) -> List[dict]:
+        """
+        Busca aparatos que puedan atender un bloque de franjas completo.
+        
+        Se resuelve con el índice de disponibilidad en memoria, sin
+        consultas por franja ni inserciones de prueba. Los aparatos se
+        ordenan del menos ocupado ese día al más ocupado, para repartir
+        el uso, y a igualdad por nombre.
+        
+        Args:
+            tipo: Tipo de aparato (None para cualquiera)
+            dia_semana: Día de la semana (1=Lunes, 5=Viernes)
+            horas: Horas de inicio "HH:MM" que se quieren reservar
+            limite: Número máximo de aparatos a devolver (opcional)
+            
+        Returns:
+            Lista de diccionarios con aparato_id, aparato_nombre,
+            aparato_tipo y franjas_ocupadas (en ese día)
+        """
+        indice = self.disponibilidad
+        libres = indice.aparatos_libres_bloque(tipo, dia_semana, horas)
+        if limite is not None:
+            libres = libres[:limite]
+        
+        resultado = []
+        for id_aparato, franjas_ocupadas in libres:
+            nombre, tipo_aparato = indice.datos_aparato(id_aparato)
+            resultado.append({
+                'aparato_id': id_aparato,
+                'aparato_nombre': nombre,
+                'aparato_tipo': tipo_aparato,
+                'franjas_ocupadas': franjas_ocupadas
+            })
+        return resultado
     
     def obtener_reservas_por_dia(self, dia_semana: int) -> List[sqlite3.Row]:
         """
@@ -373,6 +1142,30 @@ class DatabaseManager:
         Args:
             dia_semana: Día de la semana (1=Lunes, 5=Viernes)
             
+        Returns:
+            Lista de reservas con información del cliente y aparato
+        """
+        return self.obtener_reservas(dia=dia_semana)
+    
+    def obtener_reservas(self, dia: int = None, aparato: int = None, cliente: int = None,
+                         limite: int = None, offset: int = 0,
+                         despues_de: Optional[sqlite3.Row] = None) -> List[sqlite3.Row]:
+        """
+        Obtiene reservas con filtros opcionales en una sola consulta.
+        
+        Las reservas se devuelven ordenadas por día, aparato, hora e id,
+        un orden total que permite paginar por clave: pasando en
+        despues_de la última fila de la página anterior, la siguiente
+        página empieza justo tras ella sin recorrer las ya leídas.
+        
+        Args:
+            dia: Día de la semana (1=Lunes, 5=Viernes) (opcional)
+            aparato: ID del aparato (opcional)
+            cliente: ID del cliente (opcional)
+            limite: Número máximo de reservas a devolver (opcional)
+            offset: Reservas a saltar; solo para paginar sin despues_de
+            despues_de: Última reserva de la página anterior (opcional)
+            
         Returns:
             Lista de reservas con información del cliente y aparato
         """
@@ -382,65 +1175,131 @@ class DatabaseManager:
             FROM reserva r
             JOIN cliente c ON r.id_cliente = c.id_cliente
             JOIN aparato a ON r.id_aparato = a.id_aparato
-            WHERE r.dia_semana = ?
-            ORDER BY a.nombre, r.hora_inicio
         """
-        self.execute_query(query, (dia_semana,))
-        return self.cursor.fetchall()
+        condiciones = []
+        params = []
+        if dia is not None:
+            condiciones.append("r.dia_semana = ?")
+            params.append(dia)
+        if aparato is not None:
+            condiciones.append("r.id_aparato = ?")
+            params.append(aparato)
+        if cliente is not None:
+            condiciones.append("r.id_cliente = ?")
+            params.append(cliente)
+        if despues_de is not None:
+            condiciones.append(
+                "(r.dia_semana, a.nombre, r.hora_inicio, r.id_reserva) > (?, ?, ?, ?)"
+            )
+            params.extend((despues_de['dia_semana'], despues_de['aparato_nombre'],
+                           despues_de['hora_inicio'], despues_de['id_reserva']))
+        
+        if condiciones:
+            query += " WHERE " + " AND ".join(condiciones)
+        query += " ORDER BY r.dia_semana, a.nombre, r.hora_inicio, r.id_reserva"
+        
+        if limite is not None:
+            query += " LIMIT ? OFFSET ?"
+            params.extend((limite, offset))
+        elif offset:
+            query += " LIMIT -1 OFFSET ?"
+            params.append(offset)
+        
+        return self.fetch_all(query, tuple(params))
     
-    def obtener_ocupacion_aparatos_por_dia(self, dia_semana: int) -> List[dict]:
+    def obtener_ocupacion_aparatos_por_dia(self, dia_semana: int, tipo: str = None) -> List[dict]:
         """
         Genera un listado de ocupación de todos los aparatos para un día.
         
+        Todas las reservas del día se obtienen en una única consulta y la
+        rejilla de 48 franjas de cada aparato se construye en memoria.
+        
+        Args:
+            dia_semana: Día de la semana (1=Lunes, 5=Viernes)
+            tipo: Tipo de aparato por el que filtrar (opcional)
+            
         Returns:
             Lista con la información de ocupación de cada aparato
         """
-        aparatos = self.obtener_aparatos()
-        ocupacion = []
+        try:
+            return list(self.iterar_ocupacion(dia_semana, tipo))
+        except sqlite3.Error as e:
+            print(f"Error al ejecutar consulta: {e}")
+            return []
+    
+    def iterar_ocupacion(self, dia_semana: int, tipo: str = None) -> Iterator[dict]:
+        """
+        Genera la ocupación de un día aparato a aparato.
         
-        for aparato in aparatos:
-            # Generar todas las franjas horarias (48 franjas de 30 min en 24h)
-            franjas = []
-            for hora in range(24):
-                for minuto in [0, 30]:
-                    hora_str = f"{hora:02d}:{minuto:02d}"
-                    
-                    # Buscar si hay reserva para esta franja
-                    query = """
-                        SELECT r.*, c.nombre, c.apellidos
-                        FROM reserva r
-                        JOIN cliente c ON r.id_cliente = c.id_cliente
-                        WHERE r.id_aparato = ? AND r.dia_semana = ? AND r.hora_inicio = ?
-                    """
-                    self.execute_query(query, (aparato['id_aparato'], dia_semana, hora_str))
-                    reserva = self.cursor.fetchone()
-                    
-                    if reserva:
-                        franjas.append({
-                            'hora': hora_str,
-                            'ocupado': True,
-                            'cliente': f"{reserva['nombre']} {reserva['apellidos']}"
-                        })
-                    else:
-                        franjas.append({
-                            'hora': hora_str,
-                            'ocupado': False,
-                            'cliente': None
-                        })
+        Las reservas de cada aparato llegan seguidas en la consulta, de
+        modo que la rejilla de un aparato se entrega en cuanto se leen sus
+        filas, sin reunir antes las de todos.
+        
+        Args:
+            dia_semana: Día de la semana (1=Lunes, 5=Viernes)
+            tipo: Tipo de aparato por el que filtrar (opcional)
             
-            ocupacion.append({
-                'aparato_id': aparato['id_aparato'],
-                'aparato_nombre': aparato['nombre'],
-                'aparato_tipo': aparato['tipo'],
-                'franjas': franjas
-            })
+        Yields:
+            Diccionarios con aparato_id, aparato_nombre, aparato_tipo y
+            franjas (48 diccionarios con hora, ocupado y cliente)
+            
+        Raises:
+            sqlite3.Error: Si la consulta falla
+        """
+        query = """
+            SELECT a.id_aparato, a.nombre, a.tipo, r.hora_inicio,
+                   c.nombre as cliente_nombre, c.apellidos as cliente_apellidos
+            FROM aparato a
+            LEFT JOIN reserva r ON r.id_aparato = a.id_aparato AND r.dia_semana = ?
+            LEFT JOIN cliente c ON r.id_cliente = c.id_cliente
+            WHERE a.activo = 1
+        """
+        params = [dia_semana]
+        if tipo:
+            query += " AND a.tipo = ?"
+            params.append(tipo)
+        query += " ORDER BY a.tipo, a.nombre, a.id_aparato"
         
-        return ocupacion
+        filas = self.iterar_consulta(query, tuple(params))
+        for id_aparato, grupo in groupby(filas, key=lambda fila: fila['id_aparato']):
+            reservas = {}
+            for fila in grupo:
+                if fila['hora_inicio'] is not None and fila['cliente_nombre'] is not None:
+                    reservas[fila['hora_inicio']] = \
+                        f"{fila['cliente_nombre']} {fila['cliente_apellidos']}"
+            yield {
+                'aparato_id': id_aparato,
+                'aparato_nombre': fila['nombre'],
+                'aparato_tipo': fila['tipo'],
+                'franjas': [
+                    {
+                        'hora': hora_str,
+                        'ocupado': hora_str in reservas,
+                        'cliente': reservas.get(hora_str)
+                    }
+                    for hora_str in HORAS
+                ]
+            }
     
     def cancelar_reserva(self, id_reserva: int) -> bool:
         """Cancela una reserva"""
-        query = "DELETE FROM reserva WHERE id_reserva = ?"
-        result = self.execute_query(query, (id_reserva,))
+        filtro, params = "id_reserva = ?", (id_reserva,)
+        if self.reservas_compactas:
+            # Acotar por la clave de reserva_franja: id_reserva es una
+            # columna calculada de la vista y no tiene índice
+            id_aparato, dia_semana, _ = clave_reserva_compacta(id_reserva)
+            filtro = "id_aparato = ? AND dia_semana = ? AND id_reserva = ?"
+            params = (id_aparato, dia_semana, id_reserva)
+        reserva = self.fetch_one(
+            f"SELECT id_aparato, dia_semana, hora_inicio FROM reserva WHERE {filtro}", params
+        )
+        query = f"DELETE FROM reserva WHERE {filtro}"
+        result = self.execute_query(query, params)
+        if result is not None and reserva is not None:
+            self._al_confirmar(lambda: self._actualizar_disponibilidad(
+                lambda indice: indice.marcar_libre(reserva['id_aparato'], reserva['dia_semana'],
+                                                   reserva['hora_inicio'])
+            ))
         return result is not None
     
     def obtener_reservas_cliente(self, id_cliente: int) -> List[sqlite3.Row]:
@@ -452,8 +1311,247 @@ class DatabaseManager:
             WHERE r.id_cliente = ?
             ORDER BY r.dia_semana, r.hora_inicio
         """
-        self.execute_query(query, (id_cliente,))
-        return self.cursor.fetchall()
+        return self.fetch_all(query, (id_cliente,))
+    
+    # ==================== PLANTILLAS DE RESERVA ====================
+    
+    def guardar_plantilla(self, id_cliente: int, id_aparato: int,
+                          franjas: List[Tuple[int, str]]) -> Optional[int]:
+        """
+        Añade franjas a la plantilla de un cliente en un aparato.
+        
+        Cada cliente tiene como mucho una plantilla por aparato; si ya
+        existe se le añaden las franjas nuevas (las repetidas se ignoran).
+        
+        Args:
+            id_cliente: ID del cliente
+            id_aparato: ID del aparato
+            franjas: Lista de pares (dia_semana, hora_inicio)
+            
+        Returns:
+            ID de la plantilla o None si hay error
+        
+        Raises:
+            ValueError: Si alguna hora no es el inicio de una franja
+        """
+        for _, hora in franjas:
+            indice_franja_exacta(hora)
+        try:
+            with self.transaction():
+                self.execute_query("""
+                    INSERT INTO plantilla_reserva (id_cliente, id_aparato, activa)
+                    VALUES (?, ?, 1)
+                    ON CONFLICT (id_cliente, id_aparato) DO UPDATE SET activa = 1
+                """, (id_cliente, id_aparato))
+                id_plantilla = self.fetch_one(
+                    "SELECT id_plantilla FROM plantilla_reserva WHERE id_cliente = ? AND id_aparato = ?",
+                    (id_cliente, id_aparato)
+                )[0]
+                self._execute_many("""
+                    INSERT OR IGNORE INTO plantilla_franja (id_plantilla, dia_semana, hora_inicio)
+                    VALUES (?, ?, ?)
+                """, [(id_plantilla, dia, hora) for dia, hora in franjas])
+            return id_plantilla
+        except sqlite3.Error as e:
+            print(f"Error al guardar plantilla: {e}")
+            return None
+    
+    def obtener_plantillas(self) -> List[sqlite3.Row]:
+        """Obtiene las plantillas activas con cliente, aparato y número de franjas"""
+        query = """
+            SELECT p.id_plantilla, p.id_cliente, p.id_aparato,
+                   c.nombre as cliente_nombre, c.apellidos as cliente_apellidos,
+                   a.nombre as aparato_nombre, COUNT(pf.hora_inicio) as num_franjas
+            FROM plantilla_reserva p
+            JOIN cliente c ON p.id_cliente = c.id_cliente
+            JOIN aparato a ON p.id_aparato = a.id_aparato
+            LEFT JOIN plantilla_franja pf ON pf.id_plantilla = p.id_plantilla
+            WHERE p.activa = 1
+            GROUP BY p.id_plantilla
+            ORDER BY c.apellidos, c.nombre, a.nombre
+        """
+        return self.fetch_all(query)
+    
+    def eliminar_plantilla(self, id_plantilla: int) -> bool:
+        """Elimina una plantilla y sus franjas"""
+        query = "DELETE FROM plantilla_reserva WHERE id_plantilla = ?"
+        result = self.execute_query(query, (id_plantilla,))
+        return result is not None
+    
+    def aplicar_plantillas(self, ids_plantilla: List[int] = None) -> Optional[dict]:
+        """
+        Reserva de una vez todas las franjas de las plantillas activas.
+        
+        Un único INSERT ... SELECT copia las franjas de las plantillas a
+        reserva; las franjas ya ocupadas se saltan gracias a la restricción
+        UNIQUE. Después, en la misma transacción, se buscan las franjas de
+        plantilla cuya reserva es de otro cliente: ese es el informe de
+        conflictos. Si dos plantillas piden la misma franja, se la queda
+        la más antigua. Solo se aplican plantillas de clientes y aparatos
+        activos.
+        
+        La hora de fin sale de la tabla franja_horaria (las franjas de
+        utils.franjas). Las franjas de plantilla cuya hora no es inicio de
+        franja (guardadas antes de validarse) no se reservan y se informan
+        aparte.
+        
+        Las cuotas se comprueban con una consulta agregada tras el INSERT,
+        solo para los clientes a los que esta aplicación ha reservado
+        alguna franja. Si alguno supera sus límites, se vuelve al SAVEPOINT
+        tomado antes del INSERT (que deshace exactamente sus filas, también
+        las que escriben los triggers del esquema compacto) y se repite el
+        INSERT sin sus plantillas, de modo que
+        las franjas que tenía pasan a la siguiente plantilla que las pida
+        (y que esas reservas cuentan para las cuotas de su cliente). Como
+        los clientes excluidos solo aumentan, el bucle termina; lo normal
+        es una sola pasada.
+        
+        Args:
+            ids_plantilla: Plantillas a aplicar (por defecto, todas las activas)
+            
+        Returns:
+            Diccionario con 'insertadas' (número de reservas creadas),
+            'conflictos' (lista de diccionarios con la plantilla, el
+            cliente, el aparato, la franja y quién la ocupa) y 'cuotas'
+            (clientes omitidos por superar sus límites, con el motivo) y
+            'fuera_de_franja' (franjas de plantilla con una hora que no es
+            inicio de franja, con la plantilla, el cliente, el aparato, el
+            día y la hora), o None si hay error
+        """
+        filtro = ""
+        params = []
+        if ids_plantilla is not None:
+            filtro = f" AND p.id_plantilla IN ({', '.join('?' * len(ids_plantilla))})"
+            params = list(ids_plantilla)
+        
+        plantillas = """
+            FROM plantilla_franja pf
+            JOIN plantilla_reserva p ON pf.id_plantilla = p.id_plantilla
+            JOIN cliente c ON p.id_cliente = c.id_cliente
+            JOIN aparato a ON p.id_aparato = a.id_aparato
+        """
+        condiciones = f"WHERE p.activa = 1 AND c.activo = 1 AND a.activo = 1{filtro}"
+        franja = "JOIN franja_horaria fh ON fh.hora_inicio = pf.hora_inicio"
+        
+        def sin_excluidos(excluidos):
+            return f" AND p.id_cliente NOT IN ({', '.join('?' * len(excluidos))})" if excluidos else ""
+        
+        insertar = """
+            INSERT OR IGNORE INTO reserva
+                (id_cliente, id_aparato, dia_semana, hora_inicio, hora_fin, fecha_creacion)
+            SELECT p.id_cliente, p.id_aparato, pf.dia_semana, pf.hora_inicio, fh.hora_fin, ?
+            {plantillas}
+            {franja}
+            {condiciones}{excluidos}
+            ORDER BY p.id_plantilla, pf.dia_semana, pf.hora_inicio
+        """
+        conflictos = """
+            SELECT p.id_plantilla, c.nombre as cliente_nombre, c.apellidos as cliente_apellidos,
+                   a.nombre as aparato_nombre, pf.dia_semana, pf.hora_inicio,
+                   o.nombre as ocupante_nombre, o.apellidos as ocupante_apellidos
+            {plantillas}
+            JOIN reserva r ON r.id_aparato = p.id_aparato AND r.dia_semana = pf.dia_semana
+                          AND r.hora_inicio = pf.hora_inicio
+            JOIN cliente o ON r.id_cliente = o.id_cliente
+            {condiciones}{excluidos} AND r.id_cliente != p.id_cliente
+            ORDER BY c.apellidos, c.nombre, pf.dia_semana, pf.hora_inicio
+        """
+        fuera_de_franja = f"""
+            SELECT p.id_plantilla, c.nombre as cliente_nombre, c.apellidos as cliente_apellidos,
+                   a.nombre as aparato_nombre, pf.dia_semana, pf.hora_inicio
+            {plantillas}
+            LEFT {franja}
+            {condiciones} AND fh.franja IS NULL
+            ORDER BY c.apellidos, c.nombre, pf.dia_semana, pf.hora_inicio
+        """
+        # Clientes con alguna reserva de esta aplicación (por idx_reserva_cliente_dia_hora)
+        con_reservas_nuevas = f"""
+            SELECT DISTINCT p.id_cliente FROM plantilla_reserva p
+            WHERE p.activa = 1{filtro} AND EXISTS (
+                SELECT 1 FROM reserva r
+                WHERE r.id_cliente = p.id_cliente AND r.fecha_creacion = ?
+            )
+        """
+        
+        fecha_creacion = datetime.now().isoformat()
+        excluidos = {}
+        try:
+            with self.transaction(inmediata=True):
+                with self.conexion() as conexion:
+                    while True:
+                        conexion.execute("SAVEPOINT aplicar_plantillas")
+                        ids_excluidos = sorted(excluidos)
+                        # total_changes (no rowcount) cuenta también las filas que
+                        # escriben los triggers de la vista del esquema compacto
+                        cambios = conexion.total_changes
+                        conexion.execute(
+                            insertar.format(plantillas=plantillas, franja=franja,
+                                            condiciones=condiciones,
+                                            excluidos=sin_excluidos(ids_excluidos)),
+                            tuple([fecha_creacion] + params + ids_excluidos)
+                        )
+                        insertadas = conexion.total_changes - cambios
+                        if not self._hay_cuotas():
+                            break
+                        superados = self._clientes_sobre_cuota(
+                            fila[0] for fila in conexion.execute(
+                                con_reservas_nuevas, tuple(params + [fecha_creacion]))
+                        )
+                        if not superados:
+                            break
+                        excluidos.update(superados)
+                        conexion.execute("ROLLBACK TO aplicar_plantillas")
+                        conexion.execute("RELEASE aplicar_plantillas")
+                    conexion.execute("RELEASE aplicar_plantillas")
+                    
+                    omitidos = []
+                    for id_cliente, motivo in sorted(excluidos.items()):
+                        cliente = conexion.execute(
+                            "SELECT nombre, apellidos FROM cliente WHERE id_cliente = ?",
+                            (id_cliente,)
+                        ).fetchone()
+                        omitidos.append({
+                            'id_cliente': id_cliente,
+                            'cliente': f"{cliente['nombre']} {cliente['apellidos']}",
+                            'motivo': motivo
+                        })
+                    ids_excluidos = sorted(excluidos)
+                    filas = conexion.execute(
+                        conflictos.format(plantillas=plantillas, condiciones=condiciones,
+                                          excluidos=sin_excluidos(ids_excluidos)),
+                        tuple(params + ids_excluidos)
+                    ).fetchall()
+                    sin_franja = conexion.execute(fuera_de_franja, tuple(params)).fetchall()
+                self._al_confirmar(self._invalidar_disponibilidad)
+        except sqlite3.Error as e:
+            print(f"Error al aplicar plantillas: {e}")
+            return None
+        
+        return {
+            'insertadas': insertadas,
+            'conflictos': [
+                {
+                    'id_plantilla': fila['id_plantilla'],
+                    'cliente': f"{fila['cliente_nombre']} {fila['cliente_apellidos']}",
+                    'aparato': fila['aparato_nombre'],
+                    'dia_semana': fila['dia_semana'],
+                    'hora_inicio': fila['hora_inicio'],
+                    'ocupante': f"{fila['ocupante_nombre']} {fila['ocupante_apellidos']}"
+                }
+                for fila in filas
+            ],
+            'cuotas': omitidos,
+            'fuera_de_franja': [
+                {
+                    'id_plantilla': fila['id_plantilla'],
+                    'cliente': f"{fila['cliente_nombre']} {fila['cliente_apellidos']}",
+                    'aparato': fila['aparato_nombre'],
+                    'dia_semana': fila['dia_semana'],
+                    'hora_inicio': fila['hora_inicio']
+                }
+                for fila in sin_franja
+            ]
+        }
     
     # ==================== OPERACIONES CON RECIBOS ====================
     
@@ -464,28 +1562,47 @@ class DatabaseManager:
         Returns:
             Número de recibos generados
         """
-        clientes = self.obtener_clientes(solo_activos=True)
-        recibos_generados = 0
+        return self.generar_recibos_periodo(anio, importe, meses=[mes])
+    
+    def generar_recibos_periodo(self, anio: int, importe: float,
+                                meses: List[int] = None) -> int:
+        """
+        Genera recibos para todos los clientes activos de varios meses.
         
-        for cliente in clientes:
-            # Verificar si ya existe recibo para ese cliente/mes/año
-            query = """
-                SELECT COUNT(*) FROM recibo 
-                WHERE id_cliente = ? AND mes = ? AND anio = ?
-            """
-            self.execute_query(query, (cliente['id_cliente'], mes, anio))
-            if self.cursor.fetchone()[0] == 0:
-                # Crear recibo
-                query = """
-                    INSERT INTO recibo (id_cliente, mes, anio, importe, pagado, fecha_emision)
-                    VALUES (?, ?, ?, ?, 0, ?)
-                """
-                fecha_emision = date.today().isoformat()
-                if self.execute_query(query, (cliente['id_cliente'], mes, anio, 
-                                              importe, fecha_emision)):
-                    recibos_generados += 1
-        
-        return recibos_generados
+        Cada mes se factura con una única sentencia INSERT ... SELECT que
+        omite los clientes que ya tienen recibo de ese mes, y todos los
+        meses se confirman en una sola transacción.
+        
+        Args:
+            anio: Año a facturar
+            importe: Importe de cada recibo
+            meses: Meses a facturar (por defecto, el año completo)
+            
+        Returns:
+            Número de recibos generados
+        """
+        if meses is None:
+            meses = list(range(1, 13))
+        
+        query = """
+            INSERT INTO recibo (id_cliente, mes, anio, importe, pagado, fecha_emision)
+            SELECT c.id_cliente, ?, ?, ?, 0, ?
+            FROM cliente c
+            WHERE c.activo = 1 AND NOT EXISTS (
+                SELECT 1 FROM recibo r
+                WHERE r.id_cliente = c.id_cliente AND r.mes = ? AND r.anio = ?
+            )
+        """
+        fecha_emision = date.today().isoformat()
+        try:
+            with self.transaction():
+                cursor = self._execute_many(query, [
+                    (mes, anio, importe, fecha_emision, mes, anio) for mes in meses
+                ])
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"Error al generar recibos: {e}")
+            return 0
     
     def registrar_pago(self, id_recibo: int) -> bool:
         """Marca un recibo como pagado"""
@@ -498,6 +1615,80 @@ class DatabaseManager:
         result = self.execute_query(query, (fecha_pago, id_recibo))
         return result is not None
     
+    def conciliar_pagos(self, cobros: Iterable[Dict], tamano_lote: int = 5000) -> Optional[dict]:
+        """
+        Marca como pagados los recibos cobrados según un fichero del banco.
+        
+        Los recibos pendientes se leen una sola vez en un diccionario
+        (dni, mes, anio) -> (id_recibo, importe) y cada cobro se busca en
+        él. Los pagos se aplican con executemany en lotes de tamano_lote,
+        cada uno en su propia transacción, y los cobros se consumen de uno
+        en uno: la memoria no depende del tamaño del fichero. Si falla un
+        lote, los anteriores quedan confirmados.
+        
+        Args:
+            cobros: Cobros como los de utils.banco.leer_cobros_banco
+            tamano_lote: Recibos a actualizar por transacción
+            
+        Returns:
+            Diccionario con 'lineas', 'pagados' y 'no_conciliados' (los
+            cobros no aplicados, cada uno con su 'motivo'), o None si hay
+            error
+        """
+        query = """
+            UPDATE recibo SET pagado = 1, fecha_pago = ?
+            WHERE id_recibo = ? AND pagado = 0
+        """
+        hoy = date.today().isoformat()
+        resultado = {'lineas': 0, 'pagados': 0, 'no_conciliados': []}
+        lote = []
+        
+        def aplicar_lote():
+            with self.transaction():
+                resultado['pagados'] += self._execute_many(query, lote).rowcount
+            lote.clear()
+        
+        try:
+            with self.conexion() as conexion:
+                pendientes = {
+                    (dni, mes, anio): (id_recibo, importe)
+                    for dni, mes, anio, id_recibo, importe in conexion.execute("""
+                        SELECT c.dni, r.mes, r.anio, r.id_recibo, r.importe
+                        FROM recibo r
+                        JOIN cliente c ON r.id_cliente = c.id_cliente
+                        WHERE r.pagado = 0
+                    """)
+                }
+            
+            for cobro in cobros:
+                resultado['lineas'] += 1
+                motivo = cobro.get('motivo')
+                clave = (cobro['dni'], cobro['mes'], cobro['anio'])
+                recibo = pendientes.get(clave)
+                if motivo is None and not cobro['cobrado']:
+                    motivo = "Adeudo devuelto"
+                elif motivo is None and recibo is None:
+                    motivo = "Sin recibo pendiente"
+                elif (motivo is None and cobro['importe'] is not None
+                        and round(cobro['importe'] - recibo[1], 2) != 0):
+                    motivo = f"Importe distinto del recibo ({recibo[1]:.2f})"
+                
+                if motivo is not None:
+                    resultado['no_conciliados'].append(dict(cobro, motivo=motivo))
+                    continue
+                # Un mismo recibo solo se paga una vez aunque se repita la línea
+                del pendientes[clave]
+                lote.append((cobro['fecha_pago'] or hoy, recibo[0]))
+                if len(lote) >= tamano_lote:
+                    aplicar_lote()
+            
+            if lote:
+                aplicar_lote()
+            return resultado
+        except sqlite3.Error as e:
+            print(f"Error al conciliar pagos: {e}")
+            return None
+    
     def obtener_recibos_pendientes(self, id_cliente: int = None) -> List[sqlite3.Row]:
         """Obtiene los recibos pendientes de pago"""
         if id_cliente:
@@ -508,7 +1699,7 @@ class DatabaseManager:
                 WHERE r.pagado = 0 AND r.id_cliente = ?
                 ORDER BY r.anio, r.mes
             """
-            self.execute_query(query, (id_cliente,))
+            return self.fetch_all(query, (id_cliente,))
         else:
             query = """
                 SELECT r.*, c.nombre, c.apellidos, c.dni
@@ -517,8 +1708,7 @@ class DatabaseManager:
                 WHERE r.pagado = 0
                 ORDER BY c.apellidos, c.nombre, r.anio, r.mes
             """
-            self.execute_query(query)
-        return self.cursor.fetchall()
+            return self.fetch_all(query)
     
     def obtener_recibos_por_cliente(self, id_cliente: int) -> List[sqlite3.Row]:
         """Obtiene todos los recibos (pagados y pendientes) de un cliente"""
@@ -527,74 +1717,124 @@ class DatabaseManager:
             WHERE id_cliente = ?
             ORDER BY anio DESC, mes DESC
         """
-        self.execute_query(query, (id_cliente,))
-        return self.cursor.fetchall()
+        return self.fetch_all(query, (id_cliente,))
     
-    def obtener_clientes_morosos(self) -> List[dict]:
+    def obtener_clientes_morosos(self) -> List[sqlite3.Row]:
         """
         Obtiene la lista de clientes morosos con información de deuda.
         
+        Lee el resumen saldo_cliente (mantenido por triggers sobre recibo)
+        en orden de idx_saldo_total, sin agrupar los recibos.
+        
         Returns:
-            Lista de diccionarios con información de morosos
+            Filas con los datos del cliente, num_recibos_pendientes,
+            total_adeudado y primer_pendiente (mes impagado más antiguo,
+            AAAAMM), de mayor a menor deuda
         """
-        query = """
-            SELECT c.id_cliente, c.nombre, c.apellidos, c.dni, c.telefono, c.email,
-                   COUNT(r.id_recibo) as num_recibos_pendientes,
-                   SUM(r.importe) as total_adeudado
-            FROM cliente c
-            JOIN recibo r ON c.id_cliente = r.id_cliente
-            WHERE r.pagado = 0 AND c.activo = 1
-            GROUP BY c.id_cliente
-            ORDER BY total_adeudado DESC
-        """
-        self.execute_query(query)
-        rows = self.cursor.fetchall()
-        
-        morosos = []
-        for row in rows:
-            morosos.append({
-                'id_cliente': row['id_cliente'],
-                'nombre': row['nombre'],
-                'apellidos': row['apellidos'],
-                'dni': row['dni'],
-                'telefono': row['telefono'],
-                'email': row['email'],
-                'num_recibos_pendientes': row['num_recibos_pendientes'],
-                'total_adeudado': row['total_adeudado']
-            })
+        return self.fetch_all(CONSULTA_MOROSOS)
+    
+    def iterar_clientes_morosos(self) -> Iterator[sqlite3.Row]:
+        """
+        Como obtener_clientes_morosos, pero leyendo las filas del cursor
+        poco a poco (para exportar).
         
-        return morosos
+        Raises:
+            sqlite3.Error: Si la consulta falla
+        """
+        return self.iterar_consulta(CONSULTA_MOROSOS)
     
-    def obtener_clientes_al_corriente(self, mes: int = None, anio: int = None) -> List[sqlite3.Row]:
+    def verificar_saldos(self, reparar: bool = False) -> Optional[List[int]]:
+        """
+        Comprueba saldo_cliente contra los recibos pendientes.
+        
+        Args:
+            reparar: Si hay diferencias, reconstruir saldo_cliente desde cero
+            
+        Returns:
+            IDs de los clientes cuyo saldo no cuadra (vacía si todo cuadra)
+            o None si hay error
+        """
+        query = f"""
+            SELECT id_cliente FROM (
+                SELECT * FROM saldo_cliente EXCEPT {SALDOS_DESDE_RECIBOS}
+            )
+            UNION
+            SELECT id_cliente FROM (
+                {SALDOS_DESDE_RECIBOS} EXCEPT SELECT * FROM saldo_cliente
+            )
+            ORDER BY id_cliente
+        """
+        try:
+            with self.conexion() as conexion:
+                descuadrados = [fila[0] for fila in conexion.execute(query)]
+        except sqlite3.Error as e:
+            print(f"Error al verificar saldos: {e}")
+            return None
+        if descuadrados and reparar and not self.reconstruir_saldos():
+            return None
+        return descuadrados
+    
+    def reconstruir_saldos(self) -> bool:
+        """Vuelve a calcular saldo_cliente desde cero a partir de los recibos"""
+        try:
+            with self.transaction(inmediata=True):
+                self.execute_query("DELETE FROM saldo_cliente")
+                self.execute_query(f"INSERT INTO saldo_cliente {SALDOS_DESDE_RECIBOS}")
+            return True
+        except sqlite3.Error as e:
+            print(f"Error al reconstruir saldos: {e}")
+            return False
+    
+    def obtener_clientes_al_corriente(self, mes: int = None, anio: int = None,
+                                      limite: int = None,
+                                      despues_de: Optional[sqlite3.Row] = None) -> List[sqlite3.Row]:
         """
         Obtiene los clientes que han pagado sus recibos.
         
+        Sin mes y año son los clientes activos sin recibos pendientes: un
+        anti-join contra saldo_cliente, que solo tiene fila para quien
+        debe algo. Con mes y año, los que tienen pagado el recibo de ese
+        mes (EXISTS sobre el UNIQUE de id_cliente, mes, anio). En ambos
+        casos se recorren los clientes por idx_cliente_activo_apellidos,
+        de modo que una página no lee más clientes de los que necesita.
+        
         Args:
             mes: Mes específico (opcional)
             anio: Año específico (opcional)
+            limite: Número máximo de clientes a devolver (opcional)
+            despues_de: Último cliente de la página anterior (opcional)
+            
+        Returns:
+            Lista de clientes ordenada por apellidos, nombre e id
         """
         if mes and anio:
-            query = """
-                SELECT DISTINCT c.*
-                FROM cliente c
-                JOIN recibo r ON c.id_cliente = r.id_cliente
-                WHERE r.pagado = 1 AND r.mes = ? AND r.anio = ? AND c.activo = 1
-                ORDER BY c.apellidos, c.nombre
-            """
-            self.execute_query(query, (mes, anio))
+            condiciones = ["""EXISTS (
+                SELECT 1 FROM recibo r
+                WHERE r.anio = ? AND r.mes = ? AND r.pagado = 1
+                  AND r.id_cliente = c.id_cliente
+            )"""]
+            params = [anio, mes]
         else:
             # Clientes sin recibos pendientes
-            query = """
-                SELECT c.*
-                FROM cliente c
-                WHERE c.activo = 1 AND c.id_cliente NOT IN (
-                    SELECT DISTINCT id_cliente FROM recibo WHERE pagado = 0
-                )
-                ORDER BY c.apellidos, c.nombre
-            """
-            self.execute_query(query)
+            condiciones = ["""NOT EXISTS (
+                SELECT 1 FROM saldo_cliente s WHERE s.id_cliente = c.id_cliente
+            )"""]
+            params = []
+        if despues_de is not None:
+            condiciones.append("(c.apellidos, c.nombre, c.id_cliente) > (?, ?, ?)")
+            params.extend((despues_de['apellidos'], despues_de['nombre'],
+                           despues_de['id_cliente']))
         
-        return self.cursor.fetchall()
+        query = f"""
+            SELECT c.*
+            FROM cliente c
+            WHERE c.activo = 1 AND {" AND ".join(condiciones)}
+            ORDER BY c.apellidos, c.nombre, c.id_cliente
+        """
+        if limite is not None:
+            query += " LIMIT ?"
+            params.append(limite)
+        return self.fetch_all(query, tuple(params))
     
     def obtener_recibos_cliente(self, id_cliente: int) -> List[sqlite3.Row]:
         """Obtiene todos los recibos de un cliente"""
@@ -603,29 +1843,141 @@ class DatabaseManager:
             WHERE id_cliente = ?
             ORDER BY anio DESC, mes DESC
         """
-        self.execute_query(query, (id_cliente,))
-        return self.cursor.fetchall()
+        return self.fetch_all(query, (id_cliente,))
     
     def obtener_todos_recibos(self, mes: int = None, anio: int = None) -> List[sqlite3.Row]:
         """Obtiene todos los recibos, opcionalmente filtrados por mes y año"""
         if mes and anio:
-            query = """
-                SELECT r.*, c.nombre, c.apellidos, c.dni
-                FROM recibo r
-                JOIN cliente c ON r.id_cliente = c.id_cliente
-                WHERE r.mes = ? AND r.anio = ?
-                ORDER BY c.apellidos, c.nombre
-            """
-            self.execute_query(query, (mes, anio))
-        else:
-            query = """
-                SELECT r.*, c.nombre, c.apellidos, c.dni
-                FROM recibo r
-                JOIN cliente c ON r.id_cliente = c.id_cliente
-                ORDER BY r.anio DESC, r.mes DESC, c.apellidos, c.nombre
-            """
-            self.execute_query(query)
-        return self.cursor.fetchall()
+            return self.obtener_recibos(mes=mes, anio=anio)
+        return self.obtener_recibos()
+    
+    def obtener_recibos(self, mes: int = None, anio: int = None, pagado: bool = None,
+                        limite: int = None,
+                        despues_de: Optional[sqlite3.Row] = None) -> List[sqlite3.Row]:
+        """
+        Obtiene recibos con el cliente, con filtros opcionales y paginados.
+        
+        Se ordenan del mes más reciente al más antiguo y, dentro de cada
+        mes, por cliente e id. Pasando en despues_de la última fila de la
+        página anterior, la siguiente página empieza justo tras ella.
+        
+        Args:
+            mes: Mes (1-12) (opcional)
+            anio: Año (opcional)
+            pagado: True solo pagados, False solo pendientes (opcional)
+            limite: Número máximo de recibos a devolver (opcional)
+            despues_de: Último recibo de la página anterior (opcional)
+            
+        Returns:
+            Lista de recibos con nombre, apellidos y DNI del cliente
+        """
+        query, params = self._consulta_recibos(mes, anio, pagado, despues_de)
+        if limite is not None:
+            query += " LIMIT ?"
+            params += (limite,)
+        
+        return self.fetch_all(query, params)
+    
+    def iterar_recibos(self, mes: int = None, anio: int = None,
+                       pagado: bool = None) -> Iterator[sqlite3.Row]:
+        """
+        Como obtener_recibos, pero leyendo las filas del cursor poco a poco
+        (para exportar un año entero sin reunir todos los recibos).
+        
+        Raises:
+            sqlite3.Error: Si la consulta falla
+        """
+        query, params = self._consulta_recibos(mes, anio, pagado)
+        return self.iterar_consulta(query, params)
+    
+    def _consulta_recibos(self, mes: int = None, anio: int = None, pagado: bool = None,
+                          despues_de: Optional[sqlite3.Row] = None) -> Tuple[str, tuple]:
+        """Construye la consulta de obtener_recibos e iterar_recibos (sin LIMIT)"""
+        query = """
+            SELECT r.*, c.nombre, c.apellidos, c.dni
+            FROM recibo r
+            JOIN cliente c ON r.id_cliente = c.id_cliente
+        """
+        condiciones = []
+        params = []
+        if anio is not None:
+            condiciones.append("r.anio = ?")
+            params.append(anio)
+        if mes is not None:
+            condiciones.append("r.mes = ?")
+            params.append(mes)
+        if pagado is not None:
+            condiciones.append("r.pagado = ?")
+            params.append(1 if pagado else 0)
+        if despues_de is not None:
+            # Año y mes descendentes; cliente e id ascendentes
+            condiciones.append("""
+                (r.anio < ? OR (r.anio = ? AND (r.mes < ? OR (r.mes = ?
+                    AND (c.apellidos, c.nombre, r.id_recibo) > (?, ?, ?)))))
+            """)
+            params.extend((despues_de['anio'], despues_de['anio'],
+                           despues_de['mes'], despues_de['mes'],
+                           despues_de['apellidos'], despues_de['nombre'],
+                           despues_de['id_recibo']))
+        
+        if condiciones:
+            query += " WHERE " + " AND ".join(condiciones)
+        query += " ORDER BY r.anio DESC, r.mes DESC, c.apellidos, c.nombre, r.id_recibo"
+        
+        return query, tuple(params)
+    
+    def resumen_recibos(self, mes: int = None, anio: int = None) -> Optional[dict]:
+        """
+        Cuenta y suma los recibos pagados y pendientes de cada mes.
+        
+        Es un único GROUP BY anio, mes que recorre idx_recibo_periodo sin
+        leer la tabla recibo; los totales se suman a partir de las filas
+        por mes.
+        
+        Args:
+            mes: Mes (1-12) (opcional)
+            anio: Año (opcional)
+            
+        Returns:
+            Diccionario con 'pagados', 'pendientes', 'importe_pagado',
+            'importe_pendiente' y 'por_mes' (filas con anio, mes y los
+            mismos campos, del mes más reciente al más antiguo), o None si
+            hay error
+        """
+        query = """
+            SELECT anio, mes,
+                   SUM(pagado = 1) as pagados,
+                   SUM(pagado = 0) as pendientes,
+                   ROUND(SUM(CASE WHEN pagado = 1 THEN importe ELSE 0 END), 2) as importe_pagado,
+                   ROUND(SUM(CASE WHEN pagado = 0 THEN importe ELSE 0 END), 2) as importe_pendiente
+            FROM recibo
+        """
+        condiciones = []
+        params = []
+        if anio is not None:
+            condiciones.append("anio = ?")
+            params.append(anio)
+        if mes is not None:
+            condiciones.append("mes = ?")
+            params.append(mes)
+        if condiciones:
+            query += " WHERE " + " AND ".join(condiciones)
+        query += " GROUP BY anio, mes ORDER BY anio DESC, mes DESC"
+        
+        try:
+            with self.conexion() as conexion:
+                por_mes = conexion.execute(query, tuple(params)).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error al resumir recibos: {e}")
+            return None
+        
+        return {
+            'pagados': sum(fila['pagados'] for fila in por_mes),
+            'pendientes': sum(fila['pendientes'] for fila in por_mes),
+            'importe_pagado': round(sum(fila['importe_pagado'] for fila in por_mes), 2),
+            'importe_pendiente': round(sum(fila['importe_pendiente'] for fila in por_mes), 2),
+            'por_mes': por_mes
+        }
     
     # ==================== DATOS DE PRUEBA ====================
     
@@ -641,8 +1993,7 @@ class DatabaseManager:
             ("Pedro", "Sánchez Gil", "56789012E", "600555666", "pedro@email.com"),
         ]
         
-        for c in clientes:
-            self.insertar_cliente(*c)
+        self.insertar_clientes_bulk(clientes)
         
         # Aparatos de prueba
         aparatos = [
@@ -655,8 +2006,9 @@ class DatabaseManager:
             ("Rack de sentadillas", "Musculación", "Rack para sentadillas y dominadas"),
         ]
         
-        for a in aparatos:
-            self.insertar_aparato(*a)
+        with self.transaction():
+            for a in aparatos:
+                self.insertar_aparato(*a)
         
         # Algunas reservas de prueba
         reservas = [
@@ -668,11 +2020,10 @@ class DatabaseManager:
             (5, 5, 4, "20:00"),  # Pedro, Poleas, Jueves 20:00
         ]
         
-        for r in reservas:
-            self.insertar_reserva(*r)
+        self.insertar_reservas_bulk(reservas)
         
         print("Datos de prueba insertados correctamente")
 
 
-# Crear instancia global
+# Crear instancia global (puede compartirse entre hilos: usa un pool de conexiones)
 db = DatabaseManager()
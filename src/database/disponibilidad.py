@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+GymForTheMoment - Índice de Disponibilidad
+Mapa de bits en memoria con las franjas ocupadas de cada aparato
+"""
+
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.franjas import FRANJAS_POR_DIA, HORAS, indice_franja
+
+
+# Rejilla semanal: 5 días x 48 franjas de 30 minutos = 240 bits por aparato
+DIAS = 5
+
+# Bits de un día completo (48 unos)
+MASCARA_DIA = (1 << FRANJAS_POR_DIA) - 1
+
+
+def bit_franja(dia_semana: int, hora: str) -> int:
+    """Posición en el mapa de bits de una franja (día 1-5, hora "HH:MM")"""
+    return (dia_semana - 1) * FRANJAS_POR_DIA + indice_franja(hora)
+
+
+class IndiceDisponibilidad:
+    """
+    Índice en memoria de las franjas reservadas de cada aparato.
+    
+    Cada aparato activo tiene un entero de 240 bits (5 días x 48 franjas)
+    en el que un bit a 1 indica una franja reservada. Se carga una vez
+    desde la base de datos y DatabaseManager lo mantiene al día en cada
+    escritura, de modo que comprobar una franja, listar las libres de un
+    día o buscar un aparato libre no necesita consultar SQLite.
+    
+    La base de datos sigue siendo la referencia: la restricción UNIQUE de
+    reserva es la que impide reservas duplicadas. El índice solo recibe
+    los cambios hechos a través de su DatabaseManager, que lo recarga
+    cuando PRAGMA data_version indica que otra conexión ha escrito.
+    """
+    
+    def __init__(self):
+        self._ocupadas: Dict[int, int] = {}
+        self._datos: Dict[int, Tuple[str, str]] = {}
+        self._por_tipo: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+    
+    def cargar(self, conexion: sqlite3.Connection, compacta: bool = False):
+        """
+        Carga los aparatos activos y sus reservas con dos consultas.
+        
+        Args:
+            conexion: Conexión de la que leer
+            compacta: Si las reservas usan el esquema compacto (se leen las
+                franjas enteras de reserva_franja sin pasar por la vista)
+        """
+        aparatos = conexion.execute(
+            "SELECT id_aparato, tipo, nombre FROM aparato WHERE activo = 1 "
+            "ORDER BY tipo, nombre, id_aparato"
+        ).fetchall()
+        ocupadas = {fila[0]: 0 for fila in aparatos}
+        if compacta:
+            for id_aparato, dia_semana, franja in conexion.execute(
+                    "SELECT id_aparato, dia_semana, franja FROM reserva_franja"):
+                if id_aparato in ocupadas:
+                    ocupadas[id_aparato] |= 1 << ((dia_semana - 1) * FRANJAS_POR_DIA + franja)
+        else:
+            for id_aparato, dia_semana, hora_inicio in conexion.execute(
+                    "SELECT id_aparato, dia_semana, hora_inicio FROM reserva"):
+                if id_aparato in ocupadas:
+                    ocupadas[id_aparato] |= 1 << bit_franja(dia_semana, hora_inicio)
+        
+        por_tipo = {}
+        for id_aparato, tipo, _ in aparatos:
+            por_tipo.setdefault(tipo, []).append(id_aparato)
+        
+        with self._lock:
+            self._ocupadas = ocupadas
+            self._datos = {fila[0]: (fila[2], fila[1]) for fila in aparatos}
+            self._por_tipo = por_tipo
+    
+    # ==================== CONSULTAS ====================
+    
+    def esta_libre(self, id_aparato: int, dia_semana: int, hora: str) -> bool:
+        """Indica si una franja de un aparato no tiene reserva"""
+        return not (self._ocupadas.get(id_aparato, 0) >> bit_franja(dia_semana, hora)) & 1
+    
+    def franjas_libres(self, id_aparato: int, dia_semana: int) -> List[str]:
+        """Devuelve las horas de inicio libres de un aparato en un día"""
+        dia = (self._ocupadas.get(id_aparato, 0) >> ((dia_semana - 1) * FRANJAS_POR_DIA)) & MASCARA_DIA
+        return [HORAS[i] for i in range(FRANJAS_POR_DIA) if not (dia >> i) & 1]
+    
+    def primer_aparato_libre(self, tipo: Optional[str], dia_semana: int,
+                             hora: str) -> Optional[int]:
+        """
+        Devuelve el primer aparato activo (por nombre) libre en una franja.
+        
+        Args:
+            tipo: Tipo de aparato (None para cualquiera)
+            dia_semana: Día de la semana (1=Lunes, 5=Viernes)
+            hora: Hora de inicio "HH:MM"
+        
+        Returns:
+            ID del aparato o None si están todos ocupados
+        """
+        bit = 1 << bit_franja(dia_semana, hora)
+        if tipo is None:
+            candidatos = [a for ids in self._por_tipo.values() for a in ids]
+        else:
+            candidatos = self._por_tipo.get(tipo, [])
+        ocupadas = self._ocupadas
+        for id_aparato in candidatos:
+            if not ocupadas.get(id_aparato, 0) & bit:
+                return id_aparato
+        return None
+    
+    def aparatos_libres_bloque(self, tipo: Optional[str], dia_semana: int,
+                               horas: Iterable[str]) -> List[Tuple[int, int]]:
+        """
+        Busca los aparatos que tienen libres todas las franjas de un bloque.
+        
+        Args:
+            tipo: Tipo de aparato (None para cualquiera)
+            dia_semana: Día de la semana (1=Lunes, 5=Viernes)
+            horas: Horas de inicio "HH:MM" del bloque
+            
+        Returns:
+            Pares (id_aparato, franjas ocupadas ese día), del aparato menos
+            ocupado al más ocupado y, a igualdad, por nombre
+        """
+        desplazamiento = (dia_semana - 1) * FRANJAS_POR_DIA
+        bloque = 0
+        for hora in horas:
+            bloque |= 1 << indice_franja(hora)
+        
+        libres = []
+        for id_aparato in self.aparatos(tipo):
+            dia = (self._ocupadas.get(id_aparato, 0) >> desplazamiento) & MASCARA_DIA
+            if not dia & bloque:
+                libres.append((id_aparato, bin(dia).count("1")))
+        # sorted es estable: se conserva el orden por nombre entre empates
+        return sorted(libres, key=lambda libre: libre[1])
+    
+    def datos_aparato(self, id_aparato: int) -> Optional[Tuple[str, str]]:
+        """Devuelve (nombre, tipo) de un aparato activo del índice"""
+        return self._datos.get(id_aparato)
+    
+    def aparatos(self, tipo: Optional[str] = None) -> List[int]:
+        """Devuelve los aparatos activos del índice, ordenados por tipo y nombre"""
+        if tipo is not None:
+            return list(self._por_tipo.get(tipo, []))
+        return [a for ids in self._por_tipo.values() for a in ids]
+    
+    # ==================== ACTUALIZACIÓN ====================
+    
+    def marcar_ocupada(self, id_aparato: int, dia_semana: int, hora: str):
+        """Marca una franja como reservada"""
+        with self._lock:
+            if id_aparato in self._ocupadas:
+                self._ocupadas[id_aparato] |= 1 << bit_franja(dia_semana, hora)
+    
+    def marcar_ocupadas(self, franjas):
+        """Marca como reservadas varias franjas (id_aparato, dia_semana, hora)"""
+        with self._lock:
+            for id_aparato, dia_semana, hora in franjas:
+                if id_aparato in self._ocupadas:
+                    self._ocupadas[id_aparato] |= 1 << bit_franja(dia_semana, hora)
+    
+    def marcar_libre(self, id_aparato: int, dia_semana: int, hora: str):
+        """Marca una franja como libre"""
+        with self._lock:
+            if id_aparato in self._ocupadas:
+                self._ocupadas[id_aparato] &= ~(1 << bit_franja(dia_semana, hora))
@@ -0,0 +1,517 @@
+# -*- coding: utf-8 -*-
+"""
+GymForTheMoment - Migraciones del Esquema
+Versiones del esquema de la base de datos y el ejecutor que las aplica
+"""
+
+import sqlite3
+from typing import Callable, List, Optional, Tuple, Union
+
+from utils.franjas import HORAS, HORAS_FIN
+
+
+# Un paso de migración es una sentencia SQL o una función que recibe la
+# conexión (para migraciones de datos que no caben en una sentencia)
+Paso = Union[str, Callable[[sqlite3.Connection], None]]
+
+# ==================== VERSIONES DEL ESQUEMA ====================
+
+# Esquema inicial de la aplicación. Usa IF NOT EXISTS para adoptar las
+# bases de datos creadas antes de existir las migraciones.
+ESQUEMA_INICIAL = [
+    # Tabla USUARIO (para login)
+    """
+    CREATE TABLE IF NOT EXISTS usuario (
+        id_usuario INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre VARCHAR(50) NOT NULL,
+        email VARCHAR(100) NOT NULL UNIQUE,
+        password VARCHAR(255) NOT NULL,
+        rol VARCHAR(20) DEFAULT 'empleado',
+        activo BOOLEAN DEFAULT 1,
+        fecha_creacion DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # Tabla CLIENTE
+    """
+    CREATE TABLE IF NOT EXISTS cliente (
+        id_cliente INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre VARCHAR(50) NOT NULL,
+        apellidos VARCHAR(100) NOT NULL,
+        dni VARCHAR(15) NOT NULL UNIQUE,
+        telefono VARCHAR(20),
+        email VARCHAR(100),
+        fecha_alta DATE NOT NULL,
+        activo BOOLEAN DEFAULT 1
+    )
+    """,
+    # Tabla APARATO
+    """
+    CREATE TABLE IF NOT EXISTS aparato (
+        id_aparato INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre VARCHAR(50) NOT NULL,
+        tipo VARCHAR(50) NOT NULL,
+        descripcion TEXT,
+        activo BOOLEAN DEFAULT 1
+    )
+    """,
+    # Tabla RESERVA
+    """
+    CREATE TABLE IF NOT EXISTS reserva (
+        id_reserva INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_cliente INTEGER NOT NULL,
+        id_aparato INTEGER NOT NULL,
+        dia_semana INTEGER NOT NULL CHECK (dia_semana BETWEEN 1 AND 5),
+        hora_inicio TIME NOT NULL,
+        hora_fin TIME NOT NULL,
+        fecha_creacion DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (id_cliente) REFERENCES cliente(id_cliente) ON DELETE CASCADE,
+        FOREIGN KEY (id_aparato) REFERENCES aparato(id_aparato) ON DELETE CASCADE,
+        UNIQUE (id_aparato, dia_semana, hora_inicio)
+    )
+    """,
+    # Tabla RECIBO
+    """
+    CREATE TABLE IF NOT EXISTS recibo (
+        id_recibo INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_cliente INTEGER NOT NULL,
+        mes INTEGER NOT NULL CHECK (mes BETWEEN 1 AND 12),
+        anio INTEGER NOT NULL,
+        importe DECIMAL(10,2) NOT NULL,
+        pagado BOOLEAN DEFAULT 0,
+        fecha_pago DATE,
+        fecha_emision DATE NOT NULL DEFAULT CURRENT_DATE,
+        FOREIGN KEY (id_cliente) REFERENCES cliente(id_cliente) ON DELETE CASCADE,
+        UNIQUE (id_cliente, mes, anio)
+    )
+    """,
+]
+
+# Índices compuestos diseñados a partir de EXPLAIN QUERY PLAN de las
+# consultas de DatabaseManager (ver benchmarks/check_indices.py). Los
+# índices de una sola columna anteriores quedan cubiertos por estos o por
+# las restricciones UNIQUE (id_aparato, dia_semana, hora_inicio) e
+# (id_cliente, mes, anio).
+INDICES_COMPUESTOS = [
+    "DROP INDEX IF EXISTS idx_reserva_dia",
+    "DROP INDEX IF EXISTS idx_reserva_aparato",
+    "DROP INDEX IF EXISTS idx_recibo_pagado",
+    "DROP INDEX IF EXISTS idx_recibo_cliente",
+    # obtener_reservas por día y listados semanales
+    "CREATE INDEX IF NOT EXISTS idx_reserva_dia_aparato_hora "
+    "ON reserva(dia_semana, id_aparato, hora_inicio)",
+    # Reservas de un cliente ordenadas por día y hora; borrado en cascada
+    "CREATE INDEX IF NOT EXISTS idx_reserva_cliente_dia_hora "
+    "ON reserva(id_cliente, dia_semana, hora_inicio)",
+    # Recibos pendientes y morosos (cubre la suma de importes)
+    "CREATE INDEX IF NOT EXISTS idx_recibo_pagado_cliente "
+    "ON recibo(pagado, id_cliente, importe)",
+    # Recibos y clientes al corriente de un mes concreto
+    "CREATE INDEX IF NOT EXISTS idx_recibo_anio_mes "
+    "ON recibo(anio, mes, pagado, id_cliente)",
+    # Búsqueda del cliente asociado a un usuario
+    "CREATE INDEX IF NOT EXISTS idx_cliente_email ON cliente(email)",
+    # Estadísticas para que el planificador elija los índices nuevos
+    "ANALYZE",
+]
+
+# Plantillas de reserva: las franjas semanales fijas de un cliente en un
+# aparato, para volver a reservarlas todas de una vez
+PLANTILLAS_RESERVA = [
+    """
+    CREATE TABLE IF NOT EXISTS plantilla_reserva (
+        id_plantilla INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_cliente INTEGER NOT NULL,
+        id_aparato INTEGER NOT NULL,
+        activa BOOLEAN DEFAULT 1,
+        fecha_creacion DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (id_cliente) REFERENCES cliente(id_cliente) ON DELETE CASCADE,
+        FOREIGN KEY (id_aparato) REFERENCES aparato(id_aparato) ON DELETE CASCADE,
+        UNIQUE (id_cliente, id_aparato)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS plantilla_franja (
+        id_plantilla INTEGER NOT NULL,
+        dia_semana INTEGER NOT NULL CHECK (dia_semana BETWEEN 1 AND 5),
+        hora_inicio TIME NOT NULL,
+        PRIMARY KEY (id_plantilla, dia_semana, hora_inicio),
+        FOREIGN KEY (id_plantilla) REFERENCES plantilla_reserva(id_plantilla) ON DELETE CASCADE
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_plantilla_aparato ON plantilla_reserva(id_aparato)",
+]
+
+# Saldos calculados desde cero a partir de recibo: la migración y
+# DatabaseManager.verificar_saldos los usan para rellenar y comprobar
+# saldo_cliente
+SALDOS_DESDE_RECIBOS = """
+    SELECT id_cliente, COUNT(*), ROUND(SUM(importe), 2), MIN(anio * 100 + mes)
+    FROM recibo
+    WHERE pagado = 0
+    GROUP BY id_cliente
+"""
+
+# Resumen de deuda por cliente mantenido por triggers sobre recibo: solo
+# tiene fila quien debe algo. primer_pendiente es el mes impagado más
+# antiguo como entero AAAAMM (p. ej. 202403). Los importes se redondean a
+# céntimos en cada cambio para no acumular error de coma flotante.
+SALDO_CLIENTE = [
+    """
+    CREATE TABLE IF NOT EXISTS saldo_cliente (
+        id_cliente INTEGER PRIMARY KEY,
+        num_recibos_pendientes INTEGER NOT NULL,
+        total_adeudado DECIMAL(10,2) NOT NULL,
+        primer_pendiente INTEGER NOT NULL,
+        FOREIGN KEY (id_cliente) REFERENCES cliente(id_cliente) ON DELETE CASCADE
+    )
+    """,
+    # Listado de morosos ordenado por deuda
+    "CREATE INDEX IF NOT EXISTS idx_saldo_total ON saldo_cliente(total_adeudado)",
+    # Un recibo pendiente suma al saldo del cliente...
+    """
+    CREATE TRIGGER IF NOT EXISTS recibo_saldo_insertar AFTER INSERT ON recibo
+    WHEN NEW.pagado = 0
+    BEGIN
+        INSERT INTO saldo_cliente (id_cliente, num_recibos_pendientes, total_adeudado, primer_pendiente)
+        VALUES (NEW.id_cliente, 1, ROUND(NEW.importe, 2), NEW.anio * 100 + NEW.mes)
+        ON CONFLICT (id_cliente) DO UPDATE SET
+            num_recibos_pendientes = num_recibos_pendientes + 1,
+            total_adeudado = ROUND(total_adeudado + excluded.total_adeudado, 2),
+            primer_pendiente = MIN(primer_pendiente, excluded.primer_pendiente);
+    END
+    """,
+    # ... y deja de sumar al borrarse o al cambiar (pagarse, otro importe...)
+    """
+    CREATE TRIGGER IF NOT EXISTS recibo_saldo_borrar AFTER DELETE ON recibo
+    WHEN OLD.pagado = 0
+    BEGIN
+        UPDATE saldo_cliente SET
+            num_recibos_pendientes = num_recibos_pendientes - 1,
+            total_adeudado = ROUND(total_adeudado - OLD.importe, 2),
+            primer_pendiente = CASE WHEN primer_pendiente = OLD.anio * 100 + OLD.mes THEN
+                COALESCE((SELECT MIN(anio * 100 + mes) FROM recibo
+                          WHERE pagado = 0 AND id_cliente = OLD.id_cliente), 0)
+                ELSE primer_pendiente END
+        WHERE id_cliente = OLD.id_cliente;
+        DELETE FROM saldo_cliente
+        WHERE id_cliente = OLD.id_cliente AND num_recibos_pendientes <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recibo_saldo_actualizar_quitar
+    AFTER UPDATE OF id_cliente, mes, anio, importe, pagado ON recibo
+    WHEN OLD.pagado = 0
+    BEGIN
+        UPDATE saldo_cliente SET
+            num_recibos_pendientes = num_recibos_pendientes - 1,
+            total_adeudado = ROUND(total_adeudado - OLD.importe, 2),
+            primer_pendiente = CASE WHEN primer_pendiente = OLD.anio * 100 + OLD.mes THEN
+                COALESCE((SELECT MIN(anio * 100 + mes) FROM recibo
+                          WHERE pagado = 0 AND id_cliente = OLD.id_cliente), 0)
+                ELSE primer_pendiente END
+        WHERE id_cliente = OLD.id_cliente;
+        DELETE FROM saldo_cliente
+        WHERE id_cliente = OLD.id_cliente AND num_recibos_pendientes <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recibo_saldo_actualizar_sumar
+    AFTER UPDATE OF id_cliente, mes, anio, importe, pagado ON recibo
+    WHEN NEW.pagado = 0
+    BEGIN
+        INSERT INTO saldo_cliente (id_cliente, num_recibos_pendientes, total_adeudado, primer_pendiente)
+        VALUES (NEW.id_cliente, 1, ROUND(NEW.importe, 2), NEW.anio * 100 + NEW.mes)
+        ON CONFLICT (id_cliente) DO UPDATE SET
+            num_recibos_pendientes = num_recibos_pendientes + 1,
+            total_adeudado = ROUND(total_adeudado + excluded.total_adeudado, 2),
+            primer_pendiente = MIN(primer_pendiente, excluded.primer_pendiente);
+    END
+    """,
+    # Saldos de los recibos que ya existían
+    "DELETE FROM saldo_cliente",
+    f"INSERT INTO saldo_cliente {SALDOS_DESDE_RECIBOS}",
+]
+
+# Resumen de recibos por mes (DatabaseManager.resumen_recibos): con el
+# importe en el índice, el GROUP BY anio, mes lo recorre sin leer la tabla
+INDICE_RESUMEN_RECIBOS = [
+    "DROP INDEX IF EXISTS idx_recibo_anio_mes",
+    "CREATE INDEX IF NOT EXISTS idx_recibo_periodo "
+    "ON recibo(anio, mes, pagado, id_cliente, importe)",
+    "ANALYZE recibo",
+]
+
+# Listados de clientes activos por apellidos y nombre: recorriendo este
+# índice en orden, una página de clientes al corriente (anti-join contra
+# saldo_cliente o recibo) termina en cuanto reúne sus filas
+INDICE_CLIENTES_ACTIVOS = [
+    "CREATE INDEX IF NOT EXISTS idx_cliente_activo_apellidos "
+    "ON cliente(activo, apellidos, nombre)",
+    "ANALYZE cliente",
+]
+
+def _rellenar_franjas(conexion: sqlite3.Connection):
+    """Copia en franja_horaria las tablas de utils.franjas"""
+    conexion.executemany(
+        "INSERT OR REPLACE INTO franja_horaria (franja, hora_inicio, hora_fin) VALUES (?, ?, ?)",
+        ((indice, inicio, fin) for indice, (inicio, fin) in enumerate(zip(HORAS, HORAS_FIN)))
+    )
+
+
+# Las 48 franjas de 30 minutos (las mismas de utils.franjas) para que el
+# SQL traduzca horas a franjas con un JOIN: una hora que no es inicio de
+# franja ("09:15") no encuentra fila, en lugar de truncarse a otra franja
+FRANJAS_HORARIAS = [
+    """
+    CREATE TABLE IF NOT EXISTS franja_horaria (
+        franja SMALLINT PRIMARY KEY CHECK (franja BETWEEN 0 AND 47),
+        hora_inicio TIME NOT NULL UNIQUE,
+        hora_fin TIME NOT NULL
+    )
+    """,
+    _rellenar_franjas,
+]
+
+# Lista ordenada de migraciones: (versión, descripción, pasos).
+# Las migraciones ya publicadas no se modifican; cualquier cambio del
+# esquema se añade al final con la versión siguiente.
+#
+# Una migración que toque reserva debe contar con el esquema compacto
+# (ver RESERVAS_COMPACTAS y reservas_compactas()): en esas bases de datos
+# reserva es una vista sobre reserva_franja con disparadores INSTEAD OF,
+# así que ALTER TABLE reserva, CREATE INDEX ... ON reserva o los cambios
+# de columnas fallan y deben aplicarse a reserva_franja (con un paso
+# función que mire qué esquema hay) o rehacer la vista.
+MIGRACIONES: List[Tuple[int, str, List[Paso]]] = [
+    (1, "Esquema inicial", ESQUEMA_INICIAL),
+    (2, "Índices compuestos para las consultas frecuentes", INDICES_COMPUESTOS),
+    (3, "Plantillas de reserva", PLANTILLAS_RESERVA),
+    (4, "Resumen de deuda por cliente (saldo_cliente)", SALDO_CLIENTE),
+    (5, "Índice cubriente para el resumen de recibos", INDICE_RESUMEN_RECIBOS),
+    (6, "Índice de clientes activos por apellidos", INDICE_CLIENTES_ACTIVOS),
+    (7, "Tabla de franjas horarias", FRANJAS_HORARIAS),
+]
+
+# ==================== ESQUEMA COMPACTO DE RESERVAS ====================
+
+# Esquema opcional (no forma parte de MIGRACIONES, se aplica con
+# compactar_reservas): cada reserva es (id_aparato, dia_semana, franja)
+# con la franja como entero 0-47 y esa terna como clave primaria de una
+# tabla WITHOUT ROWID, de modo que las reservas de un aparato y día están
+# juntas en el árbol y la restricción de unicidad es la propia clave. La
+# vista reserva conserva las columnas de siempre (id_reserva, hora_inicio,
+# hora_fin...) para que las consultas existentes sigan funcionando.
+#
+# id_reserva pasa a ser un número derivado de la clave (ver
+# id_reserva_compacta), así que las reservas cambian de ID al compactar.
+#
+# Las horas se traducen a franjas con franja_horaria. Las reservas cuya
+# hora no es inicio de franja ("09:15", de versiones que no la validaban)
+# o que repiten la franja de otra no caben en la clave: en lugar de
+# abortar la conversión, se apartan con su motivo en reserva_descartada
+# (con su ID y sus horas originales) para volver a reservarlas a mano.
+RESERVAS_COMPACTAS = [
+    """
+    CREATE TABLE reserva_franja (
+        id_aparato INTEGER NOT NULL,
+        dia_semana INTEGER NOT NULL CHECK (dia_semana BETWEEN 1 AND 5),
+        franja SMALLINT NOT NULL CHECK (franja BETWEEN 0 AND 47),
+        id_cliente INTEGER NOT NULL,
+        fecha_creacion DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id_aparato, dia_semana, franja),
+        FOREIGN KEY (id_cliente) REFERENCES cliente(id_cliente) ON DELETE CASCADE,
+        FOREIGN KEY (id_aparato) REFERENCES aparato(id_aparato) ON DELETE CASCADE
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE reserva_descartada (
+        id_reserva INTEGER PRIMARY KEY,
+        id_cliente INTEGER NOT NULL,
+        id_aparato INTEGER NOT NULL,
+        dia_semana INTEGER NOT NULL,
+        hora_inicio TIME NOT NULL,
+        hora_fin TIME NOT NULL,
+        fecha_creacion DATETIME NOT NULL,
+        motivo TEXT NOT NULL
+    )
+    """,
+    """
+    INSERT INTO reserva_descartada
+    SELECT r.id_reserva, r.id_cliente, r.id_aparato, r.dia_semana, r.hora_inicio,
+           r.hora_fin, r.fecha_creacion,
+           CASE WHEN f.franja IS NULL THEN 'La hora no es inicio de una franja de 30 minutos'
+                ELSE 'Repite la franja de otra reserva del aparato' END
+    FROM reserva r
+    LEFT JOIN franja_horaria f ON f.hora_inicio = r.hora_inicio
+    WHERE f.franja IS NULL OR EXISTS (
+        SELECT 1 FROM reserva o
+        WHERE o.id_aparato = r.id_aparato AND o.dia_semana = r.dia_semana
+          AND o.hora_inicio = r.hora_inicio AND o.id_reserva < r.id_reserva
+    )
+    """,
+    """
+    INSERT INTO reserva_franja (id_aparato, dia_semana, franja, id_cliente, fecha_creacion)
+    SELECT r.id_aparato, r.dia_semana, f.franja, r.id_cliente, r.fecha_creacion
+    FROM reserva r
+    JOIN franja_horaria f ON f.hora_inicio = r.hora_inicio
+    WHERE r.id_reserva NOT IN (SELECT id_reserva FROM reserva_descartada)
+    """,
+    "DROP TABLE reserva",
+    # Mismos usos que idx_reserva_dia_aparato_hora e idx_reserva_cliente_dia_hora
+    "CREATE INDEX idx_reserva_franja_dia ON reserva_franja(dia_semana, id_aparato, franja)",
+    "CREATE INDEX idx_reserva_franja_cliente ON reserva_franja(id_cliente, dia_semana, franja)",
+    """
+    CREATE VIEW reserva AS
+    SELECT id_aparato * 240 + (dia_semana - 1) * 48 + franja AS id_reserva,
+           id_cliente, id_aparato, dia_semana,
+           printf('%02d:%02d', franja / 2, franja % 2 * 30) AS hora_inicio,
+           printf('%02d:%02d', (franja + 1) % 48 / 2, (franja + 1) % 2 * 30) AS hora_fin,
+           fecha_creacion
+    FROM reserva_franja
+    """,
+    # Escrituras a través de la vista (las de DatabaseManager y cualquier
+    # otra herramienta que use las columnas de siempre)
+    """
+    CREATE TRIGGER reserva_insertar INSTEAD OF INSERT ON reserva
+    BEGIN
+        -- Una hora que no es inicio de franja deja franja a NULL y se rechaza
+        INSERT INTO reserva_franja (id_aparato, dia_semana, franja, id_cliente, fecha_creacion)
+        VALUES (NEW.id_aparato, NEW.dia_semana,
+                (SELECT franja FROM franja_horaria WHERE hora_inicio = NEW.hora_inicio),
+                NEW.id_cliente, COALESCE(NEW.fecha_creacion, CURRENT_TIMESTAMP));
+    END
+    """,
+    """
+    CREATE TRIGGER reserva_borrar INSTEAD OF DELETE ON reserva
+    BEGIN
+        DELETE FROM reserva_franja
+        WHERE id_aparato = OLD.id_aparato AND dia_semana = OLD.dia_semana
+          AND franja = OLD.id_reserva % 48;
+    END
+    """,
+    "ANALYZE reserva_franja",
+]
+
+
+def id_reserva_compacta(id_aparato: int, dia_semana: int, franja: int) -> int:
+    """ID de una reserva en el esquema compacto (el mismo que calcula la vista)"""
+    return id_aparato * 240 + (dia_semana - 1) * 48 + franja
+
+
+def clave_reserva_compacta(id_reserva: int) -> Tuple[int, int, int]:
+    """Convierte un ID del esquema compacto en (id_aparato, dia_semana, franja)"""
+    id_aparato, resto = divmod(id_reserva, 240)
+    return id_aparato, resto // 48 + 1, resto % 48
+
+
+def reservas_compactas(conexion: sqlite3.Connection) -> bool:
+    """Indica si la base de datos usa el esquema compacto de reservas"""
+    return conexion.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'reserva_franja'"
+    ).fetchone() is not None
+
+
+def compactar_reservas(db) -> Optional[List[sqlite3.Row]]:
+    """
+    Pasa las reservas al esquema compacto (RESERVAS_COMPACTAS).
+    
+    Se hace en una única transacción BEGIN IMMEDIATE: si algo falla, la
+    tabla reserva queda como estaba.
+    
+    Args:
+        db: DatabaseManager conectado y con el esquema al día
+    
+    Returns:
+        Reservas que no se pudieron convertir (las de reserva_descartada,
+        vacía si ninguna) o None si ya estaba compactada
+    
+    Raises:
+        sqlite3.Error: Si falla la conversión (no queda nada aplicado)
+    """
+    with db.transaction(inmediata=True):
+        with db.conexion() as conexion:
+            if reservas_compactas(conexion):
+                return None
+            for paso in RESERVAS_COMPACTAS:
+                conexion.execute(paso)
+            return conexion.execute(
+                "SELECT * FROM reserva_descartada ORDER BY id_aparato, dia_semana, hora_inicio"
+            ).fetchall()
+
+
+# ==================== EJECUTOR ====================
+
+def version_actual(conexion: sqlite3.Connection) -> int:
+    """
+    Devuelve la versión del esquema de una base de datos.
+    
+    Es una sola consulta a schema_version; una base de datos que aún no
+    tiene la tabla está en la versión 0.
+    """
+    try:
+        fila = conexion.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return fila[0] or 0
+
+
+def version_objetivo(migraciones=None) -> int:
+    """Devuelve la versión del esquema que espera la aplicación"""
+    migraciones = MIGRACIONES if migraciones is None else migraciones
+    return migraciones[-1][0] if migraciones else 0
+
+
+def aplicar_migraciones(db, migraciones=None) -> List[int]:
+    """
+    Aplica las migraciones pendientes de una base de datos.
+    
+    Si el esquema ya está al día solo se hace la comprobación de versión.
+    Si no, todas las migraciones pendientes se aplican en una única
+    transacción (BEGIN IMMEDIATE, para que dos instancias no migren a la
+    vez): o se aplican todas o no se aplica ninguna.
+    
+    Args:
+        db: DatabaseManager conectado
+        migraciones: Lista de migraciones (por defecto, MIGRACIONES)
+    
+    Returns:
+        Versiones aplicadas (vacía si no había nada pendiente)
+    
+    Raises:
+        sqlite3.Error: Si falla alguna migración (no queda nada aplicado)
+    """
+    migraciones = MIGRACIONES if migraciones is None else migraciones
+    objetivo = version_objetivo(migraciones)
+    
+    with db.conexion() as conexion:
+        if version_actual(conexion) >= objetivo:
+            return []
+    
+    aplicadas = []
+    with db.transaction(inmediata=True):
+        with db.conexion() as conexion:
+            # Otra instancia pudo migrar mientras se esperaba el bloqueo
+            version = version_actual(conexion)
+            conexion.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    descripcion TEXT NOT NULL,
+                    fecha_aplicacion DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            for numero, descripcion, pasos in migraciones:
+                if numero <= version:
+                    continue
+                for paso in pasos:
+                    if callable(paso):
+                        paso(conexion)
+                    else:
+                        conexion.execute(paso)
+                conexion.execute(
+                    "INSERT INTO schema_version (version, descripcion) VALUES (?, ?)",
+                    (numero, descripcion)
+                )
+                aplicadas.append(numero)
+    
+    return aplicadas
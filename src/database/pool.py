@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+GymForTheMoment - Pool de Conexiones
+Pool acotado de conexiones SQLite compartido entre hilos
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones SQLite de tamaño acotado.
+    
+    Cada conexión la usa un solo hilo a la vez: se obtiene con obtener(),
+    se devuelve con liberar() y entre medias pertenece en exclusiva a
+    quien la tomó. Al obtenerla, si llevaba un rato sin usarse, se
+    comprueba que sigue siendo válida y, si no lo es, se sustituye por
+    una nueva.
+    """
+    
+    def __init__(self, crear_conexion: Callable[[], sqlite3.Connection],
+                 max_conexiones: int = 8, timeout: float = 10.0,
+                 verificar_tras: float = 5.0):
+        """
+        Inicializa el pool.
+        
+        Args:
+            crear_conexion: Función que abre y configura una conexión nueva
+            max_conexiones: Número máximo de conexiones abiertas a la vez
+            timeout: Segundos de espera máxima por una conexión libre
+            verificar_tras: Segundos de inactividad a partir de los cuales
+                            se comprueba la conexión antes de entregarla
+        """
+        if max_conexiones < 1:
+            raise ValueError("El pool necesita al menos una conexión")
+        self._crear_conexion = crear_conexion
+        self.max_conexiones = max_conexiones
+        self.timeout = timeout
+        self.verificar_tras = verificar_tras
+        self._libres = queue.LifoQueue()
+        self._huecos = threading.BoundedSemaphore(max_conexiones)
+        self._lock = threading.Lock()
+        self._abiertas = set()
+        self._traza = None
+        self._cerrado = False
+    
+    def obtener(self) -> sqlite3.Connection:
+        """
+        Obtiene una conexión del pool, esperando si están todas en uso.
+        
+        Returns:
+            Conexión lista para usar
+        
+        Raises:
+            sqlite3.OperationalError: Si no queda ninguna libre tras el timeout
+            sqlite3.ProgrammingError: Si el pool está cerrado
+        """
+        if self._cerrado:
+            raise sqlite3.ProgrammingError("El pool de conexiones está cerrado")
+        if not self._huecos.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError(
+                f"No hay conexiones libres tras esperar {self.timeout} s"
+            )
+        try:
+            try:
+                conexion, liberada = self._libres.get_nowait()
+            except queue.Empty:
+                conexion = None
+            
+            if (conexion is not None
+                    and time.monotonic() - liberada >= self.verificar_tras
+                    and not self._es_valida(conexion)):
+                self._descartar(conexion)
+                conexion = None
+            
+            if conexion is None:
+                conexion = self._abrir()
+            return conexion
+        except BaseException:
+            self._huecos.release()
+            raise
+    
+    def liberar(self, conexion: sqlite3.Connection):
+        """
+        Devuelve una conexión al pool.
+        
+        Si la conexión quedó con una transacción abierta se deshace, para
+        que el siguiente hilo no herede cambios a medias.
+        """
+        try:
+            if conexion.in_transaction:
+                conexion.rollback()
+            if self._cerrado:
+                self._descartar(conexion)
+            else:
+                self._libres.put((conexion, time.monotonic()))
+        except sqlite3.Error:
+            self._descartar(conexion)
+        finally:
+            self._huecos.release()
+    
+    @contextmanager
+    def conexion(self):
+        """Obtiene una conexión para el bloque y la devuelve al salir"""
+        conexion = self.obtener()
+        try:
+            yield conexion
+        finally:
+            self.liberar(conexion)
+    
+    def set_trace_callback(self, funcion: Optional[Callable[[str], None]]):
+        """Instala una función de traza SQL en todas las conexiones del pool"""
+        with self._lock:
+            self._traza = funcion
+            for conexion in self._abiertas:
+                conexion.set_trace_callback(funcion)
+    
+    def reconfigurar(self, configurar: Callable[[sqlite3.Connection], None]):
+        """Aplica configurar() a todas las conexiones libres del pool"""
+        libres = []
+        while True:
+            try:
+                libres.append(self._libres.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            for conexion, _ in libres:
+                configurar(conexion)
+        finally:
+            for libre in libres:
+                self._libres.put(libre)
+    
+    def cerrar(self):
+        """Cierra las conexiones libres; las que están en uso se cierran al liberarse"""
+        self._cerrado = True
+        while True:
+            try:
+                conexion, _ = self._libres.get_nowait()
+            except queue.Empty:
+                break
+            self._descartar(conexion)
+    
+    @property
+    def conexiones_abiertas(self) -> int:
+        """Número de conexiones abiertas (libres o en uso)"""
+        with self._lock:
+            return len(self._abiertas)
+    
+    def _abrir(self) -> sqlite3.Connection:
+        """Abre una conexión nueva y la registra en el pool"""
+        conexion = self._crear_conexion()
+        with self._lock:
+            self._abiertas.add(conexion)
+            if self._traza is not None:
+                conexion.set_trace_callback(self._traza)
+        return conexion
+    
+    def _descartar(self, conexion: sqlite3.Connection):
+        """Cierra una conexión y la elimina del registro"""
+        with self._lock:
+            self._abiertas.discard(conexion)
+        try:
+            conexion.close()
+        except sqlite3.Error:
+            pass
+    
+    @staticmethod
+    def _es_valida(conexion: sqlite3.Connection) -> bool:
+        """Comprueba que una conexión sigue abierta y responde"""
+        try:
+            conexion.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
@@ -5,30 +5,40 @@ Aplicación de gestión de gimnasio con interfaz Tkinter
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox, simpledialog, filedialog
 from datetime import datetime
 import sys
 import os
+import time
 
 # Añadir el directorio padre al path para imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database.db_manager import DatabaseManager
+from database.db_manager import DatabaseManager, CuotaExcedida
+from gui.tareas import EjecutorTareas
+from gui.tabla_virtual import TablaVirtual
 from utils.helpers import (
     DIAS_SEMANA, MESES, MENSUALIDAD,
     obtener_nombre_dia, obtener_nombre_mes,
-    generar_franjas_horarias, validar_dni, validar_email,
+    validar_dni, validar_email,
     formatear_moneda, obtener_anio_actual, obtener_mes_actual
 )
+from utils.franjas import HORAS, INDICE_HORA
+from utils.banco import leer_cobros_banco
+from utils.exportar import (
+    XLSX_DISPONIBLE, exportar_recibos, exportar_morosos, exportar_ocupacion
+)
 
 
 class GymApp:
     """Aplicación principal de gestión del gimnasio"""
     
-    def __init__(self, root, usuario):
+    def __init__(self, root, usuario, db=None, perfilar=False):
         self.root = root
         self.usuario = usuario  # Guardar info del usuario autenticado
         self.cerro_sesion = False  # Flag para saber si cerró sesión o salió
+        self.perfilar = perfilar  # Mostrar tiempos de construcción de pestañas
+        self.tiempos_pestanas = {}  # Nombre de pestaña -> segundos en construirla
         self.root.title("GymForTheMoment - Sistema de Gestion")
         self.root.geometry("1200x700")
         self.root.minsize(1000, 600)
@@ -175,18 +185,20 @@ class GymApp:
                            borderwidth=0,
                            arrowcolor=self.COLOR_AMARILLO)
         
-        # Inicializar base de datos
-        self.db = DatabaseManager()
-        self.db.connect()
-        self.db.create_tables()
+        # Base de datos: la de la sesión si se recibe (se mantiene abierta al
+        # cerrar sesión) o una propia que se cierra con la ventana
+        self.db_propia = db is None
+        if self.db_propia:
+            db = DatabaseManager()
+            db.connect()  # El esquema ya lo migró LoginWindow
+        self.db = db
         
-        # Crear interfaz
-        self.crear_interfaz()
+        # Consultas en segundo plano para no congelar la ventana
+        self.tareas = EjecutorTareas(self.root, al_cambiar_estado=self.indicar_carga)
         
-        # Cargar datos iniciales
-        if self.usuario['rol'] == 'admin':
-            self.cargar_clientes()
-        self.cargar_aparatos()
+        # Crear interfaz (solo se construye la pestaña visible; las demás
+        # se construyen y cargan la primera vez que se seleccionan)
+        self.crear_interfaz()
         
     def crear_interfaz(self):
         """Crea la interfaz principal con pestañas"""
@@ -200,6 +212,14 @@ class GymApp:
         menu_archivo = tk.Menu(menubar, tearoff=0, bg=self.COLOR_GRIS, fg=self.COLOR_TEXTO,
                               activebackground=self.COLOR_ROJO, activeforeground=self.COLOR_BLANCO)
         menubar.add_cascade(label="Archivo", menu=menu_archivo)
+        if self.usuario['rol'] == 'admin':
+            menu_exportar = tk.Menu(menu_archivo, tearoff=0, bg=self.COLOR_GRIS, fg=self.COLOR_TEXTO,
+                                    activebackground=self.COLOR_ROJO, activeforeground=self.COLOR_BLANCO)
+            menu_archivo.add_cascade(label="Exportar", menu=menu_exportar)
+            menu_exportar.add_command(label="Recibos del año...", command=self.exportar_recibos)
+            menu_exportar.add_command(label="Clientes morosos...", command=self.exportar_morosos)
+            menu_exportar.add_command(label="Ocupación semanal...", command=self.exportar_ocupacion)
+            menu_archivo.add_separator()
         menu_archivo.add_command(label="Salir", command=self.on_closing)
         
         # Menú Ayuda
@@ -266,21 +286,73 @@ class GymApp:
         # Barra de estado (crear antes de configurar pestañas)
         self.status_var = tk.StringVar(value=f"Usuario: {self.usuario['nombre']} ({self.usuario['rol']}) | Listo")
         
-        # Configurar cada pestaña
+        # Cada pestaña se configura y carga sus datos al mostrarse por primera vez
+        self.pestanas_pendientes = {
+            str(self.tab_aparatos): ("Aparatos", self.configurar_tab_aparatos, self.cargar_aparatos),
+            str(self.tab_reservas): ("Reservas", self.configurar_tab_reservas, None),
+            str(self.tab_ocupacion): ("Ocupacion", self.configurar_tab_ocupacion, None),
+            str(self.tab_pagos): ("Pagos", self.configurar_tab_pagos, None),
+            str(self.tab_morosos): ("Morosos", self.configurar_tab_morosos, None),
+        }
         if self.usuario['rol'] == 'admin':
-            self.configurar_tab_clientes()
-        self.configurar_tab_aparatos()
-        self.configurar_tab_reservas()
-        self.configurar_tab_ocupacion()
-        self.configurar_tab_pagos()
-        self.configurar_tab_morosos()
+            self.pestanas_pendientes[str(self.tab_clientes)] = (
+                "Clientes", self.configurar_tab_clientes, self.cargar_clientes
+            )
+        self.notebook.bind('<<NotebookTabChanged>>', self.al_cambiar_pestana)
+        
+        frame_estado = ttk.Frame(self.main_frame)
+        frame_estado.pack(fill=tk.X, pady=(10, 0))
+        
         self.status_bar = ttk.Label(
-            self.main_frame, 
+            frame_estado, 
             textvariable=self.status_var,
             relief=tk.SUNKEN,
             anchor=tk.W
         )
-        self.status_bar.pack(fill=tk.X, pady=(10, 0))
+        self.status_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        # Indicador de carga (visible mientras hay consultas en segundo plano)
+        self.label_cargando = ttk.Label(
+            frame_estado,
+            text="",
+            relief=tk.SUNKEN,
+            width=14,
+            anchor=tk.CENTER,
+            foreground=self.COLOR_AMARILLO
+        )
+        self.label_cargando.pack(side=tk.RIGHT)
+        
+        # Construir ya la pestaña inicial
+        self.construir_pestana(self.notebook.select())
+    
+    def al_cambiar_pestana(self, event=None):
+        """Construye la pestaña seleccionada si aún no se había mostrado"""
+        self.construir_pestana(self.notebook.select())
+    
+    def construir_pestana(self, pestana):
+        """
+        Configura una pestaña y carga sus datos iniciales (solo la primera vez).
+        
+        Args:
+            pestana: Identificador de la pestaña en el notebook
+        """
+        pendiente = self.pestanas_pendientes.pop(str(pestana), None)
+        if pendiente is None:
+            return
+        nombre, configurar, cargar = pendiente
+        
+        inicio = time.perf_counter()
+        configurar()
+        if cargar is not None:
+            cargar()
+        self.tiempos_pestanas[nombre] = time.perf_counter() - inicio
+        
+        if self.perfilar:
+            print(f"[arranque] Pestaña {nombre} construida en {self.tiempos_pestanas[nombre] * 1000:.1f} ms")
+    
+    def pestana_construida(self, pestana) -> bool:
+        """Indica si una pestaña ya se ha configurado"""
+        return str(pestana) not in self.pestanas_pendientes
     
     # ==================== PESTAÑA CLIENTES ====================
     
@@ -313,7 +385,8 @@ class GymApp:
         
         # Treeview para clientes
         columns = ('ID', 'Nombre', 'Apellidos', 'DNI', 'Teléfono', 'Email', 'Fecha Alta')
-        self.tree_clientes = ttk.Treeview(frame_lista, columns=columns, show='headings', height=20)
+        self.tabla_clientes = TablaVirtual(frame_lista, columns=columns, height=20)
+        self.tree_clientes = self.tabla_clientes.tree
         
         self.tree_clientes.heading('ID', text='ID')
         self.tree_clientes.heading('Nombre', text='Nombre')
@@ -331,12 +404,7 @@ class GymApp:
         self.tree_clientes.column('Email', width=200)
         self.tree_clientes.column('Fecha Alta', width=100, anchor=tk.CENTER)
         
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(frame_lista, orient=tk.VERTICAL, command=self.tree_clientes.yview)
-        self.tree_clientes.configure(yscrollcommand=scrollbar.set)
-        
-        self.tree_clientes.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tabla_clientes.pack(fill=tk.BOTH, expand=True)
         
         # Frame para botones
         frame_botones = ttk.Frame(self.tab_clientes)
@@ -384,23 +452,18 @@ class GymApp:
     
     def cargar_clientes(self):
         """Carga los clientes en el treeview"""
-        # Limpiar treeview
-        for item in self.tree_clientes.get_children():
-            self.tree_clientes.delete(item)
-        
         # Obtener clientes
         clientes = self.db.obtener_clientes()
         
-        for cliente in clientes:
-            self.tree_clientes.insert('', tk.END, values=(
-                cliente['id_cliente'],
-                cliente['nombre'],
-                cliente['apellidos'],
-                cliente['dni'],
-                cliente['telefono'] or '',
-                cliente['email'] or '',
-                cliente['fecha_alta'][:10] if cliente['fecha_alta'] else ''
-            ))
+        self.tabla_clientes.cargar(clientes, formatear=lambda cliente: (
+            cliente['id_cliente'],
+            cliente['nombre'],
+            cliente['apellidos'],
+            cliente['dni'],
+            cliente['telefono'] or '',
+            cliente['email'] or '',
+            cliente['fecha_alta'][:10] if cliente['fecha_alta'] else ''
+        ))
         
         self.status_var.set(f"Usuario: {self.usuario['nombre']} ({self.usuario['rol']}) | {len(clientes)} clientes registrados")
     
@@ -431,12 +494,9 @@ class GymApp:
             return
         
         # Obtener info del cliente
-        selection = self.tree_clientes.selection()
-        if not selection:
+        values = self.tabla_clientes.valores_seleccionados()
+        if not values:
             return
-            
-        item = self.tree_clientes.item(selection[0])
-        values = item['values']
         nombre_completo = f"{values[1]} {values[2]}"
         
         if messagebox.askyesno("Confirmar Eliminación", 
@@ -464,7 +524,8 @@ class GymApp:
             frame_lista.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 5))
             
             columns = ('ID', 'Nombre', 'Tipo', 'Descripción')
-            self.tree_aparatos = ttk.Treeview(frame_lista, columns=columns, show='headings', height=15)
+            self.tabla_aparatos = TablaVirtual(frame_lista, columns=columns, height=15)
+            self.tree_aparatos = self.tabla_aparatos.tree
             
             for col in columns:
                 self.tree_aparatos.heading(col, text=col)
@@ -474,11 +535,7 @@ class GymApp:
             self.tree_aparatos.column('Tipo', width=100)
             self.tree_aparatos.column('Descripción', width=200)
             
-            scrollbar = ttk.Scrollbar(frame_lista, orient=tk.VERTICAL, command=self.tree_aparatos.yview)
-            self.tree_aparatos.configure(yscrollcommand=scrollbar.set)
-            
-            self.tree_aparatos.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            self.tabla_aparatos.pack(fill=tk.BOTH, expand=True)
             
             # Frame derecho: Formulario
             frame_form = ttk.LabelFrame(self.tab_aparatos, text="Datos del Aparato", padding="10")
@@ -522,7 +579,8 @@ class GymApp:
             frame_lista.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 10))
             
             columns = ('ID', 'Nombre', 'Tipo', 'Descripción')
-            self.tree_aparatos = ttk.Treeview(frame_lista, columns=columns, show='headings', height=25)
+            self.tabla_aparatos = TablaVirtual(frame_lista, columns=columns, height=25)
+            self.tree_aparatos = self.tabla_aparatos.tree
             
             self.tree_aparatos.heading('ID', text='ID')
             self.tree_aparatos.heading('Nombre', text='Nombre')
@@ -534,11 +592,7 @@ class GymApp:
             self.tree_aparatos.column('Tipo', width=150)
             self.tree_aparatos.column('Descripción', width=400)
             
-            scrollbar = ttk.Scrollbar(frame_lista, orient=tk.VERTICAL, command=self.tree_aparatos.yview)
-            self.tree_aparatos.configure(yscrollcommand=scrollbar.set)
-            
-            self.tree_aparatos.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            self.tabla_aparatos.pack(fill=tk.BOTH, expand=True)
             
             # Botón refrescar
             btn_refrescar = tk.Button(
@@ -557,18 +611,14 @@ class GymApp:
     
     def cargar_aparatos(self):
         """Carga los aparatos en el treeview"""
-        for item in self.tree_aparatos.get_children():
-            self.tree_aparatos.delete(item)
-        
         aparatos = self.db.obtener_aparatos()
         
-        for aparato in aparatos:
-            self.tree_aparatos.insert('', tk.END, values=(
-                aparato['id_aparato'],
-                aparato['nombre'],
-                aparato['tipo'],
-                aparato['descripcion'] or ''
-            ))
+        self.tabla_aparatos.cargar(aparatos, formatear=lambda aparato: (
+            aparato['id_aparato'],
+            aparato['nombre'],
+            aparato['tipo'],
+            aparato['descripcion'] or ''
+        ))
         
         self.status_var.set(f"Se cargaron {len(aparatos)} aparatos")
     
@@ -665,8 +715,7 @@ class GymApp:
         
         ttk.Label(frame_fila2, text="Hora:").pack(side=tk.LEFT, padx=5)
         self.combo_reserva_hora = ttk.Combobox(frame_fila2, width=25, state='readonly')
-        franjas = generar_franjas_horarias()
-        self.combo_reserva_hora['values'] = [f[0] for f in franjas]
+        self.combo_reserva_hora['values'] = HORAS
         self.combo_reserva_hora.pack(side=tk.LEFT, padx=5)
         
         # Botón agregar hora
@@ -697,6 +746,20 @@ class GymApp:
             bd=0
         ).pack(side=tk.LEFT, padx=5, ipadx=10, ipady=5)
         
+        # Botón guardar las franjas como plantilla semanal del cliente
+        tk.Button(
+            frame_fila2,
+            text="Guardar como plantilla",
+            font=('Arial', 9),
+            bg=self.COLOR_GRIS,
+            fg=self.COLOR_TEXTO,
+            activebackground=self.COLOR_GRIS_CLARO,
+            command=self.guardar_plantilla_reserva,
+            cursor='hand2',
+            relief=tk.FLAT,
+            bd=0
+        ).pack(side=tk.LEFT, padx=5, ipadx=10, ipady=5)
+        
         # Fila 3: Lista de horas seleccionadas
         frame_fila3 = ttk.Frame(frame_nueva)
         frame_fila3.pack(fill=tk.X, pady=5)
@@ -730,6 +793,31 @@ class GymApp:
             bd=0
         ).pack(side=tk.LEFT, padx=20, ipadx=20, ipady=8)
         
+        # Frame intermedio: buscar un aparato libre para el día y las horas elegidos
+        frame_buscar = ttk.LabelFrame(self.tab_reservas, text="Buscar Aparato Libre (para el día y las horas seleccionados)", padding="10")
+        frame_buscar.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Label(frame_buscar, text="Tipo:").pack(side=tk.LEFT, padx=5)
+        self.combo_buscar_tipo = ttk.Combobox(frame_buscar, width=18, state='readonly')
+        self.combo_buscar_tipo.pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(frame_buscar, text="Buscar", command=self.buscar_aparato_libre).pack(side=tk.LEFT, padx=10)
+        
+        # Resultados: al seleccionar uno se elige como aparato de la reserva
+        self.listbox_aparatos_libres = tk.Listbox(
+            frame_buscar,
+            height=3,
+            width=60,
+            bg=self.COLOR_GRIS_CLARO,
+            fg=self.COLOR_AMARILLO,
+            selectbackground=self.COLOR_ROJO,
+            selectforeground=self.COLOR_BLANCO,
+            font=('Arial', 9)
+        )
+        self.listbox_aparatos_libres.pack(side=tk.LEFT, padx=5)
+        self.listbox_aparatos_libres.bind('<<ListboxSelect>>', self.seleccionar_aparato_libre)
+        self.aparatos_libres = []
+        
         # Frame inferior: Lista de reservas
         frame_lista = ttk.LabelFrame(self.tab_reservas, text="Reservas Actuales", padding="5")
         frame_lista.pack(fill=tk.BOTH, expand=True)
@@ -746,10 +834,12 @@ class GymApp:
         self.combo_filtro_dia.bind('<<ComboboxSelected>>', self.filtrar_reservas)
         
         ttk.Button(frame_filtro, text="Cancelar Reserva", command=self.cancelar_reserva).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(frame_filtro, text="Aplicar Plantillas", command=self.aplicar_plantillas_reserva).pack(side=tk.RIGHT, padx=5)
         
         # Treeview
         columns = ('ID', 'Cliente', 'Aparato', 'Día', 'Hora Inicio', 'Hora Fin')
-        self.tree_reservas = ttk.Treeview(frame_lista, columns=columns, show='headings', height=12)
+        self.tabla_reservas = TablaVirtual(frame_lista, columns=columns, height=12)
+        self.tree_reservas = self.tabla_reservas.tree
         
         for col in columns:
             self.tree_reservas.heading(col, text=col)
@@ -761,11 +851,7 @@ class GymApp:
         self.tree_reservas.column('Hora Inicio', width=100)
         self.tree_reservas.column('Hora Fin', width=100)
         
-        scrollbar = ttk.Scrollbar(frame_lista, orient=tk.VERTICAL, command=self.tree_reservas.yview)
-        self.tree_reservas.configure(yscrollcommand=scrollbar.set)
-        
-        self.tree_reservas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tabla_reservas.pack(fill=tk.BOTH, expand=True)
         
         # Cargar datos en combos
         self.actualizar_combos_reserva()
@@ -784,32 +870,75 @@ class GymApp:
         self.combo_reserva_aparato['values'] = [
             f"{a['id_aparato']} - {a['nombre']}" for a in aparatos
         ]
+        
+        # Tipos para la búsqueda de aparatos libres
+        tipos = sorted({a['tipo'] for a in aparatos})
+        self.combo_buscar_tipo['values'] = ['Todos'] + tipos
+        if not self.combo_buscar_tipo.get():
+            self.combo_buscar_tipo.set('Todos')
+    
+    def buscar_aparato_libre(self):
+        """Busca aparatos que tengan libres todas las horas seleccionadas"""
+        dia_sel = self.combo_reserva_dia.get()
+        num_horas = self.listbox_horas_seleccionadas.size()
+        horas = [self.listbox_horas_seleccionadas.get(i) for i in range(num_horas)]
+        
+        if not dia_sel or not horas:
+            messagebox.showwarning("Aviso", "Seleccione un día y agregue al menos una hora")
+            return
+        
+        dia_num = [k for k, v in DIAS_SEMANA.items() if v == dia_sel][0]
+        tipo = self.combo_buscar_tipo.get()
+        tipo = None if tipo in ('', 'Todos') else tipo
+        
+        self.aparatos_libres = self.db.buscar_aparatos_libres(tipo, dia_num, horas)
+        self.listbox_aparatos_libres.delete(0, tk.END)
+        for aparato in self.aparatos_libres:
+            self.listbox_aparatos_libres.insert(
+                tk.END,
+                f"{aparato['aparato_nombre']} ({aparato['aparato_tipo']}) - "
+                f"{aparato['franjas_ocupadas']} franjas ocupadas ese día"
+            )
+        
+        if self.aparatos_libres:
+            self.status_var.set(f"{len(self.aparatos_libres)} aparatos libres para {len(horas)} franja(s) del {dia_sel}")
+        else:
+            self.status_var.set(f"Ningún aparato tiene libres esas {len(horas)} franja(s) del {dia_sel}")
+    
+    def seleccionar_aparato_libre(self, event=None):
+        """Elige como aparato de la reserva el seleccionado en la búsqueda"""
+        selection = self.listbox_aparatos_libres.curselection()
+        if not selection:
+            return
+        aparato = self.aparatos_libres[selection[0]]
+        self.combo_reserva_aparato.set(f"{aparato['aparato_id']} - {aparato['aparato_nombre']}")
     
     def cargar_reservas(self, dia_filtro=None):
-        """Carga las reservas en el treeview"""
-        for item in self.tree_reservas.get_children():
-            self.tree_reservas.delete(item)
-        
-        # Obtener todas las reservas de todos los días
-        todas_reservas = []
-        for dia_num in range(1, 6):
-            if dia_filtro and DIAS_SEMANA[dia_num] != dia_filtro:
-                continue
-            reservas = self.db.obtener_reservas_por_dia(dia_num)
-            for r in reservas:
-                todas_reservas.append(r)
-        
-        for reserva in todas_reservas:
-            self.tree_reservas.insert('', tk.END, values=(
+        """Carga las reservas en el treeview página a página (en segundo plano)"""
+        dia = None
+        if dia_filtro:
+            dia = next(num for num, nombre in DIAS_SEMANA.items() if nombre == dia_filtro)
+        
+        self.tabla_reservas.cargar_paginado(
+            lambda ultima, limite: self.db.obtener_reservas(dia=dia, limite=limite,
+                                                            despues_de=ultima),
+            formatear=lambda reserva: (
                 reserva['id_reserva'],
                 f"{reserva['cliente_nombre']} {reserva['cliente_apellidos']}",
                 reserva['aparato_nombre'],
                 DIAS_SEMANA.get(reserva['dia_semana'], ''),
                 reserva['hora_inicio'],
                 reserva['hora_fin']
-            ))
-        
-        self.status_var.set(f"Se cargaron {len(todas_reservas)} reservas")
+            ),
+            ejecutor=self.tareas,
+            al_fallar=self.mostrar_error_carga,
+            al_recibir=self.mostrar_total_reservas
+        )
+    
+    def mostrar_total_reservas(self, tabla):
+        """Muestra en la barra de estado cuántas reservas se han cargado"""
+        mas = "" if tabla.completa else "+"
+        self.status_var.set(f"Se cargaron {len(tabla.filas)}{mas} reservas")
     
     def filtrar_reservas(self, event=None):
         """Filtra las reservas por día"""
@@ -833,8 +962,9 @@ class GymApp:
             messagebox.showwarning("Aviso", "Esta hora ya está en la lista")
             return
         
-        # Agregar a la lista
-        self.listbox_horas_seleccionadas.insert(tk.END, hora)
+        # Agregar a la lista manteniendo el orden de las franjas
+        posicion = sum(1 for h in horas_actuales if INDICE_HORA[h] < INDICE_HORA[hora])
+        self.listbox_horas_seleccionadas.insert(posicion, hora)
         self.combo_reserva_hora.set('')  # Limpiar combobox
     
     def limpiar_horas_reserva(self):
@@ -864,28 +994,21 @@ class GymApp:
         id_aparato = int(aparato_sel.split(' - ')[0])
         dia_num = [k for k, v in DIAS_SEMANA.items() if v == dia_sel][0]
         
-        # Verificar disponibilidad de todas las franjas
-        no_disponibles = []
-        for hora in horas_seleccionadas:
-            if not self.db.verificar_disponibilidad(id_aparato, dia_num, hora):
-                no_disponibles.append(hora)
+        # Reservar todas las franjas en una transacción: si alguna ya está
+        # ocupada no se reserva ninguna y se indica cuáles chocaron
+        try:
+            colisiones = self.db.reservar_bloque(id_cliente, id_aparato, dia_num, horas_seleccionadas)
+        except CuotaExcedida as e:
+            messagebox.showerror("Límite de reservas", str(e))
+            return
         
-        if no_disponibles:
+        if colisiones:
             messagebox.showerror("Error", 
                                f"Las siguientes franjas ya están ocupadas:\n" + 
-                               "\n".join(no_disponibles))
-            return
-        
-        # Realizar todas las reservas
-        reservas_creadas = 0
-        for hora in horas_seleccionadas:
-            id_reserva = self.db.insertar_reserva(id_cliente, id_aparato, dia_num, hora)
-            if id_reserva:
-                reservas_creadas += 1
-        
-        if reservas_creadas > 0:
+                               "\n".join(colisiones))
+        elif colisiones is not None:
             messagebox.showinfo("Éxito", 
-                              f"Se crearon {reservas_creadas} reserva(s) correctamente")
+                              f"Se crearon {len(horas_seleccionadas)} reserva(s) correctamente")
             self.cargar_reservas()
             # Limpiar campos
             self.combo_reserva_cliente.set('')
@@ -896,15 +1019,90 @@ class GymApp:
         else:
             messagebox.showerror("Error", "No se pudo crear ninguna reserva")
     
+    def guardar_plantilla_reserva(self):
+        """Guarda el día y las horas seleccionados en la plantilla del cliente"""
+        cliente_sel = self.combo_reserva_cliente.get()
+        aparato_sel = self.combo_reserva_aparato.get()
+        dia_sel = self.combo_reserva_dia.get()
+        num_horas = self.listbox_horas_seleccionadas.size()
+        horas = [self.listbox_horas_seleccionadas.get(i) for i in range(num_horas)]
+        
+        if not all([cliente_sel, aparato_sel, dia_sel]) or not horas:
+            messagebox.showerror("Error", "Complete cliente, aparato, día y al menos una hora")
+            return
+        
+        id_cliente = int(cliente_sel.split(' - ')[0])
+        id_aparato = int(aparato_sel.split(' - ')[0])
+        dia_num = [k for k, v in DIAS_SEMANA.items() if v == dia_sel][0]
+        
+        if self.db.guardar_plantilla(id_cliente, id_aparato, [(dia_num, h) for h in horas]):
+            messagebox.showinfo("Éxito", 
+                              f"Se añadieron {len(horas)} franja(s) del {dia_sel} a la plantilla de {cliente_sel.split(' - ')[1]}")
+        else:
+            messagebox.showerror("Error", "No se pudo guardar la plantilla")
+    
+    def aplicar_plantillas_reserva(self):
+        """Reserva de una vez las franjas de todas las plantillas (en segundo plano)"""
+        plantillas = self.db.obtener_plantillas()
+        if not plantillas:
+            messagebox.showinfo("Información", "No hay plantillas de reserva guardadas")
+            return
+        
+        if not messagebox.askyesno("Confirmar", 
+                                   f"¿Aplicar {len(plantillas)} plantilla(s) de reserva?\n\n"
+                                   f"Las franjas ya ocupadas por otros clientes se omitirán."):
+            return
+        
+        self.tareas.ejecutar_siempre('plantillas', self.db.aplicar_plantillas,
+                                     self.mostrar_resultado_plantillas, self.mostrar_error_carga)
+    
+    def mostrar_resultado_plantillas(self, resultado):
+        """Muestra las reservas creadas y los conflictos al aplicar plantillas"""
+        if resultado is None:
+            messagebox.showerror("Error", "No se pudieron aplicar las plantillas")
+            return
+        
+        self.cargar_reservas()
+        conflictos = resultado['conflictos']
+        mensaje = f"Se crearon {resultado['insertadas']} reserva(s)."
+        if resultado['cuotas']:
+            lineas = [f"{c['cliente']}: {c['motivo']}" for c in resultado['cuotas'][:10]]
+            if len(resultado['cuotas']) > 10:
+                lineas.append(f"... y {len(resultado['cuotas']) - 10} más")
+            mensaje += (f"\n\n{len(resultado['cuotas'])} cliente(s) omitido(s) por su límite de reservas:\n"
+                        + "\n".join(lineas))
+        if conflictos:
+            lineas = [
+                f"{c['cliente']} - {c['aparato']} {DIAS_SEMANA.get(c['dia_semana'], '')} "
+                f"{c['hora_inicio']} (ocupada por {c['ocupante']})"
+                for c in conflictos[:15]
+            ]
+            if len(conflictos) > 15:
+                lineas.append(f"... y {len(conflictos) - 15} más")
+            mensaje += f"\n\n{len(conflictos)} franja(s) en conflicto:\n" + "\n".join(lineas)
+        if resultado['fuera_de_franja']:
+            lineas = [
+                f"{f['cliente']} - {f['aparato']} {DIAS_SEMANA.get(f['dia_semana'], '')} {f['hora_inicio']}"
+                for f in resultado['fuera_de_franja'][:10]
+            ]
+            if len(resultado['fuera_de_franja']) > 10:
+                lineas.append(f"... y {len(resultado['fuera_de_franja']) - 10} más")
+            mensaje += (f"\n\n{len(resultado['fuera_de_franja'])} franja(s) de plantilla sin reservar "
+                        f"porque su hora no es inicio de franja:\n" + "\n".join(lineas))
+        if conflictos or resultado['cuotas'] or resultado['fuera_de_franja']:
+            messagebox.showwarning("Plantillas aplicadas", mensaje)
+        else:
+            messagebox.showinfo("Plantillas aplicadas", mensaje)
+        self.status_var.set(f"Plantillas aplicadas: {resultado['insertadas']} reservas, {len(conflictos)} conflictos")
+    
     def cancelar_reserva(self):
         """Cancela la reserva seleccionada"""
-        selection = self.tree_reservas.selection()
-        if not selection:
+        values = self.tabla_reservas.valores_seleccionados()
+        if not values:
             messagebox.showwarning("Aviso", "Seleccione una reserva para cancelar")
             return
         
-        item = self.tree_reservas.item(selection[0])
-        id_reserva = item['values'][0]
+        id_reserva = values[0]
         
         if messagebox.askyesno("Confirmar", "¿Está seguro de cancelar esta reserva?"):
             if self.db.cancelar_reserva(id_reserva):
@@ -947,7 +1145,8 @@ class GymApp:
         
         # Treeview para ocupación
         columns = ('Aparato', 'Tipo', 'Hora', 'Estado', 'Cliente')
-        self.tree_ocupacion = ttk.Treeview(frame_lista, columns=columns, show='headings', height=20)
+        self.tabla_ocupacion = TablaVirtual(frame_lista, columns=columns, height=20)
+        self.tree_ocupacion = self.tabla_ocupacion.tree
         
         self.tree_ocupacion.heading('Aparato', text='Aparato')
         self.tree_ocupacion.heading('Tipo', text='Tipo')
@@ -973,11 +1172,7 @@ class GymApp:
                                          foreground=self.COLOR_NEGRO,     # Negro
                                          font=('Arial', 9, 'bold'))
         
-        scrollbar = ttk.Scrollbar(frame_lista, orient=tk.VERTICAL, command=self.tree_ocupacion.yview)
-        self.tree_ocupacion.configure(yscrollcommand=scrollbar.set)
-        
-        self.tree_ocupacion.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tabla_ocupacion.pack(fill=tk.BOTH, expand=True)
     
     def mostrar_ocupacion(self):
         """Muestra la ocupación de aparatos para el día seleccionado"""
@@ -988,35 +1183,36 @@ class GymApp:
             messagebox.showwarning("Aviso", "Seleccione un día de la semana")
             return
         
-        # Limpiar treeview
-        for item in self.tree_ocupacion.get_children():
-            self.tree_ocupacion.delete(item)
-        
         # Obtener número de día
         dia_num = [k for k, v in DIAS_SEMANA.items() if v == dia_sel][0]
         
-        # Obtener ocupación
-        ocupacion = self.db.obtener_ocupacion_aparatos_por_dia(dia_num)
-        
+        # Obtener ocupación (el filtro por tipo se aplica en la consulta)
+        tipo_filtro = tipo_sel if tipo_sel != 'Todos' else None
+        self.tareas.ejecutar(
+            'ocupacion',
+            lambda: self.db.obtener_ocupacion_aparatos_por_dia(dia_num, tipo_filtro),
+            lambda ocupacion: self.mostrar_tabla_ocupacion(ocupacion, dia_sel, tipo_sel),
+            self.mostrar_error_carga
+        )
+    
+    def mostrar_tabla_ocupacion(self, ocupacion, dia_sel, tipo_sel):
+        """Muestra en el treeview la ocupación ya consultada"""
+        filas = []
         total_franjas = 0
         franjas_ocupadas = 0
         aparatos_mostrados = 0
         
-        for idx, aparato in enumerate(ocupacion):
-            # Filtrar por tipo de aparato si no es "Todos"
-            if tipo_sel != 'Todos' and aparato['aparato_tipo'] != tipo_sel:
-                continue
-            
+        for aparato in ocupacion:
             aparatos_mostrados += 1
             
             # Añadir fila separadora con nombre del aparato
-            self.tree_ocupacion.insert('', tk.END, values=(
+            filas.append(((
                 f"═══ {aparato['aparato_nombre']} ═══",
                 aparato['aparato_tipo'],
                 "═══════",
                 "═══════",
                 "═══════════════"
-            ), tags=('separador',))
+            ), ('separador',)))
             
             for franja in aparato['franjas']:
                 total_franjas += 1
@@ -1028,13 +1224,17 @@ class GymApp:
                     franjas_ocupadas += 1
                 
                 # Mostrar el nombre del aparato solo para referencia visual
-                self.tree_ocupacion.insert('', tk.END, values=(
+                filas.append(((
                     "",  # Dejamos vacío para que no se repita
                     "",  # Tipo vacío también
                     franja['hora'],
                     estado,
                     cliente
-                ), tags=(tag,))
+                ), (tag,)))
+        
+        # Solo se crean en el treeview las filas que llegan a verse
+        self.tabla_ocupacion.cargar(filas, formatear=lambda fila: fila[0],
+                                    etiquetas=lambda fila: fila[1])
         
         porcentaje = (franjas_ocupadas / total_franjas * 100) if total_franjas > 0 else 0
         filtro_texto = f" ({tipo_sel})" if tipo_sel != 'Todos' else ""
@@ -1064,16 +1264,58 @@ class GymApp:
             
             ttk.Label(frame_generar, text=f"Importe: {formatear_moneda(MENSUALIDAD)}").grid(row=0, column=4, padx=20)
             
+            # Opción para facturar todos los meses del año de una vez
+            self.var_pago_anio_completo = tk.BooleanVar(value=False)
+            ttk.Checkbutton(frame_generar, text="Año completo",
+                            variable=self.var_pago_anio_completo).grid(row=0, column=5, padx=5)
+            
             ttk.Button(frame_generar, text="Generar Recibos", 
-                       command=self.generar_recibos).grid(row=0, column=5, padx=10)
+                       command=self.generar_recibos).grid(row=0, column=6, padx=10)
+            
+            # Resumen por mes (una consulta agregada); al seleccionar un mes
+            # se muestran sus recibos abajo
+            frame_resumen = ttk.LabelFrame(self.tab_pagos, text="Resumen por Mes", padding="5")
+            frame_resumen.pack(fill=tk.X, pady=(0, 10))
+            
+            columns_resumen = ('Mes', 'Año', 'Pagados', 'Pendientes', 'Cobrado', 'Por Cobrar')
+            self.tabla_resumen_recibos = TablaVirtual(frame_resumen, columns=columns_resumen, height=5)
+            self.tree_resumen_recibos = self.tabla_resumen_recibos.tree
+            for col in columns_resumen:
+                self.tree_resumen_recibos.heading(col, text=col)
+                self.tree_resumen_recibos.column(col, width=110)
+            self.tree_resumen_recibos.bind('<<TreeviewSelect>>', self.seleccionar_mes_resumen)
+            self.tabla_resumen_recibos.pack(fill=tk.X)
+            
+            self.label_resumen_recibos = ttk.Label(frame_resumen, text="", style='Header.TLabel')
+            self.label_resumen_recibos.pack(pady=(5, 0))
             
             # Frame medio: Registrar pago
-            frame_pago = ttk.LabelFrame(self.tab_pagos, text="Todos los Recibos", padding="5")
+            frame_pago = ttk.LabelFrame(self.tab_pagos, text="Recibos", padding="5")
             frame_pago.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
             
-            # Treeview de recibos pendientes
+            # Filtro del detalle por mes y año
+            frame_filtro_recibos = ttk.Frame(frame_pago)
+            frame_filtro_recibos.pack(fill=tk.X, pady=(0, 5))
+            
+            ttk.Label(frame_filtro_recibos, text="Mes:").pack(side=tk.LEFT, padx=5)
+            self.combo_filtro_recibo_mes = ttk.Combobox(frame_filtro_recibos, width=15, state='readonly')
+            self.combo_filtro_recibo_mes['values'] = ['Todos'] + list(MESES.values())
+            self.combo_filtro_recibo_mes.set(MESES[obtener_mes_actual()])
+            self.combo_filtro_recibo_mes.pack(side=tk.LEFT, padx=5)
+            
+            ttk.Label(frame_filtro_recibos, text="Año:").pack(side=tk.LEFT, padx=5)
+            self.combo_filtro_recibo_anio = ttk.Combobox(frame_filtro_recibos, width=10, state='readonly')
+            self.combo_filtro_recibo_anio['values'] = ['Todos'] + list(range(2020, 2031))
+            self.combo_filtro_recibo_anio.set(obtener_anio_actual())
+            self.combo_filtro_recibo_anio.pack(side=tk.LEFT, padx=5)
+            
+            ttk.Button(frame_filtro_recibos, text="Filtrar",
+                       command=self.cargar_detalle_recibos).pack(side=tk.LEFT, padx=10)
+            
+            # Treeview de recibos del mes filtrado
             columns = ('ID', 'Cliente', 'DNI', 'Mes', 'Año', 'Importe', 'Estado')
-            self.tree_recibos = ttk.Treeview(frame_pago, columns=columns, show='headings', height=10)
+            self.tabla_recibos = TablaVirtual(frame_pago, columns=columns, height=10)
+            self.tree_recibos = self.tabla_recibos.tree
             
             for col in columns:
                 self.tree_recibos.heading(col, text=col)
@@ -1086,11 +1328,7 @@ class GymApp:
             self.tree_recibos.column('Importe', width=100)
             self.tree_recibos.column('Estado', width=100)
             
-            scrollbar = ttk.Scrollbar(frame_pago, orient=tk.VERTICAL, command=self.tree_recibos.yview)
-            self.tree_recibos.configure(yscrollcommand=scrollbar.set)
-            
-            self.tree_recibos.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            self.tabla_recibos.pack(fill=tk.BOTH, expand=True)
             
             # Botones de pago
             frame_btn_pago = ttk.Frame(self.tab_pagos)
@@ -1100,6 +1338,8 @@ class GymApp:
                        command=self.registrar_pago).pack(side=tk.LEFT, padx=5)
             ttk.Button(frame_btn_pago, text="Actualizar Lista", 
                        command=self.cargar_recibos_pendientes).pack(side=tk.LEFT, padx=5)
+            ttk.Button(frame_btn_pago, text="Importar Cobros del Banco...",
+                       command=self.importar_cobros_banco).pack(side=tk.LEFT, padx=5)
             ttk.Button(frame_btn_pago, text="Ver Clientes Pagados", 
                        command=self.ver_clientes_pagados).pack(side=tk.RIGHT, padx=5)
             
@@ -1120,7 +1360,8 @@ class GymApp:
             frame_pago.pack(fill=tk.BOTH, expand=True, padx=20)
             
             columns = ('ID', 'Mes', 'Año', 'Importe', 'Estado', 'Fecha Pago')
-            self.tree_recibos = ttk.Treeview(frame_pago, columns=columns, show='headings', height=20)
+            self.tabla_recibos = TablaVirtual(frame_pago, columns=columns, height=20)
+            self.tree_recibos = self.tabla_recibos.tree
             
             self.tree_recibos.heading('ID', text='ID')
             self.tree_recibos.heading('Mes', text='Mes')
@@ -1136,11 +1377,7 @@ class GymApp:
             self.tree_recibos.column('Estado', width=150, anchor=tk.CENTER)
             self.tree_recibos.column('Fecha Pago', width=150, anchor=tk.CENTER)
             
-            scrollbar = ttk.Scrollbar(frame_pago, orient=tk.VERTICAL, command=self.tree_recibos.yview)
-            self.tree_recibos.configure(yscrollcommand=scrollbar.set)
-            
-            self.tree_recibos.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            self.tabla_recibos.pack(fill=tk.BOTH, expand=True)
             
             # Frame de botones
             frame_botones_empleado = ttk.Frame(self.tab_pagos)
@@ -1186,55 +1423,96 @@ class GymApp:
         
         # Convertir nombre de mes a número
         mes_num = [k for k, v in MESES.items() if v == mes_nombre][0]
+        anio_completo = self.var_pago_anio_completo.get()
+        periodo = f"todo el año {anio}" if anio_completo else f"{mes_nombre} {anio}"
         
         if messagebox.askyesno("Confirmar", 
-                              f"¿Generar recibos para {mes_nombre} {anio}?\n"
+                              f"¿Generar recibos para {periodo}?\n"
                               f"Importe: {formatear_moneda(MENSUALIDAD)}"):
-            num_recibos = self.db.generar_recibos_mes(mes_num, anio, MENSUALIDAD)
-            messagebox.showinfo("Éxito", f"Se generaron {num_recibos} recibos")
-            self.cargar_recibos_pendientes()
+            def generar():
+                if anio_completo:
+                    return self.db.generar_recibos_periodo(anio, MENSUALIDAD)
+                return self.db.generar_recibos_mes(mes_num, anio, MENSUALIDAD)
+            
+            def al_terminar(num_recibos):
+                messagebox.showinfo("Éxito", f"Se generaron {num_recibos} recibos")
+                self.cargar_recibos_pendientes()
+            
+            self.status_var.set(f"Generando recibos para {periodo}...")
+            self.tareas.ejecutar_siempre('generar_recibos', generar, al_terminar,
+                                         self.mostrar_error_carga)
     
     def cargar_recibos_pendientes(self):
-        """Carga todos los recibos en el treeview con colores"""
-        for item in self.tree_recibos.get_children():
-            self.tree_recibos.delete(item)
-        
-        # Obtener TODOS los recibos (pagados y pendientes)
-        recibos = self.db.obtener_todos_recibos()
-        
-        pendientes = 0
-        pagados = 0
+        """Carga el resumen por mes y los recibos del filtro actual (en segundo plano)"""
+        self.tareas.ejecutar('resumen_recibos', self.db.resumen_recibos,
+                             self.mostrar_resumen_recibos, self.mostrar_error_carga)
+        self.cargar_detalle_recibos()
+    
+    def mostrar_resumen_recibos(self, resumen):
+        """Muestra el resumen por mes y los totales en la barra de estado"""
+        if resumen is None:
+            messagebox.showerror("Error", "No se pudo obtener el resumen de recibos")
+            return
         
-        for recibo in recibos:
-            mes_nombre = MESES.get(recibo['mes'], str(recibo['mes']))
-            estado = "PAGADO" if recibo['pagado'] else "PENDIENTE"
-            tag = 'pagado' if recibo['pagado'] else 'pendiente'
-            
-            if recibo['pagado']:
-                pagados += 1
-            else:
-                pendientes += 1
-            
-            self.tree_recibos.insert('', tk.END, values=(
+        self.tabla_resumen_recibos.cargar(
+            resumen['por_mes'],
+            formatear=lambda fila: (
+                MESES.get(fila['mes'], str(fila['mes'])),
+                fila['anio'],
+                fila['pagados'],
+                fila['pendientes'],
+                formatear_moneda(fila['importe_pagado']),
+                formatear_moneda(fila['importe_pendiente'])
+            )
+        )
+        self.label_resumen_recibos.config(
+            text=f"Cobrado: {formatear_moneda(resumen['importe_pagado'])} | "
+                 f"Por cobrar: {formatear_moneda(resumen['importe_pendiente'])}"
+        )
+        self.status_var.set(f"Usuario: {self.usuario['nombre']} ({self.usuario['rol']}) | "
+                            f"{resumen['pendientes']} pendientes, {resumen['pagados']} pagados")
+    
+    def seleccionar_mes_resumen(self, event=None):
+        """Muestra en el detalle los recibos del mes seleccionado en el resumen"""
+        selection = self.tree_resumen_recibos.selection()
+        if not selection:
+            return
+        fila = self.tabla_resumen_recibos.fila(selection[0])
+        self.combo_filtro_recibo_mes.set(MESES[fila['mes']])
+        self.combo_filtro_recibo_anio.set(fila['anio'])
+        self.cargar_detalle_recibos()
+    
+    def cargar_detalle_recibos(self):
+        """Carga página a página los recibos del mes y año filtrados"""
+        mes_sel = self.combo_filtro_recibo_mes.get()
+        anio_sel = self.combo_filtro_recibo_anio.get()
+        mes = next((num for num, nombre in MESES.items() if nombre == mes_sel), None)
+        anio = int(anio_sel) if anio_sel and anio_sel != 'Todos' else None
+        
+        self.tabla_recibos.cargar_paginado(
+            lambda ultima, limite: self.db.obtener_recibos(mes=mes, anio=anio, limite=limite,
+                                                           despues_de=ultima),
+            formatear=lambda recibo: (
                 recibo['id_recibo'],
                 f"{recibo['nombre']} {recibo['apellidos']}",
                 recibo['dni'],
-                mes_nombre,
+                MESES.get(recibo['mes'], str(recibo['mes'])),
                 recibo['anio'],
                 formatear_moneda(recibo['importe']),
-                estado
-            ), tags=(tag,))
+                "PAGADO" if recibo['pagado'] else "PENDIENTE"
+            ),
+            etiquetas=lambda recibo: ('pagado' if recibo['pagado'] else 'pendiente',),
+            ejecutor=self.tareas,
+            al_fallar=self.mostrar_error_carga
+        )
         
         # Configurar colores
         self.tree_recibos.tag_configure('pagado', background='#1a4d1a', foreground='#FFFFFF')  # Verde oscuro
         self.tree_recibos.tag_configure('pendiente', background='#4a2020', foreground='#FFFFFF')  # Rojo oscuro
-        
-        self.status_var.set(f"Usuario: {self.usuario['nombre']} ({self.usuario['rol']}) | {pendientes} pendientes, {pagados} pagados")
     
     def cargar_mis_pagos(self):
         """Carga los pagos del usuario actual (empleado)"""
-        for item in self.tree_recibos.get_children():
-            self.tree_recibos.delete(item)
+        self.tabla_recibos.limpiar()
         
         # Buscar cliente por email del usuario
         cliente = self.db.obtener_cliente_por_email(self.usuario['email'])
@@ -1246,19 +1524,18 @@ class GymApp:
         # Obtener todos los recibos del cliente
         recibos = self.db.obtener_recibos_por_cliente(cliente['id_cliente'])
         
-        for recibo in recibos:
-            mes_nombre = MESES.get(recibo['mes'], str(recibo['mes']))
-            estado = "PAGADO" if recibo['pagado'] else "PENDIENTE"
-            fecha_pago = recibo['fecha_pago'][:10] if recibo['fecha_pago'] else "-"
-            
-            self.tree_recibos.insert('', tk.END, values=(
+        self.tabla_recibos.cargar(
+            recibos,
+            formatear=lambda recibo: (
                 recibo['id_recibo'],
-                mes_nombre,
+                MESES.get(recibo['mes'], str(recibo['mes'])),
                 recibo['anio'],
                 formatear_moneda(recibo['importe']),
-                estado,
-                fecha_pago
-            ), tags=('pagado' if recibo['pagado'] else 'pendiente',))
+                "PAGADO" if recibo['pagado'] else "PENDIENTE",
+                recibo['fecha_pago'][:10] if recibo['fecha_pago'] else "-"
+            ),
+            etiquetas=lambda recibo: ('pagado' if recibo['pagado'] else 'pendiente',)
+        )
         
         # Colores según estado
         self.tree_recibos.tag_configure('pagado', background='#1a3a1a')
@@ -1268,15 +1545,14 @@ class GymApp:
     
     def registrar_pago(self):
         """Registra el pago del recibo seleccionado (Admin)"""
-        selection = self.tree_recibos.selection()
-        if not selection:
+        values = self.tabla_recibos.valores_seleccionados()
+        if not values:
             messagebox.showwarning("Aviso", "Seleccione un recibo para registrar el pago")
             return
         
-        item = self.tree_recibos.item(selection[0])
-        id_recibo = item['values'][0]
-        cliente = item['values'][1]
-        estado = item['values'][6]
+        id_recibo = values[0]
+        cliente = values[1]
+        estado = values[6]
         
         if estado == "PAGADO":
             messagebox.showinfo("Información", "Este recibo ya está pagado")
@@ -1286,21 +1562,83 @@ class GymApp:
             if self.db.registrar_pago(id_recibo):
                 messagebox.showinfo("Éxito", "Pago registrado correctamente")
                 self.cargar_recibos_pendientes()
-                self.cargar_morosos()  # Actualizar lista de morosos
+                if self.pestana_construida(self.tab_morosos):
+                    self.cargar_morosos()  # Actualizar lista de morosos
+    
+    def importar_cobros_banco(self):
+        """Concilia los recibos con un fichero CSV de cobros del banco (Admin)"""
+        ruta = filedialog.askopenfilename(
+            title="Fichero de cobros del banco",
+            filetypes=[("Ficheros CSV", "*.csv"), ("Todos los ficheros", "*.*")]
+        )
+        if not ruta:
+            return
+        
+        self.status_var.set("Conciliando cobros del banco...")
+        self.tareas.ejecutar_siempre('conciliacion',
+                                     lambda: self.db.conciliar_pagos(leer_cobros_banco(ruta)),
+                                     self.mostrar_conciliacion,
+                                     lambda e: messagebox.showerror("Error", f"No se pudo leer el fichero:\n{e}"))
+    
+    def mostrar_conciliacion(self, resultado):
+        """Muestra los pagos aplicados y las líneas del banco sin conciliar"""
+        if resultado is None:
+            messagebox.showerror("Error", "No se pudieron conciliar los cobros")
+            return
+        
+        self.cargar_recibos_pendientes()
+        if self.pestana_construida(self.tab_morosos):
+            self.cargar_morosos()
+        no_conciliados = resultado['no_conciliados']
+        self.status_var.set(f"Cobros del banco: {resultado['pagados']} recibos pagados, "
+                            f"{len(no_conciliados)} líneas sin conciliar")
+        mensaje = (f"{resultado['lineas']} línea(s) leída(s).\n"
+                   f"{resultado['pagados']} recibo(s) marcado(s) como pagado(s).")
+        if not no_conciliados:
+            messagebox.showinfo("Cobros del banco", mensaje)
+            return
+        
+        # Ventana con las líneas que no se pudieron aplicar
+        ventana = tk.Toplevel(self.root)
+        ventana.title("Cobros sin Conciliar")
+        ventana.geometry("700x400")
+        
+        ttk.Label(ventana, text=f"{mensaje}\n{len(no_conciliados)} línea(s) sin conciliar:",
+                  style='Header.TLabel').pack(pady=10)
+        
+        columns = ('Línea', 'DNI', 'Mes', 'Año', 'Importe', 'Motivo')
+        tabla = TablaVirtual(ventana, columns=columns, height=12)
+        for col in columns:
+            tabla.tree.heading(col, text=col)
+            tabla.tree.column(col, width=70)
+        tabla.tree.column('Motivo', width=250)
+        tabla.pack(fill=tk.BOTH, expand=True, padx=10)
+        tabla.cargar(
+            no_conciliados,
+            formatear=lambda c: (
+                c['linea'],
+                c['dni'],
+                c['mes'] or '',
+                c['anio'] or '',
+                formatear_moneda(c['importe']) if c['importe'] is not None else '',
+                c['motivo']
+            )
+        )
+        
+        ttk.Button(ventana, text="Cerrar", command=ventana.destroy).pack(pady=10)
     
     def pagar_recibo_empleado(self):
         """Permite al empleado pagar su propio recibo"""
-        selection = self.tree_recibos.selection()
-        if not selection:
+        values = self.tabla_recibos.valores_seleccionados()
+        if not values:
             messagebox.showwarning("Aviso", "Seleccione un recibo para pagar")
             return
         
-        item = self.tree_recibos.item(selection[0])
-        id_recibo = item['values'][0]
-        mes = item['values'][1]
-        anio = item['values'][2]
-        importe = item['values'][3]
-        estado = item['values'][4]
+        id_recibo = values[0]
+        mes = values[1]
+        anio = values[2]
+        importe = values[3]
+        estado = values[4]
         
         if estado == "PAGADO":
             messagebox.showinfo("Información", "Este recibo ya está pagado")
@@ -1314,13 +1652,7 @@ class GymApp:
                 self.cargar_mis_pagos()  # Recargar lista
     
     def ver_clientes_pagados(self):
-        """Muestra los clientes que han pagado"""
-        clientes = self.db.obtener_clientes_al_corriente()
-        
-        if not clientes:
-            messagebox.showinfo("Info", "No hay clientes al corriente de pago")
-            return
-        
+        """Muestra los clientes al corriente de pago, página a página"""
         # Crear ventana emergente
         ventana = tk.Toplevel(self.root)
         ventana.title("Clientes al Corriente de Pago")
@@ -1330,13 +1662,38 @@ class GymApp:
                   style='Subtitle.TLabel').pack(pady=10)
         
         # Lista
-        listbox = tk.Listbox(ventana, font=('Courier', 10))
-        listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        columns = ('Nombre', 'Apellidos', 'DNI')
+        tabla = TablaVirtual(ventana, columns=columns, height=12)
+        for col in columns:
+            tabla.tree.heading(col, text=col)
+            tabla.tree.column(col, width=150)
+        tabla.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        label_total = ttk.Label(ventana, text="Cargando...")
+        label_total.pack()
+        
+        def mostrar_total(tabla):
+            if not tabla.filas:
+                label_total.config(text="No hay clientes al corriente de pago")
+                return
+            mas = "" if tabla.completa else "+"
+            label_total.config(text=f"{len(tabla.filas)}{mas} clientes")
+        
+        tabla.cargar_paginado(
+            lambda ultima, limite: self.db.obtener_clientes_al_corriente(limite=limite,
+                                                                          despues_de=ultima),
+            formatear=lambda c: (c['nombre'], c['apellidos'], c['dni']),
+            ejecutor=self.tareas,
+            al_fallar=self.mostrar_error_carga,
+            al_recibir=mostrar_total
+        )
         
-        for c in clientes:
-            listbox.insert(tk.END, f"{c['nombre']} {c['apellidos']} - {c['dni']}")
+        def cerrar():
+            tabla.limpiar()  # Descarta la página que aún esté en camino
+            ventana.destroy()
         
-        ttk.Button(ventana, text="Cerrar", command=ventana.destroy).pack(pady=10)
+        ventana.protocol("WM_DELETE_WINDOW", cerrar)
+        ttk.Button(ventana, text="Cerrar", command=cerrar).pack(pady=10)
     
     # ==================== PESTAÑA MOROSOS ====================
     
@@ -1356,8 +1713,9 @@ class GymApp:
         frame_lista.pack(fill=tk.BOTH, expand=True, pady=10)
         
         # Treeview
-        columns = ('ID', 'Nombre', 'Apellidos', 'DNI', 'Teléfono', 'Recibos Pendientes', 'Total Adeudado')
-        self.tree_morosos = ttk.Treeview(frame_lista, columns=columns, show='headings', height=15)
+        columns = ('ID', 'Nombre', 'Apellidos', 'DNI', 'Teléfono', 'Recibos Pendientes', 'Pendiente Desde', 'Total Adeudado')
+        self.tabla_morosos = TablaVirtual(frame_lista, columns=columns, height=15)
+        self.tree_morosos = self.tabla_morosos.tree
         
         self.tree_morosos.heading('ID', text='ID')
         self.tree_morosos.heading('Nombre', text='Nombre')
@@ -1365,6 +1723,7 @@ class GymApp:
         self.tree_morosos.heading('DNI', text='DNI')
         self.tree_morosos.heading('Teléfono', text='Teléfono')
         self.tree_morosos.heading('Recibos Pendientes', text='Recibos Pend.')
+        self.tree_morosos.heading('Pendiente Desde', text='Pendiente Desde')
         self.tree_morosos.heading('Total Adeudado', text='Total Adeudado')
         
         self.tree_morosos.column('ID', width=50)
@@ -1373,6 +1732,7 @@ class GymApp:
         self.tree_morosos.column('DNI', width=100)
         self.tree_morosos.column('Teléfono', width=100)
         self.tree_morosos.column('Recibos Pendientes', width=120)
+        self.tree_morosos.column('Pendiente Desde', width=120)
         self.tree_morosos.column('Total Adeudado', width=120)
         
         # Tag para resaltar - tono oscuro suave
@@ -1380,11 +1740,7 @@ class GymApp:
                                         background='#4a2020',  # Rojo muy oscuro
                                         foreground='#ffcccc')  # Texto claro
         
-        scrollbar = ttk.Scrollbar(frame_lista, orient=tk.VERTICAL, command=self.tree_morosos.yview)
-        self.tree_morosos.configure(yscrollcommand=scrollbar.set)
-        
-        self.tree_morosos.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tabla_morosos.pack(fill=tk.BOTH, expand=True)
         
         # Resumen
         self.label_resumen_morosos = ttk.Label(self.tab_morosos, text="", style='Header.TLabel')
@@ -1394,32 +1750,96 @@ class GymApp:
         self.cargar_morosos()
     
     def cargar_morosos(self):
-        """Carga la lista de clientes morosos"""
-        for item in self.tree_morosos.get_children():
-            self.tree_morosos.delete(item)
-        
-        morosos = self.db.obtener_clientes_morosos()
+        """Carga la lista de clientes morosos (consulta en segundo plano)"""
+        self.tareas.ejecutar('morosos', self.db.obtener_clientes_morosos,
+                             self.mostrar_morosos, self.mostrar_error_carga)
+    
+    def mostrar_morosos(self, morosos):
+        """Muestra en el treeview los morosos ya consultados"""
+        total_adeudado = sum(m['total_adeudado'] for m in morosos)
         
-        total_adeudado = 0
-        for m in morosos:
-            self.tree_morosos.insert('', tk.END, values=(
+        self.tabla_morosos.cargar(
+            morosos,
+            formatear=lambda m: (
                 m['id_cliente'],
                 m['nombre'],
                 m['apellidos'],
                 m['dni'],
                 m['telefono'] or '-',
                 m['num_recibos_pendientes'],
+                f"{obtener_nombre_mes(m['primer_pendiente'] % 100)} {m['primer_pendiente'] // 100}",
                 formatear_moneda(m['total_adeudado'])
-            ), tags=('moroso',))
-            total_adeudado += m['total_adeudado']
+            ),
+            etiquetas=lambda m: ('moroso',)
+        )
         
         self.label_resumen_morosos.config(
             text=f"Total morosos: {len(morosos)} | Total adeudado: {formatear_moneda(total_adeudado)}"
         )
         self.status_var.set(f"Se encontraron {len(morosos)} clientes morosos")
     
+    # ==================== EXPORTACIÓN ====================
+    
+    def pedir_ruta_exportacion(self, nombre: str):
+        """Pide el fichero de destino de una exportación (CSV o, si se puede, Excel)"""
+        tipos = [("CSV (separado por ;)", "*.csv")]
+        if XLSX_DISPONIBLE:
+            tipos.append(("Libro de Excel", "*.xlsx"))
+        return filedialog.asksaveasfilename(
+            title="Exportar",
+            initialfile=f"{nombre}.csv",
+            defaultextension=".csv",
+            filetypes=tipos
+        )
+    
+    def lanzar_exportacion(self, ruta: str, exportar):
+        """Ejecuta una exportación en segundo plano e informa al terminar"""
+        def al_terminar(total):
+            self.status_var.set(f"Exportadas {total} filas a {os.path.basename(ruta)}")
+            messagebox.showinfo("Exportación", f"Se exportaron {total} filas a:\n{ruta}")
+        
+        def al_fallar(error):
+            self.status_var.set("La exportación no se completó")
+            messagebox.showerror("Error", f"No se pudo exportar:\n{error}")
+        
+        self.status_var.set(f"Exportando a {os.path.basename(ruta)}...")
+        self.tareas.ejecutar_siempre('exportar', exportar, al_terminar, al_fallar)
+    
+    def exportar_recibos(self):
+        """Exporta los recibos de un año (o todos) para contabilidad"""
+        anio = simpledialog.askinteger(
+            "Exportar recibos", "Año a exportar (0 = todos los años):",
+            parent=self.root, initialvalue=obtener_anio_actual(), minvalue=0
+        )
+        if anio is None:
+            return
+        ruta = self.pedir_ruta_exportacion(f"recibos_{anio}" if anio else "recibos")
+        if ruta:
+            self.lanzar_exportacion(ruta, lambda: exportar_recibos(self.db, ruta, anio=anio or None))
+    
+    def exportar_morosos(self):
+        """Exporta la lista de clientes morosos"""
+        ruta = self.pedir_ruta_exportacion("morosos")
+        if ruta:
+            self.lanzar_exportacion(ruta, lambda: exportar_morosos(self.db, ruta))
+    
+    def exportar_ocupacion(self):
+        """Exporta la rejilla de ocupación de toda la semana"""
+        ruta = self.pedir_ruta_exportacion("ocupacion")
+        if ruta:
+            self.lanzar_exportacion(ruta, lambda: exportar_ocupacion(self.db, ruta))
+    
     # ==================== UTILIDADES ====================
     
+    def indicar_carga(self, ocupado):
+        """Muestra u oculta el indicador de carga de la barra de estado"""
+        self.label_cargando.config(text="Cargando..." if ocupado else "")
+        self.root.config(cursor='watch' if ocupado else '')
+    
+    def mostrar_error_carga(self, error):
+        """Informa de un error en una consulta en segundo plano"""
+        messagebox.showerror("Error", f"Error al consultar la base de datos:\n{error}")
+    
     def mostrar_acerca_de(self):
         """Muestra información sobre la aplicación"""
         ventana = tk.Toplevel(self.root)
@@ -1469,21 +1889,25 @@ class GymApp:
         """Cierra la sesión actual y vuelve al login"""
         if messagebox.askokcancel("Cerrar Sesión", "¿Desea cerrar sesión?"):
             self.cerro_sesion = True  # Marcar que se cerró sesión
-            self.db.disconnect()
+            self.tareas.cerrar()
+            if self.db_propia:
+                self.db.disconnect()
             self.root.quit()  # Sale del mainloop
             self.root.destroy()  # Destruye la ventana
     
     def on_closing(self):
         """Maneja el cierre de la aplicación"""
         if messagebox.askokcancel("Salir", "¿Desea salir de la aplicación?"):
-            self.db.disconnect()
+            self.tareas.cerrar()
+            if self.db_propia:
+                self.db.disconnect()
             self.root.destroy()
 
 
-def main(usuario):
+def main(usuario, db=None, perfilar=False):
     """Función principal"""
     root = tk.Tk()
-    app = GymApp(root, usuario)
+    app = GymApp(root, usuario, db=db, perfilar=perfilar)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
     root.mainloop()
 
@@ -17,7 +17,14 @@ from utils.helpers import validar_dni, validar_email
 class LoginWindow:
     """Ventana de inicio de sesión"""
     
-    def __init__(self):
+    def __init__(self, db: DatabaseManager = None):
+        """
+        Crea la ventana de login.
+        
+        Args:
+            db: Base de datos de la sesión, ya preparada. Si no se indica,
+                la ventana abre y prepara la suya propia.
+        """
         self.root = tk.Tk()
         self.root.title("GymForTheMoment - Login")
         self.root.geometry("550x800")
@@ -34,11 +41,11 @@ class LoginWindow:
         
         self.root.configure(bg=self.COLOR_NEGRO)
         
-        # Inicializar BD
-        self.db = DatabaseManager()
-        self.db.connect()
-        self.db.create_tables()
-        self.db.crear_admin_inicial()
+        # Inicializar BD (se reutiliza la de la sesión si se recibe)
+        if db is None:
+            db = DatabaseManager()
+            db.preparar()
+        self.db = db
         
         # Variables
         self.usuario_autenticado = None
@@ -416,7 +423,7 @@ class LoginWindow:
         return self.usuario_autenticado
 
 
-def mostrar_login():
+def mostrar_login(db: DatabaseManager = None):
     """Función para mostrar la ventana de login"""
-    login_window = LoginWindow()
+    login_window = LoginWindow(db)
     return login_window.run()
@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+"""
+GymForTheMoment - Tabla Virtual
+Treeview con un número fijo de filas que se rellenan según el desplazamiento
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, Optional, Sequence
+
+
+# Filas que se piden a la base de datos de una vez
+TAMANO_PAGINA = 200
+
+# Elementos que se crean por debajo de las filas visibles
+FILAS_RESERVA = 5
+
+# Filas por debajo de la ventana con las que ya se pide la siguiente página
+UMBRAL_CARGA = 50
+
+# Filas que avanza cada paso de la rueda del ratón
+FILAS_RUEDA = 3
+
+
+class TablaVirtual(ttk.Frame):
+    """
+    Treeview con barra de desplazamiento que solo crea los elementos que
+    caben en pantalla.
+    
+    Insertar decenas de miles de filas en un Treeview supone cientos de
+    miles de llamadas a Tcl y otros tantos elementos en memoria. Esta
+    tabla guarda los datos en Python y crea en el Treeview una ventana
+    fija de elementos (las filas visibles más unas pocas de reserva) cuyos
+    valores se rellenan con las filas que tocan al desplazarse. La barra
+    de desplazamiento, la rueda del ratón y las teclas de movimiento
+    desplazan la ventana sobre todas las filas cargadas. Los datos pueden
+    venir de una lista ya consultada (cargar) o pedirse a la base de datos
+    página a página (cargar_paginado).
+    
+    El Treeview interno está disponible en .tree para configurar columnas,
+    etiquetas y eventos como siempre. Como sus elementos se reutilizan,
+    la fila de datos de un elemento se obtiene con fila() y la selección
+    (que se conserva aunque salga de la vista) con valores_seleccionados().
+    """
+    
+    def __init__(self, master, columns: Sequence[str], height: int = 15,
+                 tamano_pagina: int = TAMANO_PAGINA, **kwargs):
+        """
+        Crea la tabla.
+        
+        Args:
+            master: Widget contenedor
+            columns: Identificadores de las columnas del Treeview
+            height: Filas visibles
+            tamano_pagina: Filas que se piden de una vez en cargar_paginado
+            **kwargs: Opciones adicionales para el Treeview
+        """
+        super().__init__(master)
+        self.tamano_pagina = tamano_pagina
+        
+        self.tree = ttk.Treeview(self, columns=columns, show='headings',
+                                 height=height, **kwargs)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._desplazar)
+        self.tree.configure(yscrollcommand=self._al_desplazar_tree)
+        
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        # Ventana fija de elementos: los primeros _adjuntos están en el
+        # Treeview y muestran las filas desde _inicio; el resto, separados
+        self._items = []
+        self._posiciones = {}
+        self._adjuntos = 0
+        self._inicio = 0
+        self._visibles = height
+        self._crear_items(height + FILAS_RESERVA)
+        
+        # Selección como índices de _filas, para conservarla fuera de la vista
+        self._seleccion = set()
+        
+        self._filas = []
+        self._formatear = None
+        self._etiquetas = None
+        self._obtener_pagina = None
+        self._ejecutor = None
+        self._al_fallar = None
+        self._al_recibir = None
+        self._agotada = True
+        self._pidiendo = False
+        self._recolocacion_programada = False
+        self._generacion = 0
+        
+        # Eventos propios en una etiqueta anterior a la del Treeview, para
+        # que tree.bind() siga disponible y se puedan cortar los de la clase
+        etiqueta = f"TablaVirtual{id(self)}"
+        self.tree.bindtags((etiqueta,) + self.tree.bindtags())
+        self.tree.bind_class(etiqueta, '<<TreeviewSelect>>', self._al_seleccionar)
+        self.tree.bind_class(etiqueta, '<Configure>', lambda e: self._ajustar_ventana())
+        for widget in (etiqueta, self.scrollbar):
+            self._vincular(widget, '<MouseWheel>', self._rueda)
+            self._vincular(widget, '<Button-4>', lambda e: self._mostrar(self._inicio - FILAS_RUEDA))
+            self._vincular(widget, '<Button-5>', lambda e: self._mostrar(self._inicio + FILAS_RUEDA))
+        pasos = {
+            '<Up>': lambda: -1,
+            '<Down>': lambda: 1,
+            '<Prior>': lambda: -self._visibles,
+            '<Next>': lambda: self._visibles,
+            '<Home>': lambda: -len(self._filas),
+            '<End>': lambda: len(self._filas),
+        }
+        for tecla, paso in pasos.items():
+            self._vincular(etiqueta, tecla, lambda e, paso=paso: self._mover_foco(paso()))
+    
+    def _vincular(self, widget, evento: str, funcion: Callable):
+        """Asocia un evento a una etiqueta o widget cortando los siguientes"""
+        def manejador(event):
+            funcion(event)
+            return "break"
+        
+        if isinstance(widget, str):
+            self.tree.bind_class(widget, evento, manejador)
+        else:
+            widget.bind(evento, manejador)
+    
+    # ==================== CARGA DE DATOS ====================
+    
+    def cargar(self, filas: Sequence, formatear: Callable = tuple,
+               etiquetas: Optional[Callable] = None):
+        """
+        Muestra una lista de filas ya consultada.
+        
+        Args:
+            filas: Filas de datos (se guardan sin convertir)
+            formatear: Convierte una fila en la tupla de valores a mostrar
+            etiquetas: Devuelve las etiquetas (tags) de una fila (opcional)
+        """
+        self.limpiar()
+        self._filas = filas if isinstance(filas, list) else list(filas)
+        self._formatear = formatear
+        self._etiquetas = etiquetas
+        self._mostrar(0)
+        self.after_idle(self._ajustar_ventana)
+    
+    def cargar_paginado(self, obtener_pagina: Callable, formatear: Callable = tuple,
+                        etiquetas: Optional[Callable] = None, ejecutor=None,
+                        al_fallar: Optional[Callable] = None,
+                        al_recibir: Optional[Callable] = None):
+        """
+        Muestra filas que se piden a la base de datos página a página.
+        
+        La siguiente página se pide cuando la ventana se acerca al final
+        de las filas ya recibidas.
+        
+        Args:
+            obtener_pagina: Función (ultima_fila, limite) -> lista de filas;
+                            ultima_fila es None en la primera página
+            formatear: Convierte una fila en la tupla de valores a mostrar
+            etiquetas: Devuelve las etiquetas (tags) de una fila (opcional)
+            ejecutor: EjecutorTareas para pedir las páginas en segundo
+                      plano (opcional)
+            al_fallar: Recibe la excepción si falla una página (opcional)
+            al_recibir: Se llama con la tabla tras añadir cada página (opcional)
+        """
+        self.limpiar()
+        self._formatear = formatear
+        self._etiquetas = etiquetas
+        self._obtener_pagina = obtener_pagina
+        self._ejecutor = ejecutor
+        self._al_fallar = al_fallar
+        self._al_recibir = al_recibir
+        self._agotada = False
+        self._pedir_pagina()
+    
+    def limpiar(self):
+        """
+        Vacía la tabla y su selección.
+        
+        Las páginas o errores que lleguen después de una carga anterior se
+        descartan.
+        """
+        self._generacion += 1
+        if self.tree.selection():
+            self.tree.selection_set(())
+        self._seleccion = set()
+        self._separar(0)
+        self._inicio = 0
+        self._filas = []
+        self._obtener_pagina = None
+        self._ejecutor = None
+        self._al_fallar = None
+        self._al_recibir = None
+        self._agotada = True
+        self._pidiendo = False
+        self._actualizar_barra()
+    
+    @property
+    def filas(self) -> list:
+        """Filas de datos cargadas hasta ahora (visibles o no)"""
+        return self._filas
+    
+    @property
+    def completa(self) -> bool:
+        """Indica si ya no quedan páginas por pedir"""
+        return self._agotada and not self._pidiendo
+    
+    # ==================== FILAS Y SELECCIÓN ====================
+    
+    def _indice(self, item) -> Optional[int]:
+        """Índice en _filas de la fila que muestra un elemento (None si ninguna)"""
+        posicion = self._posiciones.get(item)
+        if posicion is None or posicion >= self._adjuntos:
+            return None
+        return self._inicio + posicion
+    
+    def fila(self, item):
+        """
+        Devuelve la fila de datos que muestra un elemento del Treeview.
+        
+        Args:
+            item: Elemento del Treeview (p. ej. de tree.selection())
+        
+        Returns:
+            La fila de datos o None si el elemento no muestra ninguna
+        """
+        indice = self._indice(item)
+        return None if indice is None else self._filas[indice]
+    
+    def valores_seleccionados(self) -> Optional[tuple]:
+        """
+        Devuelve los valores de la primera fila seleccionada, esté o no a
+        la vista.
+        
+        Returns:
+            Tupla de valores (como la muestra la tabla) o None si no hay
+            ninguna fila seleccionada
+        """
+        if not self._seleccion:
+            return None
+        return tuple(self._formatear(self._filas[min(self._seleccion)]))
+    
+    def _al_seleccionar(self, event):
+        """
+        Anota la selección del usuario como filas de datos.
+        
+        Al desplazarse, la ventana vuelve a seleccionar los elementos de las
+        filas seleccionadas y Tk avisa con el mismo evento; esos avisos no
+        cambian la selección de datos y no se propagan a tree.bind().
+        """
+        if not self._leer_seleccion():
+            return "break"
+    
+    def _leer_seleccion(self) -> bool:
+        """
+        Toma como selección de datos la de los elementos de la ventana.
+        
+        Returns:
+            True si la selección de datos ha cambiado
+        """
+        seleccionados = {self._indice(item) for item in self.tree.selection()}
+        seleccionados.discard(None)
+        ventana = range(self._inicio, self._inicio + self._adjuntos)
+        if seleccionados == {i for i in self._seleccion if i in ventana}:
+            return False
+        self._seleccion = seleccionados
+        return True
+    
+    def _restaurar_seleccion(self):
+        """Selecciona los elementos que muestran filas seleccionadas"""
+        items = [self._items[i - self._inicio] for i in sorted(self._seleccion)
+                 if self._inicio <= i < self._inicio + self._adjuntos]
+        if set(items) != set(self.tree.selection()):
+            self.tree.selection_set(items)
+    
+    # ==================== VENTANA DE ELEMENTOS ====================
+    
+    def _crear_items(self, cantidad: int):
+        """Añade elementos (separados del Treeview) hasta tener la cantidad dada"""
+        while len(self._items) < cantidad:
+            item = self.tree.insert('', tk.END)
+            self.tree.detach(item)
+            self._posiciones[item] = len(self._items)
+            self._items.append(item)
+    
+    def _separar(self, desde: int):
+        """Separa del Treeview los elementos adjuntos desde una posición"""
+        if desde < self._adjuntos:
+            self.tree.detach(*self._items[desde:self._adjuntos])
+            self._adjuntos = desde
+    
+    def _mostrar(self, inicio: int):
+        """
+        Rellena la ventana con las filas a partir de la indicada.
+        
+        Args:
+            inicio: Índice de la primera fila a mostrar (se ajusta a los
+                    límites de las filas cargadas)
+        """
+        self._leer_seleccion()  # Por si aún no ha llegado el evento de un clic
+        total = len(self._filas)
+        inicio = max(0, min(inicio, total - self._visibles))
+        self._inicio = inicio
+        cantidad = min(len(self._items), total - inicio)
+        
+        self._separar(cantidad)
+        for posicion in range(self._adjuntos, cantidad):
+            self.tree.move(self._items[posicion], '', posicion)
+        self._adjuntos = cantidad
+        
+        formatear = self._formatear
+        etiquetas = self._etiquetas
+        actualizar = self.tree.item
+        for posicion, fila in enumerate(self._filas[inicio:inicio + cantidad]):
+            actualizar(self._items[posicion], values=formatear(fila),
+                       tags=etiquetas(fila) if etiquetas is not None else ())
+        
+        self.tree.yview_moveto(0)
+        self._restaurar_seleccion()
+        self._actualizar_barra()
+        if not self._agotada and inicio + self._visibles + UMBRAL_CARGA >= total:
+            self._pedir_pagina()
+    
+    def _ajustar_ventana(self):
+        """Recalcula las filas visibles cuando cambia el alto del Treeview"""
+        caja = self.tree.bbox(self._items[0]) if self._adjuntos else ''
+        if not caja:
+            return
+        _, y, _, alto = caja
+        visibles = max(1, (self.tree.winfo_height() - y) // alto)
+        if visibles != self._visibles:
+            self._visibles = visibles
+            self._crear_items(visibles + FILAS_RESERVA)
+            self._mostrar(self._inicio)
+    
+    def _actualizar_barra(self):
+        """Coloca la barra según la posición de la ventana en las filas"""
+        total = len(self._filas)
+        if total <= self._visibles:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self._inicio / total, (self._inicio + self._visibles) / total)
+    
+    # ==================== DESPLAZAMIENTO ====================
+    
+    def _desplazar(self, accion: str, cantidad: str, unidad: str = None):
+        """Atiende las órdenes de la barra ("moveto" o "scroll")"""
+        if accion == 'moveto':
+            self._mostrar(round(float(cantidad) * len(self._filas)))
+        elif accion == 'scroll':
+            paso = self._visibles if unidad == 'pages' else 1
+            self._mostrar(self._inicio + int(cantidad) * paso)
+    
+    def _rueda(self, event):
+        """Desplaza la ventana con la rueda del ratón (Windows y macOS)"""
+        if event.delta:
+            self._mostrar(self._inicio + (-FILAS_RUEDA if event.delta > 0 else FILAS_RUEDA))
+    
+    def _mover_foco(self, paso: int):
+        """
+        Mueve la fila activa y la selección con el teclado, desplazando la
+        ventana si la fila queda fuera de la vista.
+        
+        Args:
+            paso: Filas que se avanza (negativo hacia arriba)
+        """
+        if not self._filas:
+            return
+        actual = self._indice(self.tree.focus())
+        if actual is None:
+            actual = min(self._seleccion) if self._seleccion else self._inicio - 1
+        nuevo = max(0, min(actual + paso, len(self._filas) - 1))
+        
+        if nuevo < self._inicio:
+            self._mostrar(nuevo)
+        elif nuevo >= self._inicio + self._visibles:
+            self._mostrar(nuevo - self._visibles + 1)
+        # _mostrar puede acotar el inicio; el elemento se busca después
+        item = self._items[nuevo - self._inicio]
+        self.tree.focus(item)
+        self.tree.selection_set(item)
+    
+    def _al_desplazar_tree(self, primero, ultimo):
+        """
+        Deshace los desplazamientos propios del Treeview (p. ej. al
+        arrastrar una selección) moviendo la ventana en su lugar.
+        """
+        if float(primero) > 0 and not self._recolocacion_programada:
+            # No modificar el Treeview dentro de su propio callback
+            self._recolocacion_programada = True
+            self.after_idle(self._recolocar)
+    
+    def _recolocar(self):
+        """Lleva la ventana a la primera fila que mostraba el Treeview"""
+        self._recolocacion_programada = False
+        desplazadas = round(float(self.tree.yview()[0]) * self._adjuntos)
+        if desplazadas:
+            self._mostrar(self._inicio + desplazadas)
+    
+    # ==================== PÁGINAS ====================
+    
+    def _pedir_pagina(self):
+        """Pide a la fuente de datos la siguiente página"""
+        if self._pidiendo or self._agotada or self._obtener_pagina is None:
+            return
+        self._pidiendo = True
+        generacion = self._generacion
+        ultima = self._filas[-1] if self._filas else None
+        obtener_pagina = self._obtener_pagina
+        limite = self.tamano_pagina
+        
+        def pedir():
+            return obtener_pagina(ultima, limite)
+        
+        def recibir(pagina):
+            self._recibir_pagina(pagina, generacion)
+        
+        def fallar(error):
+            self._fallo_pagina(error, generacion)
+        
+        if self._ejecutor is not None:
+            self._ejecutor.ejecutar(f"tabla-{id(self)}", pedir, recibir, fallar)
+        else:
+            recibir(pedir())
+    
+    def _recibir_pagina(self, pagina: list, generacion: int):
+        """Añade una página recibida, salvo que la tabla se haya recargado"""
+        if generacion != self._generacion:
+            return
+        self._pidiendo = False
+        if len(pagina) < self.tamano_pagina:
+            self._agotada = True
+        self._filas.extend(pagina)
+        self._mostrar(self._inicio)
+        self.after_idle(self._ajustar_ventana)
+        if self._al_recibir is not None:
+            self._al_recibir(self)
+    
+    def _fallo_pagina(self, error, generacion: int):
+        """Deja de pedir páginas tras un error, salvo que la tabla se haya recargado"""
+        if generacion != self._generacion:
+            return
+        self._pidiendo = False
+        self._agotada = True
+        if self._al_fallar is not None:
+            self._al_fallar(error)
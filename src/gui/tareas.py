@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+GymForTheMoment - Tareas en Segundo Plano
+Ejecuta las consultas a la base de datos fuera del hilo de Tkinter
+"""
+
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+class EjecutorTareas:
+    """
+    Ejecuta funciones en hilos de trabajo y entrega sus resultados en el
+    hilo de la interfaz.
+    
+    Tkinter no admite llamadas desde otros hilos, así que los hilos de
+    trabajo solo dejan el resultado en una cola y el hilo principal la
+    revisa periódicamente con root.after. Cada tarea lleva una clave:
+    si se lanza otra tarea con la misma clave antes de que termine la
+    anterior, el resultado antiguo se descarta. Las escrituras se lanzan
+    con ejecutar_siempre, que da a cada llamada su propia clave para que
+    ninguna pierda su mensaje de resultado o de error.
+    """
+    
+    INTERVALO_MS = 40
+    
+    def __init__(self, root, max_hilos: int = 4,
+                 al_cambiar_estado: Optional[Callable[[bool], None]] = None):
+        """
+        Inicializa el ejecutor.
+        
+        Args:
+            root: Ventana raíz de Tkinter
+            max_hilos: Número de hilos de trabajo
+            al_cambiar_estado: Función llamada con True al empezar a haber
+                               tareas pendientes y con False al acabar todas
+        """
+        self.root = root
+        self.al_cambiar_estado = al_cambiar_estado
+        self._executor = ThreadPoolExecutor(max_workers=max_hilos,
+                                            thread_name_prefix="gym-db")
+        self._resultados = queue.Queue()
+        self._versiones = {}
+        self._futuros = {}
+        self._unicas = set()
+        self._lanzamientos = 0
+        self._pendientes = 0
+        self._id_after = None
+        self._cerrado = False
+    
+    def ejecutar(self, clave: str, funcion: Callable, al_terminar: Callable,
+                 al_fallar: Optional[Callable[[Exception], None]] = None):
+        """
+        Lanza funcion() en segundo plano.
+        
+        Args:
+            clave: Identificador de la petición; una nueva petición con la
+                   misma clave deja obsoleta a la anterior
+            funcion: Función sin argumentos a ejecutar fuera del hilo de Tk
+            al_terminar: Recibe el resultado en el hilo de Tk
+            al_fallar: Recibe la excepción en el hilo de Tk (opcional)
+        """
+        if self._cerrado:
+            return
+        
+        version = self._versiones.get(clave, 0) + 1
+        self._versiones[clave] = version
+        
+        # Si la petición anterior aún no ha empezado, ya no hace falta
+        anterior = self._futuros.get(clave)
+        if anterior is not None and anterior.cancel():
+            self._terminar_una()
+        
+        futuro = self._executor.submit(funcion)
+        self._futuros[clave] = futuro
+        self._pendientes += 1
+        if self._pendientes == 1:
+            self._notificar(True)
+            self._programar_revision()
+        
+        futuro.add_done_callback(
+            lambda f: self._resultados.put((clave, version, f, al_terminar, al_fallar))
+        )
+    
+    def ejecutar_siempre(self, nombre: str, funcion: Callable, al_terminar: Callable,
+                         al_fallar: Optional[Callable[[Exception], None]] = None):
+        """
+        Lanza funcion() en segundo plano con una clave propia de esta llamada.
+        
+        Para escrituras (aplicar plantillas, generar recibos, exportar...):
+        una segunda llamada con el mismo nombre no deja obsoleta a la
+        primera, así que se entregan los resultados o errores de ambas.
+        
+        Args:
+            nombre: Nombre de la tarea (para los mensajes de error)
+            funcion: Función sin argumentos a ejecutar fuera del hilo de Tk
+            al_terminar: Recibe el resultado en el hilo de Tk
+            al_fallar: Recibe la excepción en el hilo de Tk (opcional)
+        """
+        self._lanzamientos += 1
+        clave = f"{nombre}#{self._lanzamientos}"
+        self._unicas.add(clave)
+        self.ejecutar(clave, funcion, al_terminar, al_fallar)
+    
+    def cancelar(self, clave: str):
+        """Descarta el resultado pendiente de una clave"""
+        self._versiones[clave] = self._versiones.get(clave, 0) + 1
+    
+    @property
+    def ocupado(self) -> bool:
+        """Indica si hay tareas en curso"""
+        return self._pendientes > 0
+    
+    def cerrar(self):
+        """Detiene el ejecutor sin esperar a las tareas en curso"""
+        self._cerrado = True
+        if self._id_after is not None:
+            try:
+                self.root.after_cancel(self._id_after)
+            except Exception:
+                pass
+            self._id_after = None
+        # shutdown(cancel_futures=True) no existe en Python 3.8: las tareas
+        # que aún no han empezado están en _futuros y se cancelan a mano
+        for futuro in self._futuros.values():
+            futuro.cancel()
+        self._executor.shutdown(wait=False)
+    
+    def _programar_revision(self):
+        """Programa la siguiente revisión de la cola de resultados"""
+        if not self._cerrado and self._id_after is None:
+            self._id_after = self.root.after(self.INTERVALO_MS, self._revisar)
+    
+    def _revisar(self):
+        """Entrega en el hilo de Tk los resultados que hayan llegado"""
+        self._id_after = None
+        while True:
+            try:
+                clave, version, futuro, al_terminar, al_fallar = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+            
+            if futuro.cancelled():
+                # Ya se contabilizó al cancelarla
+                continue
+            self._terminar_una()
+            if self._futuros.get(clave) is futuro:
+                del self._futuros[clave]
+            obsoleta = self._cerrado or self._versiones.get(clave) != version
+            if clave in self._unicas:
+                self._unicas.discard(clave)
+                del self._versiones[clave]
+            if obsoleta:
+                continue  # Petición obsoleta
+            
+            error = futuro.exception()
+            try:
+                if error is None:
+                    al_terminar(futuro.result())
+                elif al_fallar is not None:
+                    al_fallar(error)
+                else:
+                    print(f"Error en tarea en segundo plano '{clave}': {error}")
+            except Exception as e:
+                # Un fallo al pintar un resultado no debe bloquear los demás
+                print(f"Error al procesar el resultado de '{clave}': {e}")
+        
+        if self._pendientes > 0:
+            self._programar_revision()
+    
+    def _terminar_una(self):
+        """Descuenta una tarea pendiente y avisa si ya no queda ninguna"""
+        self._pendientes -= 1
+        if self._pendientes == 0:
+            self._notificar(False)
+    
+    def _notificar(self, ocupado: bool):
+        """Avisa del cambio entre ocupado y libre"""
+        if self.al_cambiar_estado is not None and not self._cerrado:
+            self.al_cambiar_estado(ocupado)
@@ -5,9 +5,29 @@ src_dir = os.path.dirname(os.path.abspath(__file__))
 if src_dir not in sys.path:
     sys.path.insert(0, src_dir)
 
+from database.db_manager import DatabaseManager
 from gui.login import mostrar_login
 from gui.app import GymApp
 import tkinter as tk
+import time
+
+# Con --perfil-arranque se muestran los tiempos de arranque de la ventana principal
+PERFIL_ARRANQUE = "--perfil-arranque" in sys.argv
+
+# Tiempo objetivo hasta el primer pintado en los equipos de recepción
+OBJETIVO_PRIMER_PINTADO_MS = 1000
+
+
+def mostrar_informe_arranque(app, primer_pintado):
+    """Muestra el tiempo hasta el primer pintado y el de cada pestaña construida"""
+    ms = primer_pintado * 1000
+    estado = "OK" if ms <= OBJETIVO_PRIMER_PINTADO_MS else "SUPERA EL OBJETIVO"
+    print("-" * 60)
+    print(f"[arranque] Primer pintado: {ms:.1f} ms (objetivo {OBJETIVO_PRIMER_PINTADO_MS} ms) {estado}")
+    for nombre, segundos in app.tiempos_pestanas.items():
+        print(f"[arranque]   Pestaña {nombre}: {segundos * 1000:.1f} ms")
+    print("[arranque] Las demás pestañas se construyen al seleccionarlas")
+    print("-" * 60)
 
 
 if __name__ == "__main__":
@@ -19,29 +39,44 @@ if __name__ == "__main__":
     print("Sesiones: 30 minutos por aparato")       
     print("\n")
     
-    # Bucle principal para permitir cerrar sesión y volver al login
-    while True:
-        # Mostrar login
-        usuario = mostrar_login()
-        
-        if usuario:
-            # Si el login fue exitoso, abrir aplicacion principal
-            print(f"Usuario autenticado: {usuario['nombre']} ({usuario['rol']})")
-            root = tk.Tk()
-            app = GymApp(root, usuario)
-            root.protocol("WM_DELETE_WINDOW", app.on_closing)
-            root.mainloop()
+    # Una sola base de datos para toda la sesión: se conecta y migra una vez
+    # y se reutiliza en cada login y tras cada cierre de sesión
+    db = DatabaseManager()
+    if not db.preparar():
+        print("No se pudo abrir la base de datos")
+        sys.exit(1)
+    
+    try:
+        # Bucle principal para permitir cerrar sesión y volver al login
+        while True:
+            # Mostrar login
+            usuario = mostrar_login(db)
             
-            # Verificar si cerró sesión o salió completamente
-            if app.cerro_sesion:
-                # Usuario cerró sesión, volver al login
-                print("\nSesion cerrada. Volviendo al login...\n")
-                continue
+            if usuario:
+                # Si el login fue exitoso, abrir aplicacion principal
+                print(f"Usuario autenticado: {usuario['nombre']} ({usuario['rol']})")
+                inicio = time.perf_counter()
+                root = tk.Tk()
+                app = GymApp(root, usuario, db=db, perfilar=PERFIL_ARRANQUE)
+                root.protocol("WM_DELETE_WINDOW", app.on_closing)
+                if PERFIL_ARRANQUE:
+                    # Procesar el mapeo y el dibujado pendientes de la ventana
+                    root.update()
+                    mostrar_informe_arranque(app, time.perf_counter() - inicio)
+                root.mainloop()
+                
+                # Verificar si cerró sesión o salió completamente
+                if app.cerro_sesion:
+                    # Usuario cerró sesión, volver al login
+                    print("\nSesion cerrada. Volviendo al login...\n")
+                    continue
+                else:
+                    # Usuario salió de la aplicación
+                    print("\nAplicacion cerrada.")
+                    break
             else:
-                # Usuario salió de la aplicación
-                print("\nAplicacion cerrada.")
+                # Usuario canceló el login
+                print("Login cancelado")
                 break
-        else:
-            # Usuario canceló el login
-            print("Login cancelado")
-            break
+    finally:
+        db.disconnect()
@@ -16,3 +16,21 @@ from .helpers import (
     obtener_anio_actual,
     obtener_mes_actual
 )
+from .franjas import (
+    FRANJAS_POR_DIA,
+    HORAS,
+    HORAS_FIN,
+    ETIQUETAS,
+    INDICE_HORA,
+    indice_franja,
+    indice_franja_exacta,
+    hora_fin,
+    etiqueta_franja
+)
+from .banco import leer_cobros_banco
+from .exportar import (
+    XLSX_DISPONIBLE,
+    exportar_recibos,
+    exportar_morosos,
+    exportar_ocupacion
+)
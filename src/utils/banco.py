@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+GymForTheMoment - Ficheros del Banco
+Lectura en streaming de los ficheros CSV de cobros por domiciliación
+"""
+
+import csv
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterator
+
+# Nombres de columna aceptados en la cabecera del fichero (sin distinguir
+# mayúsculas); las columnas obligatorias son dni, mes y anio
+COLUMNAS = {
+    'dni': ('dni', 'nif', 'nie'),
+    'mes': ('mes',),
+    'anio': ('anio', 'año', 'ano', 'ejercicio'),
+    'importe': ('importe', 'cantidad'),
+    'fecha': ('fecha', 'fecha_cobro', 'fecha_pago', 'fecha_valor'),
+    'estado': ('estado', 'resultado'),
+}
+
+# Estados de un adeudo que cuentan como cobrado (si el fichero trae estado)
+ESTADOS_COBRADO = ('cobrado', 'pagado', 'aceptado', 'ok')
+
+# Formatos de fecha que envían los bancos
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y%m%d')
+
+
+@lru_cache(maxsize=512)
+def _leer_fecha(texto: str):
+    """
+    Convierte una fecha del banco a "AAAA-MM-DD" (None si no se reconoce).
+    
+    Un fichero diario trae casi siempre las mismas pocas fechas, así que
+    se recuerdan las ya convertidas en vez de llamar a strptime por línea.
+    """
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+
+def _leer_importe(texto: str) -> float:
+    """Convierte un importe con coma o punto decimal ("1.234,50", "45.00")"""
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    return float(texto)
+
+
+def leer_cobros_banco(ruta: str, codificacion: str = 'utf-8-sig') -> Iterator[Dict]:
+    """
+    Lee un fichero CSV de cobros del banco línea a línea.
+    
+    Es un generador: el fichero nunca se carga entero en memoria. El
+    separador (coma o punto y coma) se deduce de la cabecera. Las líneas
+    que no se pueden interpretar se devuelven igualmente con 'motivo'
+    para que aparezcan en el informe de la conciliación.
+    
+    Args:
+        ruta: Ruta del fichero CSV
+        codificacion: Codificación del fichero
+    
+    Yields:
+        Diccionarios con 'linea', 'dni', 'mes', 'anio', 'importe' (o None),
+        'fecha_pago' (o None), 'cobrado' y, si la línea no es válida,
+        'motivo'
+    
+    Raises:
+        ValueError: Si la cabecera no tiene las columnas obligatorias
+    """
+    with open(ruta, newline='', encoding=codificacion) as fichero:
+        cabecera = fichero.readline()
+        separador = ';' if cabecera.count(';') > cabecera.count(',') else ','
+        nombres = [nombre.strip().lower() for nombre in next(csv.reader([cabecera], delimiter=separador))]
+        
+        posiciones = {}
+        for campo, alias in COLUMNAS.items():
+            for i, nombre in enumerate(nombres):
+                if nombre in alias:
+                    posiciones[campo] = i
+                    break
+        faltan = [campo for campo in ('dni', 'mes', 'anio') if campo not in posiciones]
+        if faltan:
+            raise ValueError(f"Faltan columnas en el fichero del banco: {', '.join(faltan)}")
+        
+        def valor(campos, campo):
+            i = posiciones.get(campo)
+            return campos[i].strip() if i is not None and i < len(campos) else ''
+        
+        lector = csv.reader(fichero, delimiter=separador)
+        for campos in lector:
+            if not any(campos):
+                continue
+            
+            cobro = {
+                'linea': lector.line_num + 1,  # La cabecera ya se leyó aparte
+                'dni': valor(campos, 'dni').upper(),
+                'mes': None,
+                'anio': None,
+                'importe': None,
+                'fecha_pago': None,
+                'cobrado': True,
+            }
+            try:
+                cobro['mes'] = int(valor(campos, 'mes'))
+                cobro['anio'] = int(valor(campos, 'anio'))
+                if valor(campos, 'importe'):
+                    cobro['importe'] = _leer_importe(valor(campos, 'importe'))
+            except ValueError:
+                cobro['motivo'] = "Mes, año o importe no válido"
+                yield cobro
+                continue
+            
+            if valor(campos, 'fecha'):
+                cobro['fecha_pago'] = _leer_fecha(valor(campos, 'fecha'))
+            if 'estado' in posiciones:
+                cobro['cobrado'] = valor(campos, 'estado').lower() in ESTADOS_COBRADO
+            if not cobro['dni']:
+                cobro['motivo'] = "Sin DNI"
+            yield cobro
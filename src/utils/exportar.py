@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+GymForTheMoment - Exportación
+Exportación de recibos, morosos y ocupación a CSV y, si está instalado
+openpyxl, a Excel. Las filas se escriben según llegan del cursor, de modo
+que la memoria no depende del número de filas exportadas.
+"""
+
+import csv
+import os
+from typing import Iterable, Sequence
+
+from .helpers import DIAS_SEMANA
+from .franjas import HORAS
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # openpyxl es opcional (ver requirements.txt)
+    Workbook = None
+
+# True si se puede exportar a .xlsx
+XLSX_DISPONIBLE = Workbook is not None
+
+# ==================== FORMATOS ====================
+
+def exportar_csv(ruta: str, cabecera: Sequence[str], filas: Iterable[Sequence]) -> int:
+    """
+    Escribe las filas en un CSV separado por punto y coma.
+    
+    Se usa UTF-8 con BOM para que Excel reconozca los acentos al abrirlo.
+    
+    Args:
+        ruta: Fichero de destino
+        cabecera: Nombres de las columnas
+        filas: Filas a escribir (se consumen de una en una)
+    
+    Returns:
+        Número de filas escritas (sin la cabecera)
+    """
+    total = 0
+    with open(ruta, 'w', newline='', encoding='utf-8-sig') as fichero:
+        escritor = csv.writer(fichero, delimiter=';')
+        escritor.writerow(cabecera)
+        for fila in filas:
+            escritor.writerow(fila)
+            total += 1
+    return total
+
+
+def exportar_xlsx(ruta: str, cabecera: Sequence[str], filas: Iterable[Sequence],
+                  hoja: str = "Datos") -> int:
+    """
+    Escribe las filas en un libro de Excel en modo solo escritura.
+    
+    En ese modo openpyxl vuelca cada fila al fichero temporal del libro
+    en cuanto se añade, sin mantener la hoja en memoria.
+    
+    Args:
+        ruta: Fichero de destino (.xlsx)
+        cabecera: Nombres de las columnas
+        filas: Filas a escribir (se consumen de una en una)
+        hoja: Título de la hoja
+    
+    Returns:
+        Número de filas escritas (sin la cabecera)
+    
+    Raises:
+        RuntimeError: Si openpyxl no está instalado
+    """
+    if not XLSX_DISPONIBLE:
+        raise RuntimeError("Para exportar a Excel hay que instalar openpyxl")
+    
+    libro = Workbook(write_only=True)
+    hoja_excel = libro.create_sheet(title=hoja)
+    hoja_excel.append(list(cabecera))
+    total = 0
+    for fila in filas:
+        hoja_excel.append(list(fila))
+        total += 1
+    libro.save(ruta)
+    return total
+
+
+def exportar(ruta: str, cabecera: Sequence[str], filas: Iterable[Sequence],
+             hoja: str = "Datos") -> int:
+    """
+    Exporta a Excel si la ruta termina en .xlsx y a CSV en otro caso.
+    
+    Si la exportación falla a medias se borra el fichero incompleto.
+    
+    Returns:
+        Número de filas escritas (sin la cabecera)
+    """
+    try:
+        if os.path.splitext(ruta)[1].lower() == '.xlsx':
+            return exportar_xlsx(ruta, cabecera, filas, hoja)
+        return exportar_csv(ruta, cabecera, filas)
+    except Exception:
+        if os.path.exists(ruta):
+            os.remove(ruta)
+        raise
+
+# ==================== EXPORTACIONES ====================
+
+def exportar_recibos(db, ruta: str, mes: int = None, anio: int = None) -> int:
+    """
+    Exporta los recibos (opcionalmente de un mes y/o año) con su cliente.
+    
+    Args:
+        db: DatabaseManager
+        ruta: Fichero de destino (.csv o .xlsx)
+        mes: Mes (1-12) (opcional)
+        anio: Año (opcional)
+    
+    Returns:
+        Número de recibos exportados
+    """
+    cabecera = ('ID Recibo', 'Nombre', 'Apellidos', 'DNI', 'Mes', 'Año',
+                'Importe', 'Pagado', 'Fecha Emisión', 'Fecha Pago')
+    filas = (
+        (r['id_recibo'], r['nombre'], r['apellidos'], r['dni'], r['mes'], r['anio'],
+         r['importe'], 'Sí' if r['pagado'] else 'No', r['fecha_emision'], r['fecha_pago'])
+        for r in db.iterar_recibos(mes=mes, anio=anio)
+    )
+    return exportar(ruta, cabecera, filas, hoja="Recibos")
+
+
+def exportar_morosos(db, ruta: str) -> int:
+    """
+    Exporta los clientes morosos, de mayor a menor deuda.
+    
+    Args:
+        db: DatabaseManager
+        ruta: Fichero de destino (.csv o .xlsx)
+    
+    Returns:
+        Número de clientes exportados
+    """
+    cabecera = ('ID Cliente', 'Nombre', 'Apellidos', 'DNI', 'Teléfono', 'Email',
+                'Recibos Pendientes', 'Pendiente Desde', 'Total Adeudado')
+    filas = (
+        (m['id_cliente'], m['nombre'], m['apellidos'], m['dni'], m['telefono'], m['email'],
+         m['num_recibos_pendientes'],
+         f"{m['primer_pendiente'] // 100}-{m['primer_pendiente'] % 100:02d}",
+         m['total_adeudado'])
+        for m in db.iterar_clientes_morosos()
+    )
+    return exportar(ruta, cabecera, filas, hoja="Morosos")
+
+
+def exportar_ocupacion(db, ruta: str, tipo: str = None) -> int:
+    """
+    Exporta la rejilla de ocupación de la semana: una fila por día y
+    aparato con el cliente que ocupa cada una de las 48 franjas.
+    
+    Args:
+        db: DatabaseManager
+        ruta: Fichero de destino (.csv o .xlsx)
+        tipo: Tipo de aparato por el que filtrar (opcional)
+    
+    Returns:
+        Número de filas (día y aparato) exportadas
+    """
+    cabecera = ('Día', 'Aparato', 'Tipo', 'Ocupadas') + HORAS
+    filas = (
+        (nombre_dia, aparato['aparato_nombre'], aparato['aparato_tipo'],
+         sum(franja['ocupado'] for franja in aparato['franjas']))
+        + tuple(franja['cliente'] or '' for franja in aparato['franjas'])
+        for dia, nombre_dia in DIAS_SEMANA.items()
+        for aparato in db.iterar_ocupacion(dia, tipo)
+    )
+    return exportar(ruta, cabecera, filas, hoja="Ocupación")
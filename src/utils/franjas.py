@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+GymForTheMoment - Franjas Horarias
+Tablas precalculadas de las 48 franjas de 30 minutos de un día
+"""
+
+from types import MappingProxyType
+
+# Duración de una sesión y número de franjas de un día de 24 horas
+DURACION_FRANJA = 30
+FRANJAS_POR_DIA = 24 * 60 // DURACION_FRANJA
+
+# ==================== TABLAS ====================
+
+# Índice de franja (0-47) -> hora de inicio "HH:MM"
+HORAS = tuple(
+    f"{minutos // 60:02d}:{minutos % 60:02d}"
+    for minutos in range(0, 24 * 60, DURACION_FRANJA)
+)
+
+# Índice de franja -> hora de fin "HH:MM" (la última termina a las 00:00)
+HORAS_FIN = HORAS[1:] + HORAS[:1]
+
+# Índice de franja -> texto para mostrar, p. ej. "09:30 - 10:00"
+ETIQUETAS = tuple(f"{inicio} - {fin}" for inicio, fin in zip(HORAS, HORAS_FIN))
+
+# Pares (hora, etiqueta) de todas las franjas, en orden
+FRANJAS = tuple(zip(HORAS, ETIQUETAS))
+
+# Hora de inicio "HH:MM" -> índice de franja
+INDICE_HORA = MappingProxyType({hora: indice for indice, hora in enumerate(HORAS)})
+
+# ==================== CONSULTAS ====================
+
+def indice_franja(hora: str) -> int:
+    """
+    Convierte una hora en el número de franja del día (0-47).
+    
+    Las horas de inicio exactas ("HH:MM") se resuelven con la tabla; otras
+    ("HH:MM:SS", minutos intermedios) caen en la franja que las contiene.
+    Sirve para leer reservas ya guardadas; para validar la hora de una
+    reserva nueva se usa indice_franja_exacta.
+    
+    Raises:
+        ValueError: Si la hora no tiene formato "HH:MM" o está fuera del día
+    """
+    indice = INDICE_HORA.get(hora)
+    if indice is not None:
+        return indice
+    try:
+        horas, minutos = (int(parte) for parte in hora.split(":")[:2])
+    except (AttributeError, ValueError):
+        raise ValueError(f"Hora no válida: {hora!r} (se esperaba \"HH:MM\")") from None
+    if not (0 <= horas < 24 and 0 <= minutos < 60):
+        raise ValueError(f"Hora fuera del día: {hora!r}")
+    return (horas * 60 + minutos) // DURACION_FRANJA
+
+
+def indice_franja_exacta(hora: str) -> int:
+    """
+    Devuelve el número de franja (0-47) de una hora de inicio de franja.
+    
+    Raises:
+        ValueError: Si la hora no es el inicio de una franja ("HH:00" o
+            "HH:30"), p. ej. "09:15", "24:00" o "9:00"
+    """
+    indice = INDICE_HORA.get(hora)
+    if indice is None:
+        raise ValueError(f"La hora {hora!r} no es el inicio de una franja de "
+                         f"{DURACION_FRANJA} minutos (HH:00 o HH:30)")
+    return indice
+
+
+def hora_fin(hora_inicio: str) -> str:
+    """
+    Devuelve la hora de fin "HH:MM" de la sesión que empieza a hora_inicio
+    (la de las 23:30 termina a las 00:00).
+    
+    Raises:
+        ValueError: Si hora_inicio no es el inicio de una franja
+    """
+    return HORAS_FIN[indice_franja_exacta(hora_inicio)]
+
+
+def etiqueta_franja(hora_inicio: str) -> str:
+    """
+    Devuelve el texto "HH:MM - HH:MM" de la franja que empieza a hora_inicio.
+    
+    Raises:
+        ValueError: Si hora_inicio no es el inicio de una franja
+    """
+    return ETIQUETAS[indice_franja_exacta(hora_inicio)]
@@ -6,6 +6,8 @@ Funciones auxiliares para la aplicación
 
 from datetime import datetime
 
+from .franjas import FRANJAS
+
 # Días de la semana
 DIAS_SEMANA = {
     1: "Lunes",
@@ -45,24 +47,14 @@ def obtener_nombre_mes(mes_numero: int) -> str:
     return MESES.get(mes_numero, "Desconocido")
 
 
-def generar_franjas_horarias() -> list:
+def generar_franjas_horarias() -> tuple:
     """
-    Genera todas las franjas horarias de 30 minutos para un día de 24 horas.
+    Devuelve todas las franjas horarias de 30 minutos de un día de 24 horas.
     
     Returns:
-        Lista de tuplas (hora_str, hora_display)
+        Tupla precalculada de pares (hora_str, hora_display)
     """
-    franjas = []
-    for hora in range(24):
-        for minuto in [0, 30]:
-            hora_str = f"{hora:02d}:{minuto:02d}"
-            if minuto == 0:
-                hora_display = f"{hora:02d}:00 - {hora:02d}:30"
-            else:
-                siguiente_hora = (hora + 1) % 24
-                hora_display = f"{hora:02d}:30 - {siguiente_hora:02d}:00"
-            franjas.append((hora_str, hora_display))
-    return franjas
+    return FRANJAS
 
 
 def validar_dni(dni: str) -> bool: